@@ -58,12 +58,16 @@ sys.path.append(full_path)
 import ConfigParser
 from common.OpTestSystem import OpTestSystem
 from common.OpTestConstants import OpTestConstants as BMC_CONST
+from common.OpTestError import OpTestError
 
 
 def _config_read():
     """ returns bmc system and test config options """
     bmcConfig = ConfigParser.RawConfigParser()
-    configFile = os.path.join(os.path.dirname(__file__), 'op_ci_tools.cfg')
+    ''' OP_CI_TOOLS_CFG points at the config of one machine when the
+        suite runs on several machines at once, see run '''
+    configFile = os.environ.get('OP_CI_TOOLS_CFG',
+                                os.path.join(os.path.dirname(__file__), 'op_ci_tools.cfg'))
     bmcConfig.read(configFile)
     return dict(bmcConfig.items('bmc')), dict(bmcConfig.items('test')),dict(bmcConfig.items('host'))
 
@@ -129,7 +133,7 @@ def validate_pflash_tool():
 def pnor_img_transfer():
     """This function copies the PNOR image to the BMC /tmp dir.
 
-    :returns: int -- the rsync command return code
+    :returns: int -- 0: success, OpTestError: error
     """
     return opTestSys.cv_BMC.pnor_img_transfer(testCfg['imagedir'],
                                               testCfg['imagename'])
@@ -140,10 +144,33 @@ def pnor_img_flash():
     And this function will work based on the assumption that pflash
     tool available in '/tmp/'.(user need to mount pflash tool in /tmp dir,
     as pflash tool removed from BMC)
+    With deltaflash = yes in the test config, only the partitions that
+    changed since the last flash are written. With verifyflash = yes, the
+    flash is checked afterwards, see pnor_img_verify().
 
     :returns: int -- the pflash command return code
     """
-    return opTestSys.cv_BMC.pnor_img_flash(BMC_CONST.PFLASH_TOOL_DIR, testCfg['imagename'])
+    if testCfg.get('deltaflash', 'no') == 'yes':
+        rc = opTestSys.cv_BMC.pnor_img_flash_delta(BMC_CONST.PFLASH_TOOL_DIR,
+                                                   testCfg['imagedir'],
+                                                   testCfg['imagename'])
+    else:
+        rc = opTestSys.cv_BMC.pnor_img_flash(BMC_CONST.PFLASH_TOOL_DIR, testCfg['imagename'])
+    if rc == 0 and testCfg.get('verifyflash', 'no') == 'yes':
+        rc = pnor_img_verify()
+    return rc
+
+
+def pnor_img_verify():
+    """This function reads the PNOR flash back and compares it with the
+    image partition by partition, leaving out the partitions the firmware
+    writes to.
+
+    :returns: int -- 0: success, OpTestError: error
+    """
+    return opTestSys.cv_BMC.pnor_img_verify(BMC_CONST.PFLASH_TOOL_DIR,
+                                            testCfg['imagedir'],
+                                            testCfg['imagename'])
 
 
 def ipmi_sdr_clear():
@@ -163,13 +190,47 @@ def ipmi_power_off():
 
 
 def ipmi_power_on():
-    """This function sends the chassis power on ipmitool command.
+    """This function sends the chassis power on ipmitool command. With
+    iplprofile = yes in the test config, the IPL is profiled from the SOL
+    console up to the host login prompt, see ipl_profile().
 
     :returns: int -- 0: success, 1: error
     """
+    if testCfg.get('iplprofile', 'no') == 'yes':
+        return ipl_profile()
     return opTestSys.sys_power_on()
 
 
+def ipl_profile():
+    """This function IPLs the system from standby and timestamps the boot
+    milestones seen on the SOL console.  The ipl_profile_<time>.json timeline
+    is placed in the FFDC directory and a phase summary is printed.  The
+    phases are added to the IPL history of all runs
+    (/var/lib/op-test/ipl_history.db), and compared with the previous PNOR
+    build IPLed on the machine.
+
+    :returns: int -- 0: success, 1: error
+    """
+    try:
+        opTestSys.sys_ipl_profile()
+    except OpTestError:
+        return 1
+    return 0
+
+
+def ipl_profile_if_enabled():
+    """This function profiles the IPL with ipl_profile() when iplprofile = yes
+    is in the test config. Otherwise the system is left in standby for the
+    next test to power it on.
+
+    :returns: int -- 0: success, 1: error
+    """
+    if testCfg.get('iplprofile', 'no') != 'yes':
+        print "IPL profiling is not enabled in the test config"
+        return 0
+    return ipl_profile()
+
+
 def ipmi_warm_reset():
     """ This function sends the warm reset ipmitool command
 
@@ -47,7 +47,8 @@ from common.OpTestConstants import OpTestConstants as BMC_CONST
 def _config_read():
     """ returns bmc system and test config options """
     bmcConfig = ConfigParser.RawConfigParser()
-    configFile = os.path.join(os.path.dirname(__file__), 'op_ci_tools.cfg')
+    configFile = os.environ.get('OP_CI_TOOLS_CFG',
+                                os.path.join(os.path.dirname(__file__), 'op_ci_tools.cfg'))
     bmcConfig.read(configFile)
     return dict(bmcConfig.items('bmc')), dict(bmcConfig.items('test')), dict(bmcConfig.items('host'))
 
@@ -51,7 +51,8 @@ from testcases.OpTestFWTS import OpTestFWTS
 def _config_read():
     """ returns bmc system and test config options """
     bmcConfig = ConfigParser.RawConfigParser()
-    configFile = os.path.join(os.path.dirname(__file__), 'op_ci_tools.cfg')
+    configFile = os.environ.get('OP_CI_TOOLS_CFG',
+                                os.path.join(os.path.dirname(__file__), 'op_ci_tools.cfg'))
     print configFile
     bmcConfig.read(configFile)
     return dict(bmcConfig.items('bmc')), dict(bmcConfig.items('test')), dict(bmcConfig.items('host'))
@@ -0,0 +1,180 @@
+#!/usr/bin/python
+# IBM_PROLOG_BEGIN_TAG
+# This is an automatically generated prolog.
+#
+# $Source: op-test-framework/ci/source/test_ffs.py $
+#
+# OpenPOWER Automated Test Project
+#
+# Contributors Listed Below - COPYRIGHT 2015
+# [+] International Business Machines Corp.
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+#
+# IBM_PROLOG_END_TAG
+
+"""
+Tests the FFS partition table parser, common/OpTestFFS.py, and ffs_diff()
+on small synthetic PNOR images, so no image or machine is needed: header
+and entry checksums, partition offsets and flags, and which partitions
+ffs_diff() reports.
+"""
+import os
+import sys
+import shutil
+import struct
+import tempfile
+
+# Get path to base directory and append to path to get common modules
+full_path = os.path.dirname(os.path.abspath(__file__))
+full_path = full_path.split('ci')[0]
+sys.path.append(full_path)
+
+from common.OpTestFFS import OpTestFFS, ffs_diff, ffs_checksum, FFS_HDR, FFS_ENTRY
+from common.OpTestConstants import OpTestConstants as BMC_CONST
+from common.OpTestError import OpTestError
+
+BLOCK_SIZE = 0x1000
+
+# name, first block, blocks, ECC, misc flags
+PARTS = [(BMC_CONST.PNOR_TOC_PART, 0, 1, False, 0),
+         ("HBI", 1, 2, True, 0),
+         (BMC_CONST.PNOR_NVRAM_PART, 3, 1, False, 0),
+         ("HBRT", 4, 1, False, BMC_CONST.FFS_MISCFLAGS_VOLATILE),
+         (BMC_CONST.PNOR_BOOTKERNEL_PART, 5, 2, False, BMC_CONST.FFS_MISCFLAGS_READONLY)]
+BLOCKS = 7
+
+
+##
+# @brief Packs a structure with its trailing checksum word, so that the XOR
+#        of all its words is 0
+#
+def checksummed(i_struct, i_fields):
+    l_raw = i_struct.pack(*(list(i_fields) + [0]))
+    return i_struct.pack(*(list(i_fields) + [ffs_checksum(l_raw)]))
+
+
+##
+# @brief Returns a PNOR image: the partition table, then every partition
+#        filled with a byte of its own
+#
+def pnor_image(i_parts=PARTS):
+    l_toc = checksummed(FFS_HDR, [BMC_CONST.FFS_MAGIC, BMC_CONST.FFS_VERSION_1, 1,
+                                  FFS_ENTRY.size, len(i_parts), BLOCK_SIZE, BLOCKS,
+                                  0, 0, 0, 0])
+    for l_name, l_block, l_blocks, l_ecc, l_misc in i_parts:
+        l_user = [BMC_CONST.FFS_ENTRY_INTEG_ECC if l_ecc else 0, l_misc << 16] + [0] * 14
+        l_toc += checksummed(FFS_ENTRY, [l_name, l_block, l_blocks, 0xffffffff, 0,
+                                         BMC_CONST.FFS_TYPE_DATA, 0,
+                                         l_blocks * BLOCK_SIZE, 0, 0, 0, 0] + l_user)
+    l_image = bytearray(l_toc.ljust(BLOCK_SIZE, '\xff'))
+    for l_index, (l_name, l_block, l_blocks, l_ecc, l_misc) in enumerate(i_parts[1:]):
+        l_image += chr(0x10 + l_index) * (l_blocks * BLOCK_SIZE)
+    return l_image
+
+
+class Images():
+
+    def __init__(self):
+        self.cv_dir = tempfile.mkdtemp()
+
+    ##
+    # @brief Writes an image to a file, returns its path
+    #
+    def write(self, i_name, i_image):
+        l_path = os.path.join(self.cv_dir, i_name)
+        with open(l_path, 'wb') as l_file:
+            l_file.write(i_image)
+        return l_path
+
+    def remove(self):
+        shutil.rmtree(self.cv_dir)
+
+
+def test_parse():
+    l_images = Images()
+    try:
+        with OpTestFFS(l_images.write("pnor", pnor_image())) as l_ffs:
+            assert [l_part.cv_name for l_part in l_ffs.partitions()] == \
+                [l_name for l_name, l_block, l_blocks, l_ecc, l_misc in PARTS]
+            assert l_ffs.cv_blockSize == BLOCK_SIZE
+            assert l_ffs.size() == BLOCKS * BLOCK_SIZE
+            l_hbi = l_ffs.partition("HBI")
+            assert (l_hbi.cv_offset, l_hbi.cv_size) == (BLOCK_SIZE, 2 * BLOCK_SIZE)
+            assert l_hbi.cv_ecc
+            assert not l_ffs.partition(BMC_CONST.PNOR_NVRAM_PART).cv_ecc
+            assert l_ffs.partition("HBRT").has_flag(BMC_CONST.FFS_MISCFLAGS_VOLATILE)
+            l_kernel = l_ffs.partition(BMC_CONST.PNOR_BOOTKERNEL_PART)
+            assert l_kernel.has_flag(BMC_CONST.FFS_MISCFLAGS_READONLY)
+            assert not l_kernel.has_flag(BMC_CONST.FFS_MISCFLAGS_VOLATILE)
+            assert str(l_ffs.data(BMC_CONST.PNOR_BOOTKERNEL_PART)) == \
+                chr(0x13) * (2 * BLOCK_SIZE)
+            try:
+                l_ffs.partition("NOSUCH")
+                assert False, "found a partition not in the table"
+            except OpTestError:
+                pass
+    finally:
+        l_images.remove()
+
+
+def test_checksums():
+    l_images = Images()
+    try:
+        # A flipped bit in the header, then in the second entry
+        for l_offset in (FFS_HDR.size - 8, FFS_HDR.size + FFS_ENTRY.size + 20):
+            l_image = pnor_image()
+            l_image[l_offset] ^= 0x01
+            try:
+                OpTestFFS(l_images.write("bad", l_image))
+                assert False, "parsed a table with a bad checksum at 0x%x" % l_offset
+            except OpTestError, e:
+                assert "checksum" in str(e)
+        l_image = pnor_image()
+        l_image[0] = 0
+        try:
+            OpTestFFS(l_images.write("bad", l_image))
+            assert False, "parsed a table with a bad magic"
+        except OpTestError, e:
+            assert "no partition table" in str(e)
+    finally:
+        l_images.remove()
+
+
+def test_diff():
+    l_images = Images()
+    try:
+        l_ref = l_images.write("ref", pnor_image())
+        assert ffs_diff(l_ref, l_images.write("same", pnor_image())) == []
+
+        # Written partitions are reported in partition table order, the
+        # ones the firmware writes to are not
+        l_image = pnor_image()
+        for l_block in (6, 3, 4, 1):
+            l_image[l_block * BLOCK_SIZE + 100] ^= 0xff
+        assert ffs_diff(l_ref, l_images.write("changed", l_image)) == \
+            ["HBI", BMC_CONST.PNOR_BOOTKERNEL_PART]
+        assert ffs_diff(l_ref, l_images.write("changed", l_image), []) == \
+            ["HBI", BMC_CONST.PNOR_NVRAM_PART, BMC_CONST.PNOR_BOOTKERNEL_PART]
+
+        # A partition that moved, or is cut off, differs
+        l_moved = list(PARTS)
+        l_moved[1] = ("HBI", 1, 1, True, 0)
+        assert "HBI" in ffs_diff(l_ref, l_images.write("moved", pnor_image(l_moved)))
+        l_cut = l_images.write("cut", pnor_image()[:6 * BLOCK_SIZE])
+        assert ffs_diff(l_ref, l_cut) == [BMC_CONST.PNOR_BOOTKERNEL_PART]
+        # An update image does not hold every partition of its table
+        assert ffs_diff(l_cut, l_ref) == []
+    finally:
+        l_images.remove()
@@ -0,0 +1,373 @@
+#!/usr/bin/python
+# IBM_PROLOG_BEGIN_TAG
+# This is an automatically generated prolog.
+#
+# $Source: op-test-framework/ci/source/test_ipmi_lan.py $
+#
+# OpenPOWER Automated Test Project
+#
+# Contributors Listed Below - COPYRIGHT 2015
+# [+] International Business Machines Corp.
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+#
+# IBM_PROLOG_END_TAG
+
+"""
+Tests the native RMCP+ client, common/OpTestIPMILan.py, against a stand-in
+BMC on a loopback UDP socket, so no machine is needed: session setup
+(open session, RAKP 1-4), HMAC-SHA1-96 integrity and AES-CBC-128
+confidentiality of the session, chassis power status and sdr elist.
+"""
+import os
+import sys
+import hmac
+import socket
+import select
+import struct
+import hashlib
+import threading
+
+# Get path to base directory and append to path to get common modules
+full_path = os.path.dirname(os.path.abspath(__file__))
+full_path = full_path.split('ci')[0]
+sys.path.append(full_path)
+
+from common.OpTestIPMILan import OpTestIPMILan, _AES128, RMCP_HEADER, AUTH_TYPE_RMCPP
+from common.OpTestIPMILan import PAYLOAD_IPMI, PAYLOAD_OPEN_SESSION_REQ, PAYLOAD_RAKP1, \
+    PAYLOAD_RAKP3, NETFN_APP, NETFN_CHASSIS, NETFN_SENSOR, NETFN_STORAGE
+from common.OpTestConstants import OpTestConstants as BMC_CONST
+from common.OpTestError import OpTestError
+
+USER = "ADMIN"
+PASSWD = "admin"
+
+
+##
+# @brief Returns an SDR record: header, sensor key and body, the ID string
+#        at i_idOffset
+#
+def sdr_record(i_id, i_type, i_body, i_idOffset, i_name):
+    l_rec = [i_id & 0xff, i_id >> 8, 0x51, i_type, 0] + i_body
+    l_rec += [0] * (i_idOffset - len(l_rec))
+    l_rec += [0xc0 | len(i_name)] + list(bytearray(i_name))
+    l_rec[4] = len(l_rec) - 5
+    return l_rec
+
+# Full record of a threshold sensor: 2 * raw / 10 degrees C
+SDR_TEMP = sdr_record(0x0001, 0x01,
+                      [0x20, 0x00, 0x01, 0x07, 0x01, 0, 0, 0x01, 0x01] +
+                      [0] * 6 + [0x00, 0x01, 0x00, 0x00, 0x02, 0x00, 0x00, 0x00, 0,
+                                 0xf0],
+                      47, "Ambient Temp")
+# Compact record of the ACPI power state sensor, sensor specific states
+SDR_HOST = sdr_record(0x0002, 0x02,
+                      [0x20, 0x00, 0x08, 0x22, 0x01, 0, 0, 0x22, 0x6f],
+                      31, "Host Status")
+# Management controller locator, not a sensor
+SDR_MC = [0x03, 0x00, 0x51, 0x12, 11, 0x20, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+SDRS = [SDR_TEMP, SDR_HOST, SDR_MC]
+
+READINGS = {0x01: [185, 0x40, 0x00, 0x00],
+            0x08: [0x00, 0x40, 0x01, 0x00]}
+
+
+class StandInBMC():
+    # Just enough of an RMCP+ BMC for OpTestIPMILan, cipher suite 3 only
+
+    def __init__(self):
+        self.cv_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.cv_sock.bind(('127.0.0.1', 0))
+        self.cv_port = self.cv_sock.getsockname()[1]
+        self.cv_sidc = 0x0badcafe
+        self.cv_sidm = 0
+        self.cv_guid = os.urandom(16)
+        self.cv_k1 = None
+        self.cv_aes = None
+        self.cv_keys = None
+        self.cv_seq = 0
+        self.cv_resv = 0
+        self.cv_power = 0x01
+        # Commands whose replies get lost
+        self.cv_mute = set()
+        self.cv_requests = []
+        self.cv_running = True
+        self.cv_thread = threading.Thread(target=self._serve)
+        self.cv_thread.daemon = True
+        self.cv_thread.start()
+
+    def stop(self):
+        self.cv_running = False
+        self.cv_thread.join()
+        self.cv_sock.close()
+
+    def _serve(self):
+        while self.cv_running:
+            if not select.select([self.cv_sock], [], [], 0.1)[0]:
+                continue
+            l_pkt, l_addr = self.cv_sock.recvfrom(4096)
+            l_type, l_payload = self._parse(l_pkt)
+            if l_type == PAYLOAD_OPEN_SESSION_REQ:
+                l_rsp = self._open_session(l_payload)
+            elif l_type == PAYLOAD_RAKP1:
+                l_rsp = self._rakp1(l_payload)
+            elif l_type == PAYLOAD_RAKP3:
+                l_rsp = self._rakp3(l_payload)
+            else:
+                l_rsp = self._ipmi(l_payload)
+                if l_rsp is None:
+                    continue
+            self.cv_sock.sendto(self.sign(l_type + 1 if l_type != PAYLOAD_IPMI else l_type,
+                                          l_rsp), l_addr)
+            if self.cv_keys is not None:
+                # The keys are used from the message after RAKP 4 on
+                self.cv_k1, self.cv_aes = self.cv_keys
+                self.cv_keys = None
+
+    def _parse(self, i_pkt):
+        assert i_pkt[:4] == RMCP_HEADER and ord(i_pkt[4]) == AUTH_TYPE_RMCPP
+        l_type = ord(i_pkt[5])
+        l_sid, l_seq, l_len = struct.unpack('<IIH', i_pkt[6:16])
+        l_payload = i_pkt[16:16 + l_len]
+        if l_type == PAYLOAD_OPEN_SESSION_REQ:
+            # A new session, the client gave up on the previous one
+            self.cv_k1 = self.cv_aes = None
+        if self.cv_k1 is not None:
+            # Everything after RAKP 4 is authenticated and encrypted
+            assert l_type & 0xc0 == 0xc0 and l_sid == self.cv_sidc
+            assert hmac.new(self.cv_k1, i_pkt[4:-12], hashlib.sha1).digest()[:12] == \
+                i_pkt[-12:]
+            l_data = self.cv_aes.cbc_decrypt(l_payload[:16], l_payload[16:])
+            l_payload = l_data[:-1 - ord(l_data[-1])]
+        self.cv_requests.append((l_type, l_payload))
+        return l_type & 0x3f, l_payload
+
+    ##
+    # @brief Wraps a payload the way the BMC sends it, signed and encrypted
+    #        once the session is up
+    #
+    def sign(self, i_type, i_payload):
+        l_sid = 0
+        if self.cv_k1 is not None:
+            l_pad = 16 - (len(i_payload) + 1) % 16
+            l_iv = os.urandom(16)
+            i_payload = l_iv + self.cv_aes.cbc_encrypt(
+                l_iv, i_payload + ''.join(chr(l_i) for l_i in range(1, l_pad + 1)) + chr(l_pad))
+            i_type |= 0xc0
+            l_sid = self.cv_sidm
+            self.cv_seq += 1
+        l_msg = struct.pack('<BBIIH', AUTH_TYPE_RMCPP, i_type, l_sid, self.cv_seq,
+                            len(i_payload)) + i_payload
+        if self.cv_k1 is not None:
+            l_pad = (4 - (len(l_msg) + 2) % 4) % 4
+            l_msg += '\xff' * l_pad + chr(l_pad) + '\x07'
+            l_msg += hmac.new(self.cv_k1, l_msg, hashlib.sha1).digest()[:12]
+        return RMCP_HEADER + l_msg
+
+    def _open_session(self, i_req):
+        self.cv_sidm = struct.unpack('<I', i_req[4:8])[0]
+        l_algos = ''.join(struct.pack('<BHBB3x', l_i, 0, 8, 0x01) for l_i in range(3))
+        return i_req[0] + '\x00\x04\x00' + struct.pack('<II', self.cv_sidm, self.cv_sidc) + \
+            l_algos
+
+    def _rakp1(self, i_req):
+        self.cv_rm = i_req[8:24]
+        self.cv_rc = os.urandom(16)
+        self.cv_names = i_req[24] + i_req[27] + i_req[28:28 + ord(i_req[27])]
+        l_auth = hmac.new(PASSWD, struct.pack('<II', self.cv_sidm, self.cv_sidc) +
+                          self.cv_rm + self.cv_rc + self.cv_guid + self.cv_names,
+                          hashlib.sha1).digest()
+        return i_req[0] + '\x00\x00\x00' + struct.pack('<I', self.cv_sidm) + self.cv_rc + \
+            self.cv_guid + l_auth
+
+    def _rakp3(self, i_req):
+        l_auth = hmac.new(PASSWD, self.cv_rc + struct.pack('<I', self.cv_sidm) + self.cv_names,
+                          hashlib.sha1).digest()
+        if i_req[8:28] != l_auth:
+            return i_req[0] + '\x0f\x00\x00' + struct.pack('<I', self.cv_sidm)
+        l_sik = hmac.new(PASSWD, self.cv_rm + self.cv_rc + self.cv_names, hashlib.sha1).digest()
+        l_icv = hmac.new(l_sik, self.cv_rm + struct.pack('<I', self.cv_sidc) + self.cv_guid,
+                         hashlib.sha1).digest()[:12]
+        self.cv_keys = (hmac.new(l_sik, '\x01' * 20, hashlib.sha1).digest(),
+                        _AES128(hmac.new(l_sik, '\x02' * 20, hashlib.sha1).digest()[:16]))
+        return i_req[0] + '\x00\x00\x00' + struct.pack('<I', self.cv_sidm) + l_icv
+
+    def _ipmi(self, i_req):
+        l_req = bytearray(i_req)
+        l_netfn, l_lun, l_seq, l_cmd = l_req[1] >> 2, l_req[1] & 0x03, l_req[4], l_req[5]
+        l_cc, l_data = self._command(l_netfn, l_cmd, list(l_req[6:-1]))
+        if (l_netfn, l_cmd) in self.cv_mute:
+            return None
+        l_hdr = [0x81, ((l_netfn + 1) << 2) | l_lun]
+        l_body = [0x20, l_seq, l_cmd, l_cc] + l_data
+        return str(bytearray(l_hdr + [-sum(l_hdr) & 0xff] + l_body + [-sum(l_body) & 0xff]))
+
+    def _command(self, i_netfn, i_cmd, i_data):
+        if (i_netfn, i_cmd) == (NETFN_APP, 0x3b):
+            return 0x00, [i_data[0]]
+        if (i_netfn, i_cmd) == (NETFN_APP, 0x3c):
+            return 0x00, []
+        if (i_netfn, i_cmd) == (NETFN_CHASSIS, 0x01):
+            return 0x00, [self.cv_power, 0x00, 0x00]
+        if (i_netfn, i_cmd) == (NETFN_CHASSIS, 0x02):
+            self.cv_power = 0x01 if i_data[0] in (0x01, 0x02, 0x03) else 0x00
+            return 0x00, []
+        if (i_netfn, i_cmd) == (NETFN_STORAGE, 0x22):
+            self.cv_resv += 1
+            return 0x00, [self.cv_resv & 0xff, self.cv_resv >> 8]
+        if (i_netfn, i_cmd) == (NETFN_STORAGE, 0x23):
+            l_resv, l_id, l_offset, l_count = i_data[0] | (i_data[1] << 8), \
+                i_data[2] | (i_data[3] << 8), i_data[4], i_data[5]
+            if l_resv != self.cv_resv:
+                return 0xc5, []
+            l_ids = [l_rec[0] | (l_rec[1] << 8) for l_rec in SDRS]
+            l_index = 0 if l_id == 0 else l_ids.index(l_id)
+            l_next = l_ids[l_index + 1] if l_index + 1 < len(l_ids) else 0xffff
+            return 0x00, [l_next & 0xff, l_next >> 8] + \
+                SDRS[l_index][l_offset:l_offset + l_count]
+        if (i_netfn, i_cmd) == (NETFN_SENSOR, 0x2d) and i_data[0] in READINGS:
+            return 0x00, READINGS[i_data[0]]
+        return 0xc1, []
+
+
+def test_aes_known_answer():
+    # FIPS-197 appendix C.1
+    l_aes = _AES128(str(bytearray(range(16))))
+    l_plain = str(bytearray.fromhex(u"00112233445566778899aabbccddeeff"))
+    l_cipher = str(bytearray(l_aes.encrypt_block(list(bytearray(l_plain)))))
+    assert l_cipher == str(bytearray.fromhex(u"69c4e0d86a7b0430d8cdb78070b4c55a"))
+    assert str(bytearray(l_aes.decrypt_block(list(bytearray(l_cipher))))) == l_plain
+
+
+def test_session_setup():
+    l_bmc = StandInBMC()
+    try:
+        l_lan = OpTestIPMILan('127.0.0.1', USER, PASSWD, l_bmc.cv_port)
+        assert l_lan.raw(NETFN_APP, 0x3b, [0x04]) == (0x00, [0x04])
+        assert l_lan.cv_sidc == l_bmc.cv_sidc
+        assert l_lan.cv_k1 == l_bmc.cv_k1
+        l_lan.close()
+        assert l_lan.cv_sock is None
+    finally:
+        l_bmc.stop()
+
+
+def test_session_wrong_password():
+    l_bmc = StandInBMC()
+    try:
+        l_lan = OpTestIPMILan('127.0.0.1', USER, "wrong", l_bmc.cv_port)
+        try:
+            l_lan.raw(NETFN_CHASSIS, 0x01, i_retry=False)
+            assert False, "session opened with a wrong password"
+        except OpTestError, e:
+            assert "RAKP 2 HMAC is invalid" in str(e)
+        assert l_lan.cv_sock is None
+    finally:
+        l_bmc.stop()
+
+
+def test_integrity_confidentiality():
+    l_bmc = StandInBMC()
+    try:
+        l_lan = OpTestIPMILan('127.0.0.1', USER, PASSWD, l_bmc.cv_port)
+        l_payload = '\x81\x1c\x63\x20\x04\x01\x00\x01\x00\x00\xdb'
+        assert l_lan.raw(NETFN_CHASSIS, 0x01) == (0x00, [0x01, 0x00, 0x00])
+        # The request went out signed and encrypted, the stand-in asserts
+        # the HMAC, and the plain IPMI message never was on the wire
+        l_type, l_req = l_bmc.cv_requests[-1]
+        assert l_type == 0xc0 | PAYLOAD_IPMI
+        assert bytearray(l_req)[5] == 0x01
+
+        # A reply that was tampered with is dropped
+        l_pkt = l_bmc.sign(PAYLOAD_IPMI, l_payload)
+        assert l_lan._parse(l_pkt) == (PAYLOAD_IPMI, l_payload)
+        assert l_payload not in l_pkt
+        for l_i in (8, 20, len(l_pkt) - 1):
+            l_bad = l_pkt[:l_i] + chr(ord(l_pkt[l_i]) ^ 0x01) + l_pkt[l_i + 1:]
+            assert l_lan._parse(l_bad) is None
+        # and so is an unsigned one, once the session is up
+        l_k1, l_bmc.cv_k1 = l_bmc.cv_k1, None
+        l_clear = l_bmc.sign(PAYLOAD_IPMI, l_payload)
+        l_bmc.cv_k1 = l_k1
+        assert l_lan._parse(l_clear) is None
+        l_lan.close()
+    finally:
+        l_bmc.stop()
+
+
+def test_chassis_power_status():
+    l_bmc = StandInBMC()
+    try:
+        l_lan = OpTestIPMILan('127.0.0.1', USER, PASSWD, l_bmc.cv_port)
+        assert l_lan.is_supported("chassis power status")
+        assert l_lan.run("chassis power status") == "Chassis Power is on\n"
+        l_bmc.cv_power = 0x00
+        assert l_lan.run("chassis power status") == "Chassis Power is off\n"
+        l_lan.close()
+    finally:
+        l_bmc.stop()
+
+
+def test_no_retry_on_new_session():
+    l_bmc = StandInBMC()
+    l_timeout = BMC_CONST.IPMI_LAN_TIMEOUT
+    BMC_CONST.IPMI_LAN_TIMEOUT = 0.1
+    try:
+        l_lan = OpTestIPMILan('127.0.0.1', USER, PASSWD, l_bmc.cv_port)
+        l_bmc.cv_mute.add((NETFN_CHASSIS, 0x02))
+        l_bmc.cv_mute.add((NETFN_CHASSIS, 0x01))
+        # A power off whose reply is lost may have been done, it is not
+        # sent again on a new session
+        try:
+            l_lan.run("chassis power off")
+            assert False, "lost reply not reported"
+        except OpTestError:
+            pass
+        l_sessions = [l_type for l_type, l_payload in l_bmc.cv_requests
+                      if l_type == PAYLOAD_OPEN_SESSION_REQ]
+        assert len(l_sessions) == 1
+        # Reads are
+        try:
+            l_lan.run("chassis power status")
+            assert False, "lost reply not reported"
+        except OpTestError:
+            pass
+        l_sessions = [l_type for l_type, l_payload in l_bmc.cv_requests
+                      if l_type == PAYLOAD_OPEN_SESSION_REQ]
+        assert len(l_sessions) == 3
+        l_lan.close()
+    finally:
+        BMC_CONST.IPMI_LAN_TIMEOUT = l_timeout
+        l_bmc.stop()
+
+
+def test_sdr_elist():
+    l_bmc = StandInBMC()
+    try:
+        l_lan = OpTestIPMILan('127.0.0.1', USER, PASSWD, l_bmc.cv_port)
+        assert l_lan.run("sdr elist") == \
+            "Ambient Temp     | 01h | ok  |  7.1 | 37 degrees C\n" \
+            "Host Status      | 08h | ok  | 34.1 | S0/G0: working\n"
+        # Records are cached, only the readings are asked for again
+        l_count = len(l_bmc.cv_requests)
+        READINGS[0x08][2] = 0x20
+        try:
+            assert l_lan.run("sdr elist").splitlines()[1] == \
+                "Host Status      | 08h | ok  | 34.1 | S5/G2: soft-off"
+        finally:
+            READINGS[0x08][2] = 0x01
+        assert len(l_bmc.cv_requests) - l_count == 2
+        l_lan.close()
+    finally:
+        l_bmc.stop()
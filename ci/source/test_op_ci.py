@@ -57,6 +57,9 @@ def test_pnor_img_transfer():
 def test_pnor_img_flash():
     assert op_ci_bmc.pnor_img_flash() == 0
 
+def test_pnor_img_verify():
+    assert op_ci_bmc.pnor_img_verify() == 0
+
 def test_ipmi_power_on():
     assert op_ci_bmc.ipmi_power_on() == 0
 
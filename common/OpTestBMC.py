@@ -30,17 +30,18 @@
 #  This class encapsulates all function which deals with the BMC in OpenPower
 #  systems
 
-import sys
+import os
+import re
 import time
-import pexpect
-try:
-    import pxssh
-except ImportError:
-    from pexpect import pxssh
-import subprocess
+import errno
+import shutil
 from OpTestIPMI import OpTestIPMI
+from OpTestUtil import OpTestUtil
 from OpTestConstants import OpTestConstants as BMC_CONST
 from OpTestError import OpTestError
+from OpTestFFS import OpTestFFS, ffs_diff, pnor_flashed_image, pnor_flashed_forget
+from OpTestBMCShell import get_bmc_shell, close_bmc_shell
+from OpTestBMCReady import OpTestBMCReady
 
 class OpTestBMC():
 
@@ -52,7 +53,8 @@ class OpTestBMC():
         self.cv_ffdcDir = i_ffdcDir
 
     ##
-    # @brief This function runs a command on the BMC
+    # @brief This function runs a command on the BMC, in the shell kept open
+    #        on it, see OpTestBMCShell
     #
     # @param logFile: File where the command output will be written.
     #        All command output files are placed in the FFDC directory as configured
@@ -65,84 +67,63 @@ class OpTestBMC():
     #
     def _cmd_run(self, cmdStr, timeout=60, logFile=None):
 
-        ''' Add -k to the SSH options '''
-        hostname = self.cv_bmcIP + " -k"
+        l_res = self.bmc_run_command(cmdStr, timeout)
 
-        try:
-            p = pxssh.pxssh()
-            p.logfile = sys.stdout
-            p.PROMPT = '# '
-
-            ''' login but do not try to change the prompt since the AMI bmc
-                busybox does support it '''
-
-            # http://superuser.com/questions/839878/how-to-solve-python-bug-without-root-permission
-            p.login(hostname, self.cv_bmcUser, self.cv_bmcPasswd, login_timeout=timeout, auto_prompt_reset=False)
-            p.sendline()
-            p.prompt(timeout=60)
-            print 'At BMC %s prompt...' % self.cv_bmcIP
-
-            p.sendline(cmdStr)
-            p.prompt(timeout=timeout)
-
-            ''' if optional argument is set, save command output to file '''
-
-            if logFile is not None:
-                fn = self.cv_ffdcDir + "/" + logFile
-                with open(fn, 'w') as f:
-                    f.write(p.before)
-
-            p.sendline('echo $?')
-            index = p.expect(['0', '1', pexpect.TIMEOUT])
-        except:
-            l_msg = "__cmd_run Failed"
-            print sys.exc_info()
-            print l_msg
-            raise OpTestError(l_msg)
+        ''' if optional argument is set, save command output to file '''
 
-        if index == 0:
-            rc = 0
-        elif index == 1:
-            l_msg = "pflash not on BMC"
+        if logFile is not None:
+            fn = self.cv_ffdcDir + "/" + logFile
+            with open(fn, 'w') as f:
+                f.write(l_res.cv_output)
+
+        if l_res.cv_exitCode is None:
+            l_msg = "__cmd_run Failed, %s did not finish" % cmdStr
             print l_msg
             raise OpTestError(l_msg)
-        elif index == 2:
-            l_msg = 'Non-zero return code detected, command failed'
+        elif l_res.cv_exitCode != 0:
+            l_msg = 'Non-zero return code %d detected, command failed' % l_res.cv_exitCode
             print l_msg
             raise OpTestError(l_msg)
-            #rc = p.before
 
-        return rc
+        return 0
+
+    ##
+    # @brief Runs a command on the BMC, in the shell kept open on it
+    #
+    # @param i_cmd @type string: command to run
+    # @param i_timeout @type int: seconds to wait for the command to finish
+    #
+    # @return l_res @type OpTestConsoleResult: exit status, output and time of
+    #         the command, the exit status is None if it did not finish, or
+    #         raise OpTestError if the BMC can't be logged into
+    #
+    def bmc_run_command(self, i_cmd, i_timeout=BMC_CONST.BMC_SHELL_CMD_TIMEOUT):
+        return get_bmc_shell(self.cv_bmcIP, self.cv_bmcUser, self.cv_bmcPasswd).run(
+            i_cmd, i_timeout)
 
     ##
     # @brief This function issues the reboot command on the BMC console.  It then
-    #    pings the BMC until it responds, which presumably means that it is done
-    #    rebooting.  It returns the number of failed pings.  The caller should make
-    #    returned value is greater than 1
+    #    follows the BMC through the reboot until it is ready again, see
+    #    OpTestBMCReady.
+    #
+    # @param i_ipmi @type OpTestIPMI: optional, to also wait for the BMC to
+    #        answer IPMI and populate its sensor repository
     #
     # @return BMC_CONST.FW_SUCCESS on success and
     #         raise OpTestError on failure
     #
-    def reboot(self):
+    def reboot(self, i_ipmi=None):
 
-        retries = 0
-        self._cmd_run('reboot', logFile='bmc_reboot.log')
+        # The shell goes away with the BMC, so reboot has no exit status
+        l_res = self.bmc_run_command('reboot', BMC_CONST.BMC_SHELL_PROMPT_TIMEOUT)
+        with open(self.cv_ffdcDir + "/bmc_reboot.log", 'w') as f:
+            f.write(l_res.cv_output)
+        close_bmc_shell(self.cv_bmcIP)
         print 'Sent reboot command now waiting for reboot to complete...'
-        time.sleep(BMC_CONST.HOST_REBOOT_DELAY)
-        '''  Ping the system until it reboots  '''
-        while True:
-            try:
-                subprocess.check_call(["ping", self.cv_bmcIP, "-c1"])
-                break
-            except subprocess.CalledProcessError as e:
-                print "Ping return code: ", e.returncode, "retrying..."
-                retries += 1
-                time.sleep(BMC_CONST.HOST_REBOOT_DELAY)
-
-            if retries > 5:
-                l_msg = "Error. BMC is not responding to pings"
-                print l_msg
-                raise OpTestError(l_msg)
+        if i_ipmi is not None:
+            i_ipmi.ipmi_wait_for_bmc_ready()
+        else:
+            OpTestBMCReady(self.cv_bmcIP).wait()
 
         print 'BMC reboot complete.'
 
@@ -151,24 +132,26 @@ class OpTestBMC():
     ##
     # @brief This function copies the PNOR image to the BMC /tmp dir
     #
-    # @return the rsync command return code
+    # @return BMC_CONST.FW_SUCCESS or raise OpTestError
     #
     def pnor_img_transfer(self,i_imageDir,i_imageName):
 
-        pnor_path = i_imageDir + i_imageName
-        rsync_cmd = 'rsync -v -e "ssh -k" %s %s@%s:/tmp' % (pnor_path,
-                                                            self.cv_bmcUser,
-                                                            self.cv_bmcIP)
+        self._bmc_copy(i_imageDir + i_imageName, '/tmp/', BMC_CONST.SCP_TO_REMOTE)
+        return BMC_CONST.FW_SUCCESS
 
-        print rsync_cmd
-        rsync = pexpect.spawn(rsync_cmd)
-        rsync.logfile = sys.stdout
-        rsync.expect('assword: ')
-        rsync.sendline(self.cv_bmcPasswd)
-        rsync.expect('total size is', timeout=60)
-        rsync.expect(pexpect.EOF)
-        rsync.close()
-        return rsync.exitstatus
+    ##
+    # @brief Copies a file to or from the BMC. The copy is checked with SHA-256
+    #        and an interrupted copy is resumed, see OpTestUtil.copyFilesToDest()
+    #
+    # @param i_local @type string: local file or directory
+    # @param i_remote @type string: file or directory on the BMC
+    # @param i_function @type int: BMC_CONST.SCP_TO_REMOTE or BMC_CONST.SCP_TO_LOCAL
+    #
+    # @return path of the copied file or raise OpTestError
+    #
+    def _bmc_copy(self, i_local, i_remote, i_function):
+        return OpTestUtil().copyFilesToDest(i_local, self.cv_bmcUser, self.cv_bmcIP,
+                                            i_remote, self.cv_bmcPasswd, "2", i_function)
 
 
     ##
@@ -190,10 +173,185 @@ class OpTestBMC():
     # @return pflash command return code
     #
     def pnor_img_flash(self, i_pflash_dir, i_imageName):
+        self.pnor_img_forget()
         cmd = i_pflash_dir + '/pflash -e -f -p /tmp/%s' % i_imageName
         rc = self._cmd_run(cmd, timeout=1800, logFile='pflash.log')
         return rc
 
+    ##
+    # @brief Reads the whole PNOR flash back with the pflash tool and copies it
+    #        from the BMC
+    #
+    # @param i_pflash_dir @type string: directory where pflash tool is present.
+    # @param i_localPath @type string: where to store the flash contents
+    #
+    # @return BMC_CONST.FW_SUCCESS or raise OpTestError
+    #
+    def pnor_img_readback(self, i_pflash_dir, i_localPath):
+        l_remote = '/tmp/' + BMC_CONST.PNOR_READBACK_NAME
+        cmd = i_pflash_dir + '/pflash -r %s' % l_remote
+        l_done = False
+        try:
+            self._cmd_run(cmd, timeout=1800, logFile='pflash_readback.log')
+            self._bmc_copy(i_localPath, l_remote, BMC_CONST.SCP_TO_LOCAL)
+            l_done = True
+        finally:
+            # The BMC /tmp is in memory, a partial read back is removed too
+            try:
+                self._cmd_run('rm -f ' + l_remote)
+            except OpTestError:
+                # Don't hide why the read back failed
+                if l_done:
+                    raise
+        return BMC_CONST.FW_SUCCESS
+
+    ##
+    # @brief Checks what landed on the PNOR flash after pnor_img_flash(), by
+    #        comparing a read back of the flash with the image partition by
+    #        partition. Partitions the firmware writes to are not compared,
+    #        see OpTestFFS.ffs_diff().
+    #
+    # @param i_pflash_dir @type string: directory where pflash tool is present.
+    # @param i_imageDir @type string: directory of the image that was flashed
+    # @param i_imageName @type string: Name of the image file
+    #
+    # @return BMC_CONST.FW_SUCCESS or raise OpTestError
+    #
+    def pnor_img_verify(self, i_pflash_dir, i_imageDir, i_imageName):
+        # The image directory is shared by the machines of a platform
+        l_readback = os.path.join(i_imageDir, "%s.%s" % (self.cv_bmcIP,
+                                                         BMC_CONST.PNOR_READBACK_NAME))
+        self.pnor_img_readback(i_pflash_dir, l_readback)
+        try:
+            l_diff = ffs_diff(os.path.join(i_imageDir, i_imageName), l_readback)
+        finally:
+            os.remove(l_readback)
+        if l_diff:
+            # pnor_img_flash_delta() can't trust the flash to hold the image
+            self.pnor_img_forget()
+            l_msg = "PNOR partitions differ from %s after flashing: %s" % (
+                i_imageName, ", ".join(l_diff))
+            print l_msg
+            raise OpTestError(l_msg)
+        print "PNOR flash matches %s" % i_imageName
+        return BMC_CONST.FW_SUCCESS
+
+    ##
+    # @brief Flashes only the partitions of a PNOR image that changed, instead
+    #        of erasing and writing the whole flash like pnor_img_flash(). The
+    #        image is compared with the last one flashed on this BMC, or with a
+    #        read back of the flash when there is none or the flash no longer
+    #        holds it. The whole image is flashed when the partition table
+    #        changed.
+    #        The image must already be on the BMC, see pnor_img_transfer().
+    #        Partitions the firmware writes to keep their contents, see
+    #        OpTestFFS.ffs_diff().
+    #
+    # @param i_pflash_dir @type string: directory where pflash tool is present.
+    # @param i_imageDir @type string: directory of the image to flash
+    # @param i_imageName @type string: Name of the image file
+    #
+    # @return pflash command return code or raise OpTestError
+    #
+    def pnor_img_flash_delta(self, i_pflash_dir, i_imageDir, i_imageName):
+        l_image = os.path.join(i_imageDir, i_imageName)
+        l_last = self._pnor_img_last()
+        if os.path.isfile(l_last) and not self._pnor_img_on_flash(i_pflash_dir, l_last):
+            print "The PNOR of %s was written since the last delta flash" % self.cv_bmcIP
+            self.pnor_img_forget()
+        if not os.path.isfile(l_last):
+            print "No image flashed on %s is known, reading the flash back" % self.cv_bmcIP
+            self.pnor_img_readback(i_pflash_dir, l_last)
+        try:
+            l_diff = ffs_diff(l_image, l_last)
+        except OpTestError:
+            l_diff = None
+        if l_diff is None or BMC_CONST.PNOR_TOC_PART in l_diff:
+            print "Partition table of %s changed, flashing the whole image" % i_imageName
+            rc = self.pnor_img_flash(i_pflash_dir, i_imageName)
+        elif not l_diff:
+            print "No partition of %s changed, nothing to flash" % i_imageName
+            return BMC_CONST.FW_SUCCESS
+        else:
+            print "Flashing the changed partitions of %s: %s" % (i_imageName, ", ".join(l_diff))
+            # Partitions are written raw at their offset, ECC bytes included,
+            # as pflash -p does for the whole image
+            l_cmds = []
+            with OpTestFFS(l_image) as l_ffs:
+                for l_name in l_diff:
+                    l_part = l_ffs.partition(l_name)
+                    # Partitions are sliced one at a time, the BMC /tmp is in memory
+                    l_cmds.append("dd if=/tmp/%s of=/tmp/%s bs=%d skip=%d count=%d 2>/dev/null && "
+                                  "%s/pflash -e -f -a 0x%x -p /tmp/%s && rm -f /tmp/%s" % (
+                                      i_imageName, l_name, l_ffs.cv_blockSize,
+                                      l_part.cv_offset / l_ffs.cv_blockSize,
+                                      l_part.cv_size / l_ffs.cv_blockSize, i_pflash_dir,
+                                      l_part.cv_offset, l_name, l_name))
+            l_cmd = "(%s); l_rc=$?; rm -f %s; (exit $l_rc)" % (
+                " && ".join(l_cmds), " ".join(["/tmp/" + l_name for l_name in l_diff]))
+            # A partial write leaves the flash holding neither image
+            self.pnor_img_forget()
+            rc = self._cmd_run(l_cmd, timeout=1800, logFile='pflash.log')
+        shutil.copyfile(l_image, l_last)
+        return rc
+
+    ##
+    # @brief Forgets which image was flashed on this BMC, so that the next
+    #        pnor_img_flash_delta() compares with the flash itself. To be used
+    #        after the PNOR was updated some other way.
+    #
+    def pnor_img_forget(self):
+        pnor_flashed_forget(self.cv_bmcIP)
+
+    def _pnor_img_last(self):
+        # Workers testing other machines may create it at the same time
+        try:
+            os.makedirs(BMC_CONST.PNOR_FLASHED_DIR)
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+        return pnor_flashed_image(self.cv_bmcIP)
+
+    ##
+    # @brief Checks that the flash still holds an image, without copying the
+    #        flash from the BMC. The flash is read on the BMC and its partition
+    #        table and partitions are hashed there, then compared with the
+    #        image. Partitions the firmware writes to are not compared, see
+    #        OpTestFFS.ffs_diff().
+    #
+    # @param i_pflash_dir @type string: directory where pflash tool is present.
+    # @param i_image @type string: local copy of the image
+    #
+    # @return True if the flash holds the image, else False
+    #
+    def _pnor_img_on_flash(self, i_pflash_dir, i_image):
+        l_remote = '/tmp/' + BMC_CONST.PNOR_READBACK_NAME
+        try:
+            l_ffs = OpTestFFS(i_image)
+        except OpTestError:
+            return False
+        with l_ffs:
+            l_want = dict([(l_part.cv_name, l_ffs.digest(l_part.cv_name))
+                           for l_part in l_ffs.compared_partitions()])
+            l_cmds = ["echo pnor_sha1 %s $(dd if=%s bs=%d skip=%d count=%d 2>/dev/null | sha1sum)" % (
+                          l_part.cv_name, l_remote, l_ffs.cv_blockSize,
+                          l_part.cv_offset / l_ffs.cv_blockSize,
+                          l_part.cv_size / l_ffs.cv_blockSize)
+                      for l_part in l_ffs.compared_partitions()]
+        # The BMC /tmp is in memory, the read back is removed in any case
+        l_cmd = "(%s/pflash -r %s >/dev/null && %s); l_rc=$?; rm -f %s; (exit $l_rc)" % (
+            i_pflash_dir, l_remote, " && ".join(l_cmds), l_remote)
+        l_res = self.bmc_run_command(l_cmd, 1800)
+        if l_res.cv_exitCode != 0:
+            print "Reading the PNOR flash of %s failed" % self.cv_bmcIP
+            return False
+        l_have = dict(re.findall(r"^pnor_sha1 (\S+) ([0-9a-f]{40})\b", l_res.cv_output, re.M))
+        l_diff = [l_name for l_name in l_want if l_have.get(l_name) != l_want[l_name]]
+        if l_diff:
+            print "PNOR partitions of %s differ from the last image flashed: %s" % (
+                self.cv_bmcIP, ", ".join(l_diff))
+        return not l_diff
+
 
     ##
     # @brief Executes a command onto the BMC
@@ -207,13 +365,21 @@ class OpTestBMC():
         l_retries = 0
         print ("Executing command: " + i_cmd)
         while True:
+            # Only retry when the BMC did not answer, a command that
+            # failed would just fail again
             try:
-                l_rc = self._cmd_run(i_cmd)
-                return l_rc
+                l_res = self.bmc_run_command(i_cmd)
             except OpTestError as e:
-                print("Executing failed. Retring command: " + i_cmd)
-                l_retries += 1
-                time.sleep(BMC_CONST.SHORT_WAIT_IPL)
+                l_res = None
+            if l_res is not None and l_res.cv_exitCode == 0:
+                return 0
+            elif l_res is not None and l_res.cv_exitCode is not None:
+                l_msg = "Error. %s failed on the BMC with exit code %d" % (i_cmd, l_res.cv_exitCode)
+                print l_msg
+                raise OpTestError(l_msg)
+            print("Executing failed. Retring command: " + i_cmd)
+            l_retries += 1
+            time.sleep(BMC_CONST.SHORT_WAIT_IPL)
 
             if l_retries > BMC_CONST.CMD_RETRY_BMC:
                 l_msg = "Error. Failed to execute command onto the BMC"
@@ -0,0 +1,125 @@
+#!/usr/bin/python
+# IBM_PROLOG_BEGIN_TAG
+# This is an automatically generated prolog.
+#
+# $Source: op-test-framework/common/OpTestBMCReady.py $
+#
+# OpenPOWER Automated Test Project
+#
+# Contributors Listed Below - COPYRIGHT 2015
+# [+] International Business Machines Corp.
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+#
+# IBM_PROLOG_END_TAG
+
+## @package OpTestBMCReady
+#  Readiness of a BMC after a reboot or reset
+#
+#  A BMC reset used to be followed by a fixed sleep of a couple of minutes.
+#  The BMC is followed through the reset instead, and the wait ends as soon
+#  as it serves requests again:
+#
+#    BMC_CONST.BMC_READY_DOWN     it stopped answering ping or ssh
+#    BMC_CONST.BMC_READY_NETWORK  it answers ping again
+#    BMC_CONST.BMC_READY_SSH      its ssh port is open
+#    BMC_CONST.BMC_READY_IPMI     "mc info" answers
+#    BMC_CONST.BMC_READY_SDR      the sensor repository is populated
+
+import time
+import subprocess
+
+from OpTestConstants import OpTestConstants as BMC_CONST
+from OpTestError import OpTestError
+from OpTestUtil import OpTestUtil
+
+
+class OpTestBMCReady():
+
+    ##
+    # @brief Initialize this object
+    #
+    # @param i_bmcIP @type string: IP Address of the BMC
+    # @param i_ipmiRun @type function: runs ipmitool arguments, e.g. "mc info",
+    #        and returns the output. Without it the wait ends with the ssh port.
+    #
+    def __init__(self, i_bmcIP, i_ipmiRun=None):
+        self.cv_bmcIP = i_bmcIP
+        self.cv_ipmiRun = i_ipmiRun
+        self.util = OpTestUtil()
+        self.cv_timings = []
+
+    ##
+    # @brief Waits for the BMC to go down and come back up, phase by phase
+    #
+    # @param i_timeout @type int: seconds for the BMC to be ready
+    # @param i_waitDown @type bool: wait for the BMC to go down first, for
+    #        resets that were just issued. A BMC that is not seen going down
+    #        within BMC_CONST.BMC_READY_DOWN_TIMEOUT is taken as already back.
+    #
+    # @return l_timings @type list: (phase, seconds since the wait started)
+    #         tuples, or raise OpTestError when a phase is not reached in time
+    #
+    def wait(self, i_timeout=BMC_CONST.BMC_READY_TIMEOUT, i_waitDown=True):
+        self.cv_timings = []
+        l_start = time.time()
+        l_deadline = l_start + i_timeout
+        if i_waitDown:
+            l_downDeadline = min(l_deadline, l_start + BMC_CONST.BMC_READY_DOWN_TIMEOUT)
+            if self._poll(lambda: not self._ping() or not self._ssh(), l_downDeadline):
+                self.cv_timings.append((BMC_CONST.BMC_READY_DOWN, time.time() - l_start))
+            else:
+                print "BMC %s was not seen going down" % self.cv_bmcIP
+
+        l_phases = [(BMC_CONST.BMC_READY_NETWORK, self._ping),
+                    (BMC_CONST.BMC_READY_SSH, self._ssh)]
+        if self.cv_ipmiRun is not None:
+            l_phases += [(BMC_CONST.BMC_READY_IPMI, self._ipmi),
+                         (BMC_CONST.BMC_READY_SDR, self._sdr)]
+        for l_phase, l_probe in l_phases:
+            if not self._poll(l_probe, l_deadline):
+                l_msg = "BMC %s not ready after %ds, waiting for %s" % (
+                    self.cv_bmcIP, i_timeout, l_phase)
+                print l_msg
+                raise OpTestError(l_msg)
+            self.cv_timings.append((l_phase, time.time() - l_start))
+        print "BMC %s ready: %s" % (self.cv_bmcIP, ", ".join(
+            ["%s %.1fs" % l_timing for l_timing in self.cv_timings]))
+        return list(self.cv_timings)
+
+    def _poll(self, i_probe, i_deadline):
+        while True:
+            l_started = time.time()
+            try:
+                if i_probe():
+                    return True
+            except OpTestError:
+                pass
+            if time.time() >= i_deadline:
+                return False
+            time.sleep(max(0, BMC_CONST.BMC_READY_POLL_INTERVAL - (time.time() - l_started)))
+
+    def _ping(self):
+        return subprocess.call("ping -c 1 -W 1 %s >/dev/null 2>&1" % self.cv_bmcIP,
+                               shell=True) == 0
+
+    def _ssh(self):
+        return self.util.tcp_probe(self.cv_bmcIP, BMC_CONST.HOST_SSH_PORT)
+
+    def _ipmi(self):
+        return "Device ID" in self.cv_ipmiRun("mc info")
+
+    def _sdr(self):
+        return len([l_line for l_line in self.cv_ipmiRun("sdr elist").splitlines()
+                    if '|' in l_line]) > 0
@@ -0,0 +1,217 @@
+#!/usr/bin/python
+# IBM_PROLOG_BEGIN_TAG
+# This is an automatically generated prolog.
+#
+# $Source: op-test-framework/common/OpTestBMCShell.py $
+#
+# OpenPOWER Automated Test Project
+#
+# Contributors Listed Below - COPYRIGHT 2015
+# [+] International Business Machines Corp.
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+#
+# IBM_PROLOG_END_TAG
+
+## @package OpTestBMCShell
+#  Shared shell session on a BMC
+#
+#  Every BMC command used to be a new ssh login. One shell is kept logged
+#  in per BMC for the whole run instead, and logged into again when it went
+#  away, e.g. after a BMC reboot. Each command is framed by markers, so its
+#  output and exit status are read exactly, see OpTestConsoleResult.
+
+import os
+import re
+import sys
+import time
+import threading
+import pexpect
+try:
+    import pxssh
+except ImportError:
+    from pexpect import pxssh
+
+from OpTestConstants import OpTestConstants as BMC_CONST
+from OpTestError import OpTestError
+from OpTestConsoleManager import OpTestConsoleResult
+
+# Shells are shared by every object talking to the same BMC
+g_shells = {}
+g_shellsLock = threading.Lock()
+
+##
+# @brief Returns the shell of a BMC, creating it on first use. The BMC is only
+#        logged into by the first command.
+#
+# @param i_bmcIP @type string: IP Address of the BMC
+# @param i_bmcUser @type string: Userid to log into the BMC
+# @param i_bmcPasswd @type string: Password of the userid
+#
+# @return l_shell @type OpTestBMCShell
+#
+def get_bmc_shell(i_bmcIP, i_bmcUser, i_bmcPasswd):
+    with g_shellsLock:
+        l_shell = g_shells.get(i_bmcIP)
+        if l_shell is None:
+            l_shell = OpTestBMCShell(i_bmcIP, i_bmcUser, i_bmcPasswd)
+            g_shells[i_bmcIP] = l_shell
+        return l_shell
+
+##
+# @brief Closes the shell of a BMC if there is one, e.g. when the BMC is reset
+#
+# @param i_bmcIP @type string: IP Address of the BMC
+#
+def close_bmc_shell(i_bmcIP):
+    with g_shellsLock:
+        l_shell = g_shells.get(i_bmcIP)
+    if l_shell is not None:
+        l_shell.close()
+
+
+class OpTestBMCShell():
+
+    ##
+    # @brief Initialize this object
+    #
+    # @param i_bmcIP @type string: IP Address of the BMC
+    # @param i_bmcUser @type string: Userid to log into the BMC
+    # @param i_bmcPasswd @type string: Password of the userid
+    #
+    def __init__(self, i_bmcIP, i_bmcUser, i_bmcPasswd):
+        self.cv_bmcIP = i_bmcIP
+        self.cv_bmcUser = i_bmcUser
+        self.cv_bmcPasswd = i_bmcPasswd
+        self.cv_session = None
+        self.cv_frameId = 0
+        self.cv_lock = threading.RLock()
+
+    ##
+    # @brief Runs a command in the shell, logging in first if needed. A
+    #        command that could not be sent because the shell was gone is
+    #        sent again once on a new login. A command that was sent is never
+    #        sent again, it may have run already, e.g. pflash -e or reboot.
+    #
+    # @param i_cmd @type string: command, without the echo $? of old
+    # @param i_timeout @type int: seconds to wait for the command to finish
+    #
+    # @return l_res @type OpTestConsoleResult: the exit status is None if the
+    #         command did not finish in time or the BMC went away, the shell is
+    #         then logged out. raise OpTestError if the BMC can't be logged into.
+    #
+    def run(self, i_cmd, i_timeout=BMC_CONST.BMC_SHELL_CMD_TIMEOUT):
+        with self.cv_lock:
+            for l_try in range(2):
+                if self.cv_session is None or not self.cv_session.isalive():
+                    self._connect()
+                l_res = self._run(i_cmd, i_timeout)
+                if l_res is not None:
+                    return l_res
+                print "BMC: shell of %s went away, logging in again" % self.cv_bmcIP
+                self._close()
+            return OpTestConsoleResult(None, "", 0)
+
+    ##
+    # @brief Logs out of the BMC, the next command logs in again
+    #
+    def close(self):
+        with self.cv_lock:
+            self._close()
+
+    def _run(self, i_cmd, i_timeout):
+        # Returns None when the command could not even be sent
+        self.cv_frameId += 1
+        l_tag = "%d_%d" % (os.getpid(), self.cv_frameId)
+        l_begin = BMC_CONST.IPMI_CONSOLE_FRAME_BEGIN + l_tag
+        l_end = BMC_CONST.IPMI_CONSOLE_FRAME_END + l_tag
+        # Split the markers with quotes, so the echo of the command line
+        # itself can't match them. The command goes in a group on its own
+        # line, so a trailing ; or & or a comment can't break the frame.
+        l_cmd = "echo %s''%s; { %s\n}; echo %s''%s $?" % (l_begin[:4], l_begin[4:],
+                                                          i_cmd.rstrip(),
+                                                          l_end[:4], l_end[4:])
+        l_start = time.time()
+        try:
+            self.cv_session.sendline(l_cmd)
+        except (pexpect.ExceptionPexpect, OSError):
+            return None
+        try:
+            l_rc = self.cv_session.expect([re.escape(l_begin) + r"\r?\n",
+                                           pexpect.TIMEOUT, pexpect.EOF],
+                                          timeout=BMC_CONST.BMC_SHELL_PROMPT_TIMEOUT)
+            if l_rc == 2:
+                print "BMC: shell of %s went away while running %s" % (self.cv_bmcIP, i_cmd)
+                self._close()
+                return OpTestConsoleResult(None, "", time.time() - l_start)
+            if l_rc == 0:
+                l_rc = self.cv_session.expect([re.escape(l_end) + r" (\d+)",
+                                               pexpect.TIMEOUT, pexpect.EOF], timeout=i_timeout)
+            else:
+                # The shell is busy or slow, the begin marker is just late
+                l_rc = self.cv_session.expect([re.escape(l_end) + r" (\d+)",
+                                               pexpect.TIMEOUT, pexpect.EOF],
+                                              timeout=max(i_timeout - BMC_CONST.BMC_SHELL_PROMPT_TIMEOUT, 1))
+        except (pexpect.ExceptionPexpect, OSError), e:
+            print "BMC: command on %s failed: %s" % (self.cv_bmcIP, str(e))
+            self._close()
+            return OpTestConsoleResult(None, "", time.time() - l_start)
+        l_elapsed = time.time() - l_start
+        l_output = self.cv_session.before
+        l_index = l_output.rfind(l_begin)
+        if l_index >= 0:
+            l_output = l_output[l_index + len(l_begin):]
+        if l_rc != 0:
+            # Whatever the command is doing, the shell can't be trusted
+            # to be at the prompt any more
+            print "BMC: %s did not finish on %s" % (i_cmd, self.cv_bmcIP)
+            self._close()
+            return OpTestConsoleResult(None, l_output.strip('\r\n'), l_elapsed)
+        l_exitCode = int(self.cv_session.match.group(1))
+        # Eat the prompt, the next command must not see it
+        try:
+            self.cv_session.prompt(timeout=BMC_CONST.BMC_SHELL_PROMPT_TIMEOUT)
+        except pexpect.ExceptionPexpect:
+            pass
+        return OpTestConsoleResult(l_exitCode, l_output.strip('\r\n'), l_elapsed)
+
+    def _connect(self):
+        self._close()
+        ''' Add -k to the SSH options '''
+        l_hostname = self.cv_bmcIP + " -k"
+        try:
+            l_session = pxssh.pxssh()
+            l_session.logfile = sys.stdout
+            l_session.PROMPT = '# '
+            ''' login but do not try to change the prompt since the AMI bmc
+                busybox does support it '''
+            l_session.login(l_hostname, self.cv_bmcUser, self.cv_bmcPasswd,
+                            login_timeout=BMC_CONST.BMC_SHELL_LOGIN_TIMEOUT,
+                            auto_prompt_reset=False)
+            l_session.sendline()
+            l_session.prompt(timeout=BMC_CONST.BMC_SHELL_LOGIN_TIMEOUT)
+        except (pexpect.ExceptionPexpect, pxssh.ExceptionPxssh), e:
+            l_msg = "BMC: can't log into %s: %s" % (self.cv_bmcIP, str(e))
+            print l_msg
+            raise OpTestError(l_msg)
+        print 'At BMC %s prompt...' % self.cv_bmcIP
+        self.cv_session = l_session
+
+    def _close(self):
+        if self.cv_session is not None:
+            try:
+                self.cv_session.close(force=True)
+            except (pexpect.ExceptionPexpect, OSError):
+                pass
+            self.cv_session = None
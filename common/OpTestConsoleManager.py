@@ -0,0 +1,249 @@
+#!/usr/bin/python
+# IBM_PROLOG_BEGIN_TAG
+# This is an automatically generated prolog.
+#
+# $Source: op-test-framework/common/OpTestConsoleManager.py $
+#
+# OpenPOWER Automated Test Project
+#
+# Contributors Listed Below - COPYRIGHT 2015
+# [+] International Business Machines Corp.
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+#
+# IBM_PROLOG_END_TAG
+
+## @package OpTestConsoleManager
+#  Shared SOL console of a machine
+#
+#  Getting a host console used to mean deactivating and activating SOL,
+#  logging in and setting the prompt, with fixed sleeps all along, and
+#  tearing it all down again at the end of the test. The manager keeps one
+#  SOL console per BMC open for the whole run and hands out logical
+#  sessions on top of it. The console is only re-activated when it died,
+#  and the host is only logged into again after it rebooted.
+
+import sys
+import time
+import threading
+import pexpect
+
+from OpTestConstants import OpTestConstants as BMC_CONST
+from OpTestError import OpTestError
+
+# Consoles are shared by every test case talking to the same BMC
+g_managers = {}
+g_managersLock = threading.Lock()
+
+##
+# @brief Returns the console manager of a BMC, creating it on first use
+#
+# @param i_bmcIP @type string: IP Address of the BMC
+#
+# @return l_manager @type OpTestConsoleManager
+#
+def get_console_manager(i_bmcIP):
+    with g_managersLock:
+        l_manager = g_managers.get(i_bmcIP)
+        if l_manager is None:
+            l_manager = OpTestConsoleManager(i_bmcIP)
+            g_managers[i_bmcIP] = l_manager
+        return l_manager
+
+
+class OpTestConsoleResult():
+
+    ##
+    # @brief Initialize this object, see OpTestIPMI.run_host_cmd_on_ipmi_console_framed()
+    #
+    # @param i_exitCode @type int: exit status of the command, None if it did
+    #        not finish, i.e. timed out or the console went away
+    # @param i_output @type string: output of the command, or all of the console
+    #        output since the command was sent if it did not finish
+    # @param i_elapsed @type float: seconds from sending the command to its end
+    #
+    def __init__(self, i_exitCode, i_output, i_elapsed):
+        self.cv_exitCode = i_exitCode
+        self.cv_output = i_output
+        self.cv_elapsed = i_elapsed
+
+    ##
+    # @brief Returns the output split in lines
+    #
+    def lines(self):
+        return self.cv_output.splitlines()
+
+
+class OpTestConsoleSession():
+
+    ##
+    # @brief Initialize this object, see OpTestConsoleManager.acquire().
+    #        A session is used like the pexpect console it stands for.
+    #
+    def __init__(self, i_manager):
+        self.cv_manager = i_manager
+        self.cv_released = False
+
+    def __getattr__(self, i_name):
+        if self.cv_released:
+            l_msg = "IPMI: console session used after it was closed"
+            print l_msg
+            raise OpTestError(l_msg)
+        return getattr(self.cv_manager.cv_con, i_name)
+
+    ##
+    # @brief Finds out where the host console is, see OpTestConsoleManager.probe()
+    #
+    def probe(self):
+        return self.cv_manager.probe()
+
+    ##
+    # @brief Activates the SOL console again, see OpTestConsoleManager.reconnect()
+    #
+    def reconnect(self, i_ipmi):
+        self.cv_manager.reconnect(i_ipmi)
+
+    ##
+    # @brief Records that the unique shell prompt is set on the console
+    #
+    def set_prompt(self):
+        self.cv_manager.cv_prompt = True
+
+    ##
+    # @brief Checks whether the unique shell prompt is still set, as seen by
+    #        the last probe()
+    #
+    def has_prompt(self):
+        return self.cv_manager.cv_prompt
+
+    ##
+    # @brief Hands the session back, the SOL console stays open
+    #
+    def release(self):
+        self.cv_released = True
+
+
+class OpTestConsoleManager():
+
+    ##
+    # @brief Initialize this object
+    #
+    # @param i_bmcIP @type string: IP Address of the BMC
+    #
+    def __init__(self, i_bmcIP):
+        self.cv_bmcIP = i_bmcIP
+        self.cv_con = None
+        self.cv_prompt = False
+        self.cv_lock = threading.RLock()
+
+    ##
+    # @brief Hands out a logical session on the console, activating SOL if
+    #        there is no live console yet
+    #
+    # @param i_ipmi @type OpTestIPMI: used to (re)activate the SOL console
+    #
+    # @return l_session @type OpTestConsoleSession or raise OpTestError
+    #
+    def acquire(self, i_ipmi):
+        with self.cv_lock:
+            if self.cv_con is None or not self.cv_con.isalive():
+                self._connect(i_ipmi)
+            else:
+                print "IPMI: reusing the SOL console of %s" % self.cv_bmcIP
+            return OpTestConsoleSession(self)
+
+    ##
+    # @brief Finds out where the host console is by pressing enter
+    #
+    # @return index in BMC_CONST.IPMI_CONSOLE_EXPECT_ENTER_OUTPUT, or
+    #         BMC_CONST.IPMI_CONSOLE_EXPECT_UNIQUE_PROMPT if the host is logged
+    #         in with the unique shell prompt set
+    #
+    def probe(self):
+        with self.cv_lock:
+            self._drain()
+            self.cv_con.send("\r")
+            l_rc = self.cv_con.expect_exact([BMC_CONST.IPMI_HOST_EXPECT_PEXPECT_PROMPT] +
+                                            BMC_CONST.IPMI_CONSOLE_EXPECT_ENTER_OUTPUT,
+                                            timeout=BMC_CONST.IPMI_CONSOLE_PROBE_TIMEOUT) - 1
+            # The prompt is lost whenever the host is not at it, i.e. rebooted
+            self.cv_prompt = (l_rc == BMC_CONST.IPMI_CONSOLE_EXPECT_UNIQUE_PROMPT)
+            return l_rc
+
+    ##
+    # @brief Activates the SOL console again, when it stopped answering
+    #
+    # @param i_ipmi @type OpTestIPMI: used to activate the SOL console
+    #
+    def reconnect(self, i_ipmi):
+        with self.cv_lock:
+            self._connect(i_ipmi)
+
+    ##
+    # @brief Closes the SOL console for good, the next acquire() activates it
+    #        again
+    #
+    def close(self):
+        with self.cv_lock:
+            if self.cv_con is None:
+                return
+            try:
+                self.cv_con.send('~.')
+                self.cv_con.expect(pexpect.EOF, timeout=BMC_CONST.IPMI_WAIT_FOR_TERMINATING_SESSION)
+            except pexpect.ExceptionPexpect:
+                pass
+            self.cv_con.close(force=True)
+            self.cv_con = None
+            self.cv_prompt = False
+
+    def _drain(self):
+        # Drop what the console printed since it was last used, so that an
+        # old prompt is not taken for the answer
+        l_end = time.time() + BMC_CONST.IPMI_CONSOLE_PROBE_TIMEOUT
+        try:
+            while time.time() < l_end:
+                self.cv_con.read_nonblocking(BMC_CONST.SOL_CAPTURE_READ_SIZE,
+                                             timeout=BMC_CONST.IPMI_CON_DELAY_BEFORE_SEND)
+        except (pexpect.TIMEOUT, pexpect.EOF):
+            pass
+        self.cv_con.buffer = ''
+
+    def _connect(self, i_ipmi):
+        if self.cv_con is not None:
+            print "IPMI: SOL console of %s is gone, activating it again" % self.cv_bmcIP
+            self.cv_con.close(force=True)
+            self.cv_con = None
+        self.cv_prompt = False
+        i_ipmi.ipmi_sol_deactivate()
+        # Waiting for a small time interval as latter versions of ipmi takes a bit of time to deactivate.
+        time.sleep(BMC_CONST.IPMI_SOL_DEACTIVATE_TIME)
+        l_con = i_ipmi.ipmi_sol_activate()
+        count = 0
+        while True:
+            l_rc = l_con.expect_exact(BMC_CONST.IPMI_SOL_CONSOLE_ACTIVATE_OUTPUT,
+                                      timeout=BMC_CONST.IPMI_SOL_ACTIVATE_TIMEOUT)
+            if l_rc == 0:
+                print "IPMI: sol console activated"
+                break
+            count += 1
+            if count > BMC_CONST.IPMI_SOL_ACTIVATE_RETRIES:
+                l_msg = "IPMI: not able to get sol console"
+                print l_msg
+                raise OpTestError(l_msg)
+            l_con.close(force=True)
+            time.sleep(BMC_CONST.IPMI_SOL_ACTIVATE_TIME)
+            l_con = i_ipmi.ipmi_sol_activate()
+        l_con.logfile = sys.stdout
+        l_con.delaybeforesend = BMC_CONST.IPMI_CON_DELAY_BEFORE_SEND
+        self.cv_con = l_con
@@ -38,6 +38,7 @@ class OpTestConstants():
     FIRESTONE = "firestone"
     PALMETTO = "palmetto"
     GARRISON = 'garrison'
+    PLATFORMS = [HABANERO, FIRESTONE, PALMETTO, GARRISON]
 
     # BMC COMMANDS
     BMC_COLD_RESET = " mc reset cold"
@@ -65,8 +66,12 @@ class OpTestConstants():
     BMC_SOL_ACTIVATE = " sol activate"
     BMC_SOL_DEACTIVATE = " sol deactivate"
     BMC_GET_OS_RELEASE = "cat /etc/os-release"
+    HOST_GET_BOOT_ID = "cat /proc/sys/kernel/random/boot_id"
+    HOST_GET_COMPATIBLE = "tr '\\000' ',' < /proc/device-tree/compatible"
     BMC_SEL_LIST = 'sel list'
     BMC_SDR_ELIST = 'sdr elist'
+    BMC_SDR_DUMP = 'sdr dump '
+    BMC_GET_DEVICE_ID = 'raw 0x06 0x01'
     BMC_BOOT_COUNT_2 = 'raw 0x04 0x30 xx 0x01 0x00 0x2 0x00' # (replace xx with boot count sensor)
     BMC_BIOS_GOLDEN_SENSOR_TO_PRIMARY = 'raw 0x04 0x30 xx 0x01 0x00 0x00 0 0 0 0 0 0' #Sets sensor to 0 (replace xx with bios golden sensor)
     BMC_BIOS_GOLDEN_SENSOR_TO_GOLDEN = 'raw 0x04 0x30 xx 0x01 0x00 0x01 0 0 0 0 0 0' #Sets sensor to 1 (replace xx with bios golden sensor)
@@ -91,6 +96,15 @@ class OpTestConstants():
     # TIME DELAYS & RETRIES
     BMC_WARM_RESET_DELAY = 150
     BMC_COLD_RESET_DELAY = 150
+    # Readiness of the BMC after a reset, see OpTestBMCReady
+    BMC_READY_TIMEOUT = 600
+    BMC_READY_DOWN_TIMEOUT = 60
+    BMC_READY_POLL_INTERVAL = 2
+    BMC_READY_DOWN = "down"
+    BMC_READY_NETWORK = "network"
+    BMC_READY_SSH = "ssh"
+    BMC_READY_IPMI = "ipmi"
+    BMC_READY_SDR = "sdr"
     HOST_BRINGUP_TIME = 80
     SHORT_WAIT_IPL = 10
     SHORT_WAIT_STANDBY_DELAY = 5
@@ -102,6 +116,27 @@ class OpTestConstants():
     OS_TELNET_WAIT = 20
     CHECKSTOP_ERROR_DELAY = 150
     SYSTEM_STANDBY_STATE_DELAY = 120
+    HOST_UP_TIMEOUT = 600
+    HOST_SSH_PORT = 22
+    HOST_SSH_MASTER_TIMEOUT = 60
+    HOST_SSH_MASTER_RETRY = 60
+    HOST_SSH_ALIVE_INTERVAL = 5
+    HOST_SSH_CMD_TIMEOUT = 1500
+    HOST_SSH_READ_SIZE = 65536
+    HOST_SSH_MATCH_OVERLAP = 64
+    HOST_REACHABLE_TTL = 30
+    HOST_REACHABLE_PROBE_INTERVAL = 10
+    HOST_REACHABLE_PROBE_TIMEOUT = 2
+
+    # OpTestSystem.wait_for() sources and conditions
+    WAIT_SENSOR = "sensor"
+    WAIT_POWER = "power"
+    WAIT_PING = "ping"
+    WAIT_TCP = "tcp"
+    WAIT_SOL = "sol"
+    WAIT_ANY = "any"
+    WAIT_ALL = "all"
+    WAIT_POLL_INTERVAL = 2
 
     PING_RETRY_POWERCYCLE = 7
     PING_RETRY_FOR_STABILITY = 5
@@ -121,6 +156,14 @@ class OpTestConstants():
     CMD_NOT_FOUND = 'command not found'
     CHASSIS_POWER_RESET = "Chassis Power Control: Reset"
     CHASSIS_SOFT_OFF = 'S5/G2: soft-off'
+    CHASSIS_WORKING = 'S0/G0: working'
+
+    # Power states of OpTestSystem, see OpTestSystem.ensure_state()
+    SYS_STATE_OFF = "off"
+    SYS_STATE_STANDBY = "standby"
+    SYS_STATE_IPL = "ipl"
+    SYS_STATE_PETITBOOT = "petitboot"
+    SYS_STATE_OS = "os"
     OS_BOOT_COMPLETE = 'boot completed'
 
     # BMC ACTIVE SIDES
@@ -150,6 +193,10 @@ class OpTestConstants():
     DCMI_POWER_DEACTIVATE = "dcmi power deactivate"
     DCMI_POWER_ACTIVATE = "dcmi power activate"
     OP_CHECK_OCC = "sdr elist |grep 'OCC'"
+    OCC_DEVICE_ENABLED = "Device Enabled"
+    OCC_ENABLE = "opal-prd occ enable"
+    OCC_DISABLE = "opal-prd occ disable"
+    OCC_RESET = "opal-prd occ reset"
     OP_CHECK_PROCESSOR = "sensor list|grep -i proc"
     OP_CHECK_CPU = "sensor list|grep -i cpu"
     OP_CHECK_DIMM = "sensor list|grep -i dimm"
@@ -175,11 +222,48 @@ class OpTestConstants():
     SCP_TO_REMOTE = 1
     SCP_TO_LOCAL = 2
 
+    # File transfers, see OpTestTransfer
+    TRANSFER_BLOCK_SIZE = 1048576
+    TRANSFER_COMPRESS = False
+
     # Constants related to ipmi console interfaces
     IPMI_SOL_ACTIVATE_TIME = 5
     IPMI_SOL_DEACTIVATE_TIME = 10
+    IPMI_SOL_ACTIVATE_TIMEOUT = 120
+    IPMI_SOL_ACTIVATE_RETRIES = 5
     IPMI_WAIT_FOR_TERMINATING_SESSION = 10
     IPMI_CON_DELAY_BEFORE_SEND = 0.9
+    SOL_CAPTURE_BUFFER_SIZE = 1048576
+    SOL_CAPTURE_READ_SIZE = 4096
+    SOL_CAPTURE_READ_TIMEOUT = 1
+    SOL_CAPTURE_MATCH_OVERLAP = 4096
+    SOL_KERNEL_PANIC = r"Kernel panic - not syncing"
+
+    # IPL profile, see OpTestIPLProfile. Milestones in boot order, a
+    # milestone is only taken after the one it follows (None: any time).
+    IPL_PROFILE_ISTEP = r"ISTEP +(\d+)\. *(\d+)(?: - (\w+))?"
+    IPL_PROFILE_HOSTBOOT = "hostboot"
+    IPL_PROFILE_SKIBOOT = "skiboot"
+    IPL_PROFILE_OPAL_INIT = "opal_init"
+    IPL_PROFILE_PETITBOOT = "petitboot"
+    IPL_PROFILE_KERNEL = "kernel"
+    IPL_PROFILE_LOGIN = "login"
+    IPL_PROFILE_MILESTONES = [
+        (IPL_PROFILE_SKIBOOT, r"OPAL [^\r\n]*starting\.\.\.", None),
+        (IPL_PROFILE_OPAL_INIT, r"INIT: Starting kernel at", IPL_PROFILE_SKIBOOT),
+        (IPL_PROFILE_PETITBOOT, r"Petitboot", None),
+        (IPL_PROFILE_KERNEL, r"Linux version", IPL_PROFILE_PETITBOOT),
+        (IPL_PROFILE_LOGIN, r"login: ", None)]
+    IPL_PROFILE_TIMEOUT = 1800
+    IPL_PROFILE_SLOWEST_ISTEPS = 5
+
+    # IPL history, see OpTestIPLHistory. It outlives the runs, whose FFDC
+    # directories are new every time, and is shared by all machines.
+    IPL_HISTORY_DB = "/var/lib/op-test/ipl_history.db"
+    IPL_HISTORY_DB_TIMEOUT = 30
+    IPL_HISTORY_TOTAL = "total"
+    IPL_REGRESSION_PVALUE = 0.05
+    IPL_REGRESSION_MIN_DELTA = 0.05
 
     IPMI_SOL_CONSOLE_ACTIVATE_OUTPUT = ["[SOL Session operational.  Use ~? for help]\r\n", \
         "Error: Unable to establish IPMI v2 / RMCP+ session", pexpect.TIMEOUT, pexpect.EOF]
@@ -188,10 +272,65 @@ class OpTestConstants():
     IPMI_CONSOLE_EXPECT_PASSWORD = 0
     IPMI_CONSOLE_EXPECT_PETITBOOT = [2,3]
     IPMI_CONSOLE_EXPECT_RANDOM_STATE = [4,5]
+    IPMI_CONSOLE_EXPECT_SHELL = 1
+    IPMI_CONSOLE_EXPECT_UNIQUE_PROMPT = -1
+    IPMI_CONSOLE_PROBE_TIMEOUT = 10
+    IPMI_CONSOLE_CMD_TIMEOUT = 500
+    IPMI_CONSOLE_FRAME_BEGIN = "OPTEST_BEGIN_"
+    IPMI_CONSOLE_FRAME_END = "OPTEST_END_"
+
+    # Shell kept open on the BMC, see OpTestBMCShell
+    BMC_SHELL_LOGIN_TIMEOUT = 60
+    BMC_SHELL_CMD_TIMEOUT = 60
+    BMC_SHELL_PROMPT_TIMEOUT = 5
     IPMI_HOST_UNIQUE_PROMPT = "PS1=[pexpect]#"
     IPMI_HOST_EXPECT_PEXPECT_PROMPT = "[pexpect]#"
     IPMI_HOST_EXPECT_PEXPECT_PROMPT_LIST = [r"\[pexpect\]#$", pexpect.TIMEOUT]
 
+    # IPMI backends, selects how OpTestIPMI talks to the BMC
+    IPMI_BACKEND_IPMITOOL = "ipmitool"
+    IPMI_BACKEND_POOL = "ipmitool-shell"
+    IPMI_BACKEND_NATIVE = "lanplus"
+    IPMI_BACKENDS = [IPMI_BACKEND_IPMITOOL, IPMI_BACKEND_POOL, IPMI_BACKEND_NATIVE]
+    IPMI_DEFAULT_BACKEND = IPMI_BACKEND_IPMITOOL
+    # Selects the backend of every OpTestIPMI object, see run --ipmi-backend
+    IPMI_BACKEND_ENV = "OP_IPMI_BACKEND"
+    # Only a trailing pipeline can be run alongside a backend
+    IPMI_BACKEND_SHELL_CHARS = r"[;&<>`$()\\\n]"
+    IPMI_BACKEND_PIPE_CHARS = r"[;&<>`$\n]"
+
+    # Constants related to the pool of persistent ipmitool sessions
+    IPMI_POOL_SIZE = 2
+    IPMI_POOL_PROMPT = "ipmitool> "
+    IPMI_POOL_LOGIN_TIMEOUT = 60
+    IPMI_POOL_CMD_TIMEOUT = 600
+    IPMI_POOL_IDLE_TIMEOUT = 45
+    IPMI_POOL_EXCLUDED_CMDS = ["sol", "shell", "exec", "hpm", "mc reset", "exit", "quit"]
+    IPMI_POOL_SESSION_ERRORS = ["Unable to establish IPMI v2 / RMCP+ session",
+                                "Unable to establish LAN session",
+                                "Error: Received an Unexpected"]
+
+    # Sensor index, built once per BMC firmware level from an SDR dump
+    IPMI_SDR_CACHE_DIR = "/tmp/op-test-sdr-cache"
+    # Seconds before building the index again after the BMC did not answer
+    IPMI_SENSOR_INDEX_RETRY_DELAY = 60
+    HOST_SSH_CONTROL_DIR = "/tmp/op-test-ssh"
+    IPMI_SENSOR_HOST_STATUS = "Host Status"
+    IPMI_SENSOR_OS_BOOT = "OS Boot"
+    IPMI_SENSOR_BIOS_GOLDEN = "BIOS Golden Side"
+    IPMI_SENSOR_BOOT_COUNT = "Boot Count"
+
+    # Constants related to the native RMCP+ client
+    IPMI_LAN_PORT = 623
+    IPMI_LAN_PRIVILEGE = 4 # Administrator
+    IPMI_LAN_TIMEOUT = 2
+    IPMI_LAN_RETRIES = 4
+    IPMI_LAN_IDLE_TIMEOUT = 45
+    IPMI_LAN_KEEPALIVE = 30
+    IPMI_LAN_SDR_CHUNK = 16
+    IPMI_LAN_SDR_MAX = 1024
+    IPMI_LAN_SOL_CHUNK = 200
+
     # HMI Test case constants
     HMI_PROC_RECV_DONE = 1
     HMI_PROC_RECV_ERROR_MASKED = 2
@@ -260,7 +399,17 @@ class OpTestConstants():
 
     # Tools, repository and utility paths
     CLONE_SKIBOOT_DIR = "/tmp/skiboot"
+    SKIBOOT_GIT_URL = "https://github.com/open-power/skiboot.git/"
+    HOST_TOOL_CACHE_DIR = "/var/lib/op-test/skiboot-tools"
+    HOST_TOOL_CACHE_HIT = "OPTEST_TOOLS_CACHED"
+    LINUX_GIT_URL = "git://git.kernel.org/pub/scm/linux/kernel/git/torvalds/linux.git"
+    SOURCE_STORE_DIR = "/var/cache/op-test/sources"
+    SOURCE_STORE_EXTENSIONS = [".bundle", ".tar.gz"]
+    SOURCE_DEFAULT_REF = "master"
+    HOST_SOURCE_DIR = "/var/lib/op-test/sources"
     PFLASH_TOOL_DIR = "/tmp/"
+    PNOR_READBACK_NAME = "readback.pnor"
+    PNOR_FLASHED_DIR = "/var/lib/op-test/pnor"
     OLOG_JSON_DIR = "/root/skiboot/external/fwts/"
 
     # IPMI commands
@@ -419,6 +568,26 @@ class OpTestConstants():
     PNOR_NVRAM_PART = "NVRAM"
     PNOR_GUARD_PART = "GUARD"
     PNOR_BOOTKERNEL_PART = "BOOTKERNEL"
+    PNOR_TOC_PART = "part"
+
+    # FFS partition table of a PNOR image, see OpTestFFS
+    FFS_MAGIC = 0x50415254
+    FFS_VERSION_1 = 1
+    FFS_TYPE_DATA = 1
+    FFS_TYPE_LOGICAL = 2
+    FFS_TYPE_PARTITION = 3
+    FFS_ENTRY_INTEG_ECC = 0x8000
+    FFS_MISCFLAGS_PRESERVED = 0x80
+    FFS_MISCFLAGS_READONLY = 0x40
+    FFS_MISCFLAGS_BACKUP = 0x20
+    FFS_MISCFLAGS_REPROVISION = 0x10
+    FFS_MISCFLAGS_VOLATILE = 0x08
+    FFS_MISCFLAGS_CLEARECC = 0x04
+    FFS_MISCFLAGS_GOLDEN = 0x01
+    # Partitions the firmware writes to, they differ from any image
+    PNOR_VOLATILE_PARTS = ["NVRAM", "GUARD", "HBEL", "ATTR_PERM", "ATTR_TMP", "FIRDATA"]
+    FFS_HASH_BLOCK_SIZE = 1048576
+    FFS_HASH_THREADS = 4
 
     HOST_FWTS_BMC_INFO = "fwts bmc_info;echo $?"
     HOST_FWTS_OLOG = "fwts olog -j"
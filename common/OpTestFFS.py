@@ -0,0 +1,361 @@
+#!/usr/bin/python
+# IBM_PROLOG_BEGIN_TAG
+# This is an automatically generated prolog.
+#
+# $Source: op-test-framework/common/OpTestFFS.py $
+#
+# OpenPOWER Automated Test Project
+#
+# Contributors Listed Below - COPYRIGHT 2015
+# [+] International Business Machines Corp.
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+#
+# IBM_PROLOG_END_TAG
+
+## @package OpTestFFS
+#  FFS partition table of a PNOR image
+#
+#  Reads the partition table (TOC) of a PNOR image or flash dump the way
+#  the ffs tools and libflash do, without building them. The image is
+#  memory mapped, so a partition is looked at without reading the rest of
+#  the image or copying it:
+#
+#    with OpTestFFS("/tmp/pnor") as l_ffs:
+#        for l_part in l_ffs.partitions():
+#            print l_part
+#        l_data = l_ffs.data("NVRAM")
+#
+#  ffs_diff() compares two images partition by partition, e.g. an image
+#  and what was read back from the flash after writing it.
+#
+#  It can also be run as a script, it then lists the partitions like
+#  "fcp -L" does, or compares two images.
+
+import os
+import sys
+import mmap
+import errno
+import struct
+import hashlib
+import threading
+
+from OpTestConstants import OpTestConstants as BMC_CONST
+from OpTestError import OpTestError
+
+# struct __ffs_hdr: magic, version, size, entry_size, entry_count,
+# block_size, block_count, resvd[4], checksum
+FFS_HDR = struct.Struct(">7I4II")
+# struct __ffs_entry: name, base, size, pid, id, type, flags, actual,
+# resvd[4], user.data[16], checksum
+FFS_ENTRY = struct.Struct(">16s7I4I16II")
+
+# Letters pflash shows for the misc flags of a partition
+FFS_MISCFLAGS_NAMES = [(BMC_CONST.FFS_MISCFLAGS_PRESERVED, 'P'),
+                       (BMC_CONST.FFS_MISCFLAGS_READONLY, 'R'),
+                       (BMC_CONST.FFS_MISCFLAGS_BACKUP, 'B'),
+                       (BMC_CONST.FFS_MISCFLAGS_REPROVISION, 'F'),
+                       (BMC_CONST.FFS_MISCFLAGS_VOLATILE, 'V'),
+                       (BMC_CONST.FFS_MISCFLAGS_CLEARECC, 'C'),
+                       (BMC_CONST.FFS_MISCFLAGS_GOLDEN, 'G')]
+
+##
+# @brief XOR of the 32 bit big endian words of a structure, 0 over a whole
+#        structure whose checksum is right
+#
+def ffs_checksum(i_data):
+    l_sum = 0
+    for l_word in struct.unpack(">%dI" % (len(i_data) / 4), i_data):
+        l_sum ^= l_word
+    return l_sum
+
+##
+# @brief Returns where the image last flashed on a BMC is kept, see
+#        OpTestBMC.pnor_img_flash_delta()
+#
+# @param i_bmcIP @type string: IP address of the BMC
+#
+def pnor_flashed_image(i_bmcIP):
+    return os.path.join(BMC_CONST.PNOR_FLASHED_DIR, i_bmcIP + ".pnor")
+
+##
+# @brief Forgets which image was flashed on a BMC. To be called by anything
+#        that writes the PNOR other than OpTestBMC.pnor_img_flash_delta(),
+#        e.g. an HPM code update.
+#
+# @param i_bmcIP @type string: IP address of the BMC
+#
+def pnor_flashed_forget(i_bmcIP):
+    try:
+        os.remove(pnor_flashed_image(i_bmcIP))
+    except OSError, e:
+        if e.errno != errno.ENOENT:
+            raise
+
+##
+# @brief Compares two PNOR images partition by partition. The partitions are
+#        hashed in parallel, straight from the mapped images.
+#
+# @param i_reference @type string: image that was written
+# @param i_readback @type string: image read back from the flash
+# @param i_ignore @type list: partitions not compared, as the firmware writes
+#        to them. Partitions flagged volatile are never compared either.
+#
+# @return l_diff @type list: names of the partitions that differ, in partition
+#         table order, or raise OpTestError
+#
+def ffs_diff(i_reference, i_readback, i_ignore=BMC_CONST.PNOR_VOLATILE_PARTS):
+    with OpTestFFS(i_reference) as l_ref:
+        with OpTestFFS(i_readback) as l_back:
+            l_diff = set()
+            l_jobs = []
+            for l_part in l_ref.compared_partitions(i_ignore):
+                try:
+                    l_other = l_back.partition(l_part.cv_name)
+                except OpTestError:
+                    l_diff.add(l_part.cv_name)
+                    continue
+                if (l_other.cv_offset, l_other.cv_size) != (l_part.cv_offset, l_part.cv_size) or \
+                        l_other.cv_offset + l_other.cv_size > l_back.size():
+                    l_diff.add(l_part.cv_name)
+                    continue
+                l_jobs.append((l_part.cv_name, l_ref, l_back))
+
+            l_lock = threading.Lock()
+            def l_worker():
+                while True:
+                    with l_lock:
+                        if not l_jobs:
+                            return
+                        l_name, l_first, l_second = l_jobs.pop()
+                    # hashlib lets go of the GIL on large blocks
+                    if l_first.digest(l_name) != l_second.digest(l_name):
+                        with l_lock:
+                            l_diff.add(l_name)
+            l_threads = [threading.Thread(target=l_worker)
+                         for l_count in range(BMC_CONST.FFS_HASH_THREADS)]
+            for l_thread in l_threads:
+                l_thread.start()
+            for l_thread in l_threads:
+                l_thread.join()
+            return [l_part.cv_name for l_part in l_ref.partitions()
+                    if l_part.cv_name in l_diff]
+
+
+class OpTestFFSPartition():
+
+    ##
+    # @brief Initialize this object, see OpTestFFS.partitions()
+    #
+    # @param i_name @type string: name of the partition, e.g. BOOTKERNEL
+    # @param i_offset @type int: offset of the partition in the image, in bytes
+    # @param i_size @type int: size of the partition, in bytes
+    # @param i_actual @type int: bytes of the partition in use
+    # @param i_type @type int: BMC_CONST.FFS_TYPE_*
+    # @param i_flags @type int: flags of the entry
+    # @param i_miscFlags @type int: BMC_CONST.FFS_MISCFLAGS_* of the entry
+    # @param i_ecc @type bool: whether the partition is ECC protected
+    #
+    def __init__(self, i_name, i_offset, i_size, i_actual, i_type, i_flags,
+                 i_miscFlags, i_ecc):
+        self.cv_name = i_name
+        self.cv_offset = i_offset
+        self.cv_size = i_size
+        self.cv_actual = i_actual
+        self.cv_type = i_type
+        self.cv_flags = i_flags
+        self.cv_miscFlags = i_miscFlags
+        self.cv_ecc = i_ecc
+
+    ##
+    # @brief Checks a BMC_CONST.FFS_MISCFLAGS_* flag of the partition
+    #
+    def has_flag(self, i_flag):
+        return bool(self.cv_miscFlags & i_flag)
+
+    def __str__(self):
+        l_flags = ''.join([l_letter for l_flag, l_letter in FFS_MISCFLAGS_NAMES
+                           if self.has_flag(l_flag)])
+        return "%-15s 0x%08x..0x%08x (0x%08x)%s%s" % (
+            self.cv_name, self.cv_offset, self.cv_offset + self.cv_size, self.cv_size,
+            " [E]" if self.cv_ecc else "", " [%s]" % l_flags if l_flags else "")
+
+
+class OpTestFFS():
+
+    ##
+    # @brief Initialize this object, mapping the image and reading its
+    #        partition table
+    #
+    # @param i_path @type string: PNOR image or dump of the flash
+    # @param i_offset @type int: offset of the partition table in the image
+    #
+    # raise OpTestError if the image has no valid partition table
+    #
+    def __init__(self, i_path, i_offset=0):
+        self.cv_path = i_path
+        self.cv_file = open(i_path, 'rb')
+        try:
+            self.cv_map = mmap.mmap(self.cv_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (mmap.error, ValueError), e:
+            self.cv_file.close()
+            l_msg = "Can not map PNOR image %s: %s" % (i_path, str(e))
+            print l_msg
+            raise OpTestError(l_msg)
+        try:
+            self.cv_partitions = self._parse(i_offset)
+        except OpTestError:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, i_type, i_value, i_traceback):
+        self.close()
+
+    ##
+    # @brief Returns the partitions of the image, in partition table order
+    #
+    # @return l_partitions @type list: OpTestFFSPartition objects
+    #
+    def partitions(self):
+        return list(self.cv_partitions)
+
+    ##
+    # @brief Returns the partitions whose contents the image holds and the
+    #        firmware does not write to, i.e. the ones ffs_diff() compares
+    #
+    # @param i_ignore @type list: partitions the firmware writes to.
+    #        Partitions flagged volatile are always left out.
+    #
+    # @return l_partitions @type list: OpTestFFSPartition objects
+    #
+    def compared_partitions(self, i_ignore=BMC_CONST.PNOR_VOLATILE_PARTS):
+        # An update image does not hold every partition of its table
+        return [l_part for l_part in self.cv_partitions
+                if l_part.cv_name not in i_ignore and
+                not l_part.has_flag(BMC_CONST.FFS_MISCFLAGS_VOLATILE) and
+                l_part.cv_offset + l_part.cv_size <= self.size()]
+
+    ##
+    # @brief Returns a partition of the image by name
+    #
+    # @param i_name @type string: name of the partition, e.g. BOOTKERNEL
+    #
+    # @return l_part @type OpTestFFSPartition or raise OpTestError
+    #
+    def partition(self, i_name):
+        for l_part in self.cv_partitions:
+            if l_part.cv_name == i_name:
+                return l_part
+        l_msg = "PNOR image %s has no %s partition" % (self.cv_path, i_name)
+        print l_msg
+        raise OpTestError(l_msg)
+
+    ##
+    # @brief Returns the contents of a partition, without copying them out of
+    #        the mapped image. ECC bytes are left in place.
+    #
+    # @param i_name @type string: name of the partition, e.g. BOOTKERNEL
+    #
+    # @return l_data @type buffer: read only view of the partition
+    #
+    def data(self, i_name):
+        l_part = self.partition(i_name)
+        return buffer(self.cv_map, l_part.cv_offset, l_part.cv_size)
+
+    ##
+    # @brief Returns the sha1 of the contents of a partition
+    #
+    # @param i_name @type string: name of the partition, e.g. BOOTKERNEL
+    #
+    # @return l_digest @type string: hex sha1
+    #
+    def digest(self, i_name):
+        l_part = self.partition(i_name)
+        l_sha = hashlib.sha1()
+        l_end = l_part.cv_offset + l_part.cv_size
+        for l_pos in range(l_part.cv_offset, l_end, BMC_CONST.FFS_HASH_BLOCK_SIZE):
+            l_sha.update(buffer(self.cv_map, l_pos, min(BMC_CONST.FFS_HASH_BLOCK_SIZE,
+                                                        l_end - l_pos)))
+        return l_sha.hexdigest()
+
+    ##
+    # @brief Returns the size of the image, in bytes
+    #
+    def size(self):
+        return len(self.cv_map)
+
+    ##
+    # @brief Unmaps the image, buffers returned by data() can't be used after
+    #
+    def close(self):
+        if self.cv_map is not None:
+            self.cv_map.close()
+            self.cv_map = None
+        self.cv_file.close()
+
+    def _parse(self, i_offset):
+        if i_offset + FFS_HDR.size > len(self.cv_map):
+            self._invalid("is smaller than a partition table")
+        l_hdr = self.cv_map[i_offset:i_offset + FFS_HDR.size]
+        (l_magic, l_version, l_tocBlocks, l_entrySize, l_entryCount,
+         l_blockSize, l_blockCount) = FFS_HDR.unpack(l_hdr)[:7]
+        if l_magic != BMC_CONST.FFS_MAGIC:
+            self._invalid("has no partition table at 0x%x" % i_offset)
+        if l_version != BMC_CONST.FFS_VERSION_1:
+            self._invalid("has partition table version %d" % l_version)
+        if ffs_checksum(l_hdr) != 0:
+            self._invalid("has a bad partition table header checksum")
+        if l_entrySize != FFS_ENTRY.size:
+            self._invalid("has %d byte partition entries" % l_entrySize)
+        l_end = i_offset + FFS_HDR.size + l_entryCount * l_entrySize
+        if l_end > len(self.cv_map):
+            self._invalid("is cut in its partition table")
+
+        self.cv_blockSize = l_blockSize
+        l_partitions = []
+        for l_pos in range(i_offset + FFS_HDR.size, l_end, l_entrySize):
+            l_raw = self.cv_map[l_pos:l_pos + l_entrySize]
+            l_entry = FFS_ENTRY.unpack(l_raw)
+            l_name = l_entry[0].split('\0', 1)[0]
+            if ffs_checksum(l_raw) != 0:
+                self._invalid("has a bad checksum in partition %s" % l_name)
+            l_user = l_entry[12:28]
+            l_partitions.append(OpTestFFSPartition(
+                l_name, l_entry[1] * l_blockSize, l_entry[2] * l_blockSize,
+                l_entry[7], l_entry[5], l_entry[6], (l_user[1] >> 16) & 0xff,
+                bool(l_user[0] & BMC_CONST.FFS_ENTRY_INTEG_ECC)))
+        return l_partitions
+
+    def _invalid(self, i_reason):
+        l_msg = "PNOR image %s %s" % (self.cv_path, i_reason)
+        print l_msg
+        raise OpTestError(l_msg)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 2:
+        with OpTestFFS(sys.argv[1]) as l_ffs:
+            for l_part in l_ffs.partitions():
+                print l_part
+    elif len(sys.argv) == 3:
+        l_diff = ffs_diff(sys.argv[1], sys.argv[2])
+        for l_name in l_diff:
+            print "%s differs" % l_name
+        sys.exit(1 if l_diff else 0)
+    else:
+        print "usage: %s <pnor image> [<pnor image to compare with>]" % sys.argv[0]
+        sys.exit(1)
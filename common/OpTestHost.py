@@ -41,6 +41,8 @@ import telnetlib
 import socket
 import select
 import pty
+import signal
+import threading
 import pexpect
 import commands
 try:
@@ -52,6 +54,44 @@ except ImportError:
 from OpTestConstants import OpTestConstants as BMC_CONST
 from OpTestError import OpTestError
 from OpTestUtil import OpTestUtil
+from OpTestSSHMaster import get_ssh_master
+from OpTestConsoleManager import OpTestConsoleResult
+from OpTestBMCReady import OpTestBMCReady
+from OpTestSourceStore import get_source, source_digest, source_commit, source_checkout_cmd
+from OpTestFFS import pnor_flashed_forget
+
+# ssh output that needs an answer or means the command failed, as (regular
+# expression, action, answer or error message). They are all matched in one
+# go by g_sshMatcher, see OpTestHost._ssh_execute_iter().
+g_sshPatterns = [
+    (r'\(yes/no\)', 'answer', 'yes'),
+    (r'[Pp]assword', 'answer', '%(pwd)s'),
+    (r'yes', 'answer', '1'),
+    (r'Connection refused', 'error', '%(out)s'),
+    (r'Received disconnect from', 'ssh1', None),
+    (r'Connection closed by', 'error', '%(out)s'),
+    (r'WARNING: POSSIBLE DNS SPOOFING DETECTED', 'error',
+     'Its a RSA key problem : \n%(out)s'),
+    (r'WARNING: REMOTE HOST IDENTIFICATION HAS CHANGED', 'error',
+     'Its a RSA key problem : \n%(out)s'),
+    (r'Permission denied', 'error', 'Wrong Login or Password(%(user)s/%(pwd)s) :%(out)s'),
+    (r'Rebooting|rebooting the system', 'error', '%(out)s'),
+    (r'Connection timed out', 'error', 'Connection timed out/%(host)s is not pingable'),
+    (r'could not connect to CLI daemon', 'error',
+     'Director server is not up/running(Do smstop then smstart to restart)'),
+    (r'Error:', 'rmsys', 'Error removing:%(host)s'),
+    (r'Bad owner or permissions on /root/\.ssh/config', 'error',
+     "Bad owner or permissions on /root/.ssh/config,"
+     "Try 'chmod -R 600 /root/.ssh' & retry operation"),
+    (r'Name or service not known', 'error',
+     'SSH Failed for :%(host)s\n Please provide a valid Hostname'),
+]
+g_sshMatcher = re.compile('|'.join(['(?P<p%d>%s)' % (l_i, l_pattern[0])
+                                    for l_i, l_pattern in enumerate(g_sshPatterns)]))
+
+# Facts about each host, keyed by IP, see OpTestHost._host_facts()
+g_hostFacts = {}
+g_hostFactsLock = threading.Lock()
 
 class OpTestHost():
 
@@ -71,6 +111,7 @@ class OpTestHost():
         self.util = OpTestUtil()
         self.bmcip = i_bmcip
         self.cv_ffdcDir = i_ffdcDir
+        self.cv_batchId = 0
 
 
     ##
@@ -80,15 +121,30 @@ class OpTestHost():
     #   @return command output if command execution is successful else raises OpTestError
     #
     def _ssh_execute(self, i_cmd):
+        return ''.join(self._ssh_execute_iter(i_cmd))
+
+    ##
+    #   @brief This method executes the command(i_cmd) on the host using a ssh session
+    #          and yields its output as it arrives, in blocks of up to
+    #          BMC_CONST.HOST_SSH_READ_SIZE bytes. The ssh session is killed
+    #          when the caller stops iterating early.
+    #
+    #   @param i_cmd: @type string: Command to be executed on host through a ssh session
+    #   @return generator of output blocks, raises OpTestError on ssh errors
+    #
+    def _ssh_execute_iter(self, i_cmd):
 
         l_host = self.ip
         l_user = self.user
         l_pwd = self.passwd
 
-        l_output = ''
         ssh_ver = '-2'
 
-        self.util.PingFunc(l_host, BMC_CONST.PING_RETRY_FOR_STABILITY)
+        self.util.host_check_reachable(l_host, BMC_CONST.PING_RETRY_FOR_STABILITY)
+
+        # Run over the persistent connection of the host if there is one,
+        # there is no login to answer then
+        l_control = tuple(get_ssh_master(l_host, l_user, l_pwd).control_args())
 
         # Flush everything out prior to forking
         sys.stdout.flush()
@@ -104,8 +160,8 @@ class OpTestHost():
         if pid == 0:
             # In child process.  Issue attempt ssh connection to remote host
 
-            arglist = ('/usr/bin/ssh -o StrictHostKeyChecking=no',
-                       l_host, ssh_ver, '-k', '-l', l_user, i_cmd)
+            arglist = ('/usr/bin/ssh -o StrictHostKeyChecking=no',) + l_control + \
+                      (l_host, ssh_ver, '-k', '-l', l_user, i_cmd)
 
             try:
                 os.execv('/usr/bin/ssh', arglist)
@@ -115,99 +171,68 @@ class OpTestHost():
                 print l_msg
                 raise OpTestError(l_msg)
 
-        else:
-            # In parent process
-            # Polling child process for output
-            poll = select.poll()
-            poll.register(fd, select.POLLIN)
+        # In parent process
+        # Polling child process for output
+        poll = select.poll()
+        poll.register(fd, select.POLLIN)
 
-            start_time = time.time()
-            # time.sleep(1)
+        l_values = {'host': l_host, 'user': l_user, 'pwd': l_pwd}
+        l_tail = ''
+        l_done = False
+        start_time = time.time()
+        try:
             while True:
+                l_left = start_time + BMC_CONST.HOST_SSH_CMD_TIMEOUT - time.time()
+                if l_left <= 0:
+                    if i_cmd.__contains__('updlic') or i_cmd.__contains__('update_flash'):
+                        l_left = BMC_CONST.HOST_SSH_CMD_TIMEOUT
+                    else:
+                        l_msg = "Timeout occured/SSH request " \
+                                "un-responded even after 25 minutes"
+                        print l_msg
+                        raise OpTestError(l_msg)
+                if not poll.poll(l_left * 1000):
+                    continue
                 try:
-                    evt = poll.poll()
-                    x = os.read(fd, 1024)
-                    #print "ssh x= " + x
-                    end_time = time.time()
-                    if(end_time - start_time > 1500):
-                        if(i_cmd.__contains__('updlic') or i_cmd.__contains__('update_flash')):
-                            continue
-                        else:
-                            l_msg = "Timeout occured/SSH request " \
-                                    "un-responded even after 25 minutes"
-                            print l_msg
-                            raise OpTestError(l_msg)
-
-                    if(x.__contains__('(yes/no)')):
-                        l_res = "yes\r\n"
-                        os.write(fd, l_res)
-                    if(x.__contains__('s password:')):
-                        x = ''
-                        os.write(fd, l_pwd + '\r\n')
-                    if(x.__contains__('Password:')):
-                        x = ''
-                        os.write(fd, l_pwd + '\r\n')
-                    if(x.__contains__('password')):
-                        response = l_pwd + "\r\n"
-                        os.write(fd, response)
-                    if(x.__contains__('yes')):
-                        response = '1' + "\r\n"
-                        os.write(fd, response)
-                    if(x.__contains__('Connection refused')):
-                        print x
-                        raise OpTestError(x)
-                    if(x.__contains__('Received disconnect from')):
+                    x = os.read(fd, BMC_CONST.HOST_SSH_READ_SIZE)
+                except OSError:
+                    break
+                if not x:
+                    break
+
+                # A pattern may straddle two reads, only new matches count
+                l_window = l_tail + x
+                for l_match in g_sshMatcher.finditer(l_window):
+                    if l_match.end() <= len(l_tail):
+                        continue
+                    l_action, l_msg = g_sshPatterns[int(l_match.lastgroup[1:])][1:]
+                    if l_action == 'answer':
+                        os.write(fd, (l_msg % l_values) + '\r\n')
+                    elif l_action == 'ssh1':
                         self.ssh_ver = '-1'
-                    if(x.__contains__('Connection closed by')):
-                        print (x)
-                        raise OpTestError(x)
-                    if(x.__contains__("WARNING: POSSIBLE DNS SPOOFING DETECTED")):
-                        print (x)
-                        raise OpTestError("Its a RSA key problem : \n" + x)
-                    if(x.__contains__("WARNING: REMOTE HOST IDENTIFICATION HAS CHANGED")):
-                        print (x)
-                        raise OpTestError("Its a RSA key problem : \n" + x)
-                    if(x.__contains__("Permission denied")):
-                        l_msg = "Wrong Login or Password(" + l_user + "/" + l_pwd + ") :" + x
-                        print (l_msg)
+                    elif l_action == 'rmsys' and not i_cmd.__contains__('rmsys'):
+                        continue
+                    else:
+                        l_values['out'] = l_window
+                        l_msg = l_msg % l_values
+                        print l_msg
                         raise OpTestError(l_msg)
-                    if(x.__contains__("Rebooting") or \
-                       (x.__contains__("rebooting the system"))):
-                        l_output = l_output + x
-                        raise OpTestError(l_output)
-                    if(x.__contains__("Connection timed out")):
-                        l_msg = "Connection timed out/" + \
-                            l_host + " is not pingable"
-                        print (x)
-                        raise OpTestError(l_msg)
-                    if(x.__contains__("could not connect to CLI daemon")):
-                        print(x)
-                        raise OpTestError("Director server is not up/running("
-                                          "Do smstop then smstart to restart)")
-                    if((x.__contains__("Error:")) and (i_cmd.__contains__('rmsys'))):
-                        print(x)
-                        raise OpTestError("Error removing:" + l_host)
-                    if((x.__contains__("Bad owner or permissions on /root/.ssh/config"))):
-                        print(x)
-                        raise OpTestError("Bad owner or permissions on /root/.ssh/config,"
-                                          "Try 'chmod -R 600 /root/.ssh' & retry operation")
-
-                    l_output = l_output + x
-                    # time.sleep(1)
+                l_tail = l_window[-BMC_CONST.HOST_SSH_MATCH_OVERLAP:]
+                yield x
+            l_done = True
+        finally:
+            # Gather child process status to freeup zombie and
+            # Close child file descriptor before return
+            if not l_done:
+                try:
+                    os.kill(pid, signal.SIGKILL)
                 except OSError:
-                    break
-        if l_output.__contains__("Name or service not known"):
-            reason = 'SSH Failed for :' + l_host + \
-                "\n Please provide a valid Hostname"
-            print reason
-            raise OpTestError(reason)
-
-        # Gather child process status to freeup zombie and
-        # Close child file descriptor before return
-        if (fd):
-            os.waitpid(pid, 0)
+                    pass
+            l_pid, l_status = os.waitpid(pid, 0)
             os.close(fd)
-        return l_output
+        # ssh exits with 255 when it could not get to the host
+        if os.WEXITSTATUS(l_status) != 255:
+            self.util.host_seen_up(l_host)
 
     ##
     # @brief Get and Record Ubunto OS level
@@ -217,10 +242,49 @@ class OpTestHost():
     #
     def host_get_OS_Level(self):
 
-        l_oslevel = self._ssh_execute(BMC_CONST.BMC_GET_OS_RELEASE)
+        l_facts = self._host_facts()
+        if 'os' not in l_facts:
+            l_facts['os'] = self._ssh_execute(BMC_CONST.BMC_GET_OS_RELEASE)
+        l_oslevel = l_facts['os']
         print l_oslevel
         return l_oslevel
 
+    ##
+    # @brief Returns what is known about the host since it booted: OS level,
+    #        kernel version, commands and packages found and modules loaded.
+    #        The facts are kept for as long as the host stays up, see
+    #        OpTestUtil.host_up_since(). After that the boot id of the host is
+    #        read again and they are dropped if it changed.
+    #
+    # @return l_facts @type dict: facts of the host, filled in by the
+    #         host_* functions that find them out, or raise OpTestError
+    #
+    def _host_facts(self):
+        l_since = self.util.host_up_since(self.ip)
+        with g_hostFactsLock:
+            l_facts = g_hostFacts.get(self.ip)
+            if l_facts is not None and l_since is not None and l_facts['since'] == l_since:
+                return l_facts
+        l_bootId = self._ssh_execute(BMC_CONST.HOST_GET_BOOT_ID).strip()
+        with g_hostFactsLock:
+            l_facts = g_hostFacts.get(self.ip)
+            if l_facts is None or l_facts['boot_id'] != l_bootId:
+                if l_facts is not None:
+                    print "Host %s rebooted, dropping what was known about it" % self.ip
+                l_facts = {'boot_id': l_bootId, 'commands': set(), 'packages': {},
+                           'modules': set(), 'configs': {}, 'tools': set()}
+                g_hostFacts[self.ip] = l_facts
+            l_facts['since'] = self.util.host_up_since(self.ip)
+            return l_facts
+
+    ##
+    # @brief Forgets what is known about the host, e.g. after changing its
+    #        software. It is found out again on next use.
+    #
+    def host_invalidate_facts(self):
+        with g_hostFactsLock:
+            g_hostFacts.pop(self.ip, None)
+
 
     ##
     # @brief Executes a command on the os of the bmc to protect network setting
@@ -255,7 +319,8 @@ class OpTestHost():
             print l_msg
             raise OpTestError(l_msg)'''
 
-        self.util.PingFunc(self.bmcip, BMC_CONST.PING_RETRY_FOR_STABILITY)
+        # The host reaches the BMC in-band, that is where IPMI must answer
+        OpTestBMCReady(self.bmcip, lambda i_args: self.host_run_command("ipmitool " + i_args)).wait()
 
 
     ##
@@ -270,6 +335,9 @@ class OpTestHost():
     #
     def host_code_update(self, i_image, imagecomponent):
 
+        # The PNOR no longer holds the image OpTestBMC.pnor_img_flash_delta() knows
+        pnor_flashed_forget(self.bmcip)
+
         # Copy the hpm file to the tmp folder in the host
         try:
             self.util.copyFilesToDest(i_image, self.user,
@@ -318,6 +386,106 @@ class OpTestHost():
         print l_res
         return l_res
 
+    ##
+    # @brief It will run linux command(i_cmd) on host and yield its output line
+    #        by line as it arrives, so that large outputs such as the OPAL
+    #        message log are not held in memory
+    #
+    # @param i_cmd @type string: linux command
+    #
+    # @return generator of output lines, line endings included, or raise OpTestError
+    #
+    def host_run_command_iter(self, i_cmd):
+        l_partial = ''
+        try:
+            for l_block in self._ssh_execute_iter(i_cmd):
+                l_lines = (l_partial + l_block).splitlines(True)
+                l_partial = ''
+                if l_lines and not l_lines[-1].endswith('\n'):
+                    l_partial = l_lines.pop()
+                for l_line in l_lines:
+                    yield l_line
+        except (OpTestError, GeneratorExit):
+            raise
+        except:
+            l_msg = "Command execution on host failed"
+            print l_msg
+            print sys.exc_info()
+            raise OpTestError(l_msg)
+        if l_partial:
+            yield l_partial
+
+    ##
+    # @brief It will run a list of linux commands on host in a single ssh
+    #        session, each in its own subshell, one after the other. Every
+    #        command is framed with begin and end markers, so that its output
+    #        and exit status can be told apart from the others.
+    #
+    # @param i_cmds @type list: linux commands, without "echo $?"
+    #
+    # @return l_results @type list: OpTestConsoleResult per command, in order.
+    #         The exit code is None for commands that did not run to the end,
+    #         e.g. because the host went away. Raises OpTestError if the ssh
+    #         session fails.
+    #
+    def host_run_batch(self, i_cmds):
+        # Nothing to run, an empty command would open a login shell
+        if not i_cmds:
+            return []
+        self.cv_batchId += 1
+        l_tag = "%d_%d_" % (os.getpid(), self.cv_batchId)
+        l_begin = BMC_CONST.IPMI_CONSOLE_FRAME_BEGIN + l_tag
+        l_end = BMC_CONST.IPMI_CONSOLE_FRAME_END + l_tag
+        l_script = []
+        for l_i, l_cmd in enumerate(i_cmds):
+            # On its own line, so a trailing ; or & can't break the subshell
+            l_script.append("echo %s%d; (\n%s\n); echo %s%d $?" % (
+                l_begin, l_i, l_cmd.rstrip(), l_end, l_i))
+        l_beginRegex = re.compile(r"^%s(\d+)\s*$" % re.escape(l_begin))
+        # Not anchored, the output of a command may not end with a newline
+        l_endRegex = re.compile(r"%s(\d+) (\d+)\s*$" % re.escape(l_end))
+        print "Running %d commands on host: %s" % (len(i_cmds), "; ".join(i_cmds))
+
+        l_results = [OpTestConsoleResult(None, '', None) for l_cmd in i_cmds]
+        l_output = None
+        l_start = time.time()
+        for l_line in self.host_run_command_iter("\n".join(l_script)):
+            l_match = l_beginRegex.match(l_line)
+            if l_match is not None:
+                l_output = []
+                l_start = time.time()
+                continue
+            l_match = l_endRegex.search(l_line)
+            if l_match is None:
+                if l_output is not None:
+                    l_output.append(l_line)
+                continue
+            if l_output is None:
+                l_output = []
+            l_output.append(l_line[:l_match.start()])
+            l_result = l_results[int(l_match.group(1))]
+            l_result.cv_exitCode = int(l_match.group(2))
+            l_result.cv_output = ''.join(l_output).rstrip('\r\n')
+            l_result.cv_elapsed = time.time() - l_start
+            l_output = None
+        # Output of a command cut short
+        if l_output is not None:
+            for l_result in l_results:
+                if l_result.cv_exitCode is None:
+                    l_result.cv_output = ''.join(l_output).rstrip('\r\n')
+                    break
+        for l_cmd, l_result in zip(i_cmds, l_results):
+            print "%s: exit code %s" % (l_cmd, l_result.cv_exitCode)
+            print l_result.cv_output
+        return l_results
+
+    ##
+    # @brief Closes the persistent ssh connection to the host, e.g. before it
+    #        is rebooted. The next host command opens a new one.
+    #
+    def host_close_ssh_master(self):
+        get_ssh_master(self.ip, self.user, self.passwd).close()
+
     # @brief It will gather OPAL Message logs and store the copy in a logfile
     #        which will be stored in FFDC dir.
     #
@@ -661,12 +829,17 @@ class OpTestHost():
     # @return BMC_CONST.FW_SUCCESS or raise OpTestError
     #
     def host_check_command(self, i_cmd):
+        l_facts = self._host_facts()
+        if i_cmd in l_facts['commands']:
+            print "%s command is present on host" % i_cmd
+            return BMC_CONST.FW_SUCCESS
         l_cmd = 'which ' + i_cmd + '; echo $?'
         print l_cmd
         l_res = self.host_run_command(l_cmd)
         l_res = l_res.splitlines()
 
         if (int(l_res[-1]) == 0):
+            l_facts['commands'].add(i_cmd)
             return BMC_CONST.FW_SUCCESS
         else:
             l_msg = "%s command is not present on host" % i_cmd
@@ -680,11 +853,39 @@ class OpTestHost():
     #         or raise OpTestError
     #
     def host_get_kernel_version(self):
-        l_kernel = self._ssh_execute("uname -a | awk {'print $3'}")
-        l_kernel = l_kernel.replace("\r\n", "")
+        l_facts = self._host_facts()
+        if 'kernel' not in l_facts:
+            l_kernel = self._ssh_execute("uname -a | awk {'print $3'}")
+            l_facts['kernel'] = l_kernel.replace("\r\n", "")
+        l_kernel = l_facts['kernel']
         print l_kernel
         return l_kernel
 
+    ##
+    # @brief Gets the platform of the host from its device tree
+    #
+    # @return l_platform @type string: BMC_CONST.HABANERO, FIRESTONE, ... or the
+    #         first compatible string of an unknown one, e.g. ibm,firenze
+    #         or raise OpTestError
+    #
+    def host_get_platform(self):
+        l_facts = self._host_facts()
+        if 'platform' not in l_facts:
+            l_compatible = self._ssh_execute(BMC_CONST.HOST_GET_COMPATIBLE).strip()
+            l_names = [l_name for l_name in l_compatible.split(',') if l_name]
+            l_known = [l_name for l_name in l_names if l_name in BMC_CONST.PLATFORMS]
+            if l_known:
+                l_facts['platform'] = l_known[0]
+            elif len(l_names) >= 2:
+                l_facts['platform'] = "%s,%s" % (l_names[0], l_names[1])
+            else:
+                l_msg = "Can't read platform of host %s: %s" % (self.ip, l_compatible)
+                print l_msg
+                raise OpTestError(l_msg)
+        l_platform = l_facts['platform']
+        print l_platform
+        return l_platform
+
     ##
     # @brief This function will checks first for config file for a given kernel version on host,
     #        if available then check for config option value and return that value
@@ -704,27 +905,50 @@ class OpTestHost():
     #                             or raise OpTestError if config option is not set in file.
     #
     def host_check_config(self, i_kernel, i_config):
-        l_file = "/boot/config-%s" % i_kernel
-        l_res = self._ssh_execute("test -e %s; echo $?" % l_file)
-        l_res = l_res.replace("\r\n", "")
-        if int(l_res) == 0:
-            print "Config file is available"
-        else:
-            l_msg = "Config file %s is not available on host" % l_file
+        l_val = self.host_get_kernel_config(i_kernel).get(i_config)
+        if l_val is None:
+            l_msg = "config option %s is not set,exiting..." % i_config
             print l_msg
             raise OpTestError(l_msg)
-        l_cmd = "cat %s | grep -i --color=never %s" % (l_file, i_config)
-        print l_cmd
-        l_res = self._ssh_execute(l_cmd)
-        print l_res
-        try:
-            l_val = ((l_res.split("=")[1]).replace("\r\n", ""))
-        except:
-            print l_val
-            l_msg = "config option is not set,exiting..."
+        print "%s=%s" % (i_config, l_val)
+        return l_val
+
+    ##
+    # @brief Returns the config file of a kernel version on host, read once
+    #        per boot of the host and parsed into a dictionary
+    #
+    # @param i_kernel @type string: kernel version
+    #
+    # @return l_config @type dict: value of each config option, e.g. y or m,
+    #         None for options which are not set, or raise OpTestError if the
+    #         config file is not available on host
+    #
+    def host_get_kernel_config(self, i_kernel):
+        l_facts = self._host_facts()
+        l_config = l_facts['configs'].get(i_kernel)
+        if l_config is not None:
+            return l_config
+        l_file = "/boot/config-%s" % i_kernel
+        l_config = {}
+        l_rc = None
+        for l_line in self.host_run_command_iter("cat %s; echo $?" % l_file):
+            l_line = l_line.strip()
+            l_match = re.match(r"(CONFIG_\w+)=(.*)$", l_line)
+            if l_match:
+                l_config[l_match.group(1)] = l_match.group(2)
+                continue
+            l_match = re.match(r"# (CONFIG_\w+) is not set$", l_line)
+            if l_match:
+                l_config[l_match.group(1)] = None
+            elif l_line:
+                l_rc = l_line
+        if l_rc != "0":
+            l_msg = "Config file %s is not available on host" % l_file
             print l_msg
             raise OpTestError(l_msg)
-        return l_val
+        print "Config file is available, %d options" % len(l_config)
+        l_facts['configs'][i_kernel] = l_config
+        return l_config
 
     ##
     # @brief It will return installed package name for given linux command(i_cmd) on host
@@ -735,15 +959,27 @@ class OpTestHost():
     # @return l_pkg @type string: installed package on host
     #
     def host_check_pkg_for_utility(self, i_oslevel, i_cmd):
+        l_facts = self._host_facts()
+        if i_cmd in l_facts['packages']:
+            l_pkg = l_facts['packages'][i_cmd]
+            print l_pkg
+            return l_pkg
         if 'Ubuntu' in i_oslevel:
-            l_res = self._ssh_execute("dpkg -S `which %s`" % i_cmd)
-            return l_res
+            l_res = self._ssh_execute("dpkg -S `which %s`; echo $?" % i_cmd)
         else:
-            l_cmd = "rpm -qf `which %s`" % i_cmd
+            l_cmd = "rpm -qf `which %s`; echo $?" % i_cmd
             l_res = self._ssh_execute(l_cmd)
-            l_pkg = l_res.replace("\r\n", "")
+        l_lines = l_res.splitlines()
+        l_rc = l_lines.pop().strip() if l_lines else None
+        if 'Ubuntu' in i_oslevel:
+            l_pkg = "\r\n".join(l_lines)
+        else:
+            l_pkg = "".join(l_lines)
             print l_pkg
-            return l_pkg
+        # Only a package that was found is remembered, not the error message
+        if l_rc == "0":
+            l_facts['packages'][i_cmd] = l_pkg
+        return l_pkg
 
     ##
     # @brief This function loads ibmpowernv driver only on powernv platform
@@ -810,8 +1046,9 @@ class OpTestHost():
     # @return BMC_CONST.FW_SUCCESS or raise OpTestError
     #
     def host_clone_linux_source(self, i_dir):
-        l_msg = 'git://git.kernel.org/pub/scm/linux/kernel/git/torvalds/linux.git'
-        l_cmd = "git clone %s %s" % (l_msg, i_dir)
+        if self.host_checkout_source("linux", i_dir):
+            return BMC_CONST.FW_SUCCESS
+        l_cmd = "git clone %s %s" % (BMC_CONST.LINUX_GIT_URL, i_dir)
         self._ssh_execute("rm -rf %s" % i_dir)
         self._ssh_execute("mkdir %s" % i_dir)
         try:
@@ -832,23 +1069,41 @@ class OpTestHost():
     # @return BMC_CONST.FW_SUCCESS or raise OpTestError
     #
     def host_load_module(self, i_module):
-        l_res = self.host_run_command("modprobe %s; echo $?" % i_module)
-        l_res = l_res.splitlines()
-        if int(l_res[-1]) == 0:
-            pass
-        else:
-            l_msg = "Error in loading the module %s, modprobe failed" % i_module
-            print l_msg
-            raise OpTestError(l_msg)
-        l_res = self.host_run_command("lsmod | grep -i --color=never %s" % i_module)
-        if l_res.__contains__(i_module):
-            print "%s module is loaded" % i_module
+        return self.host_load_modules([i_module])
+
+    ##
+    # @brief It will load a list of modules with a single modprobe and verify
+    #        whether they are loaded or not. Modules already loaded since the
+    #        host booted are skipped.
+    #
+    # @param i_modules @type list: module names, which we want to load on host
+    #
+    # @return BMC_CONST.FW_SUCCESS or raise OpTestError
+    #
+    def host_load_modules(self, i_modules):
+        l_facts = self._host_facts()
+        l_modules = [l_module for l_module in i_modules
+                     if l_module not in l_facts['modules']]
+        for l_module in i_modules:
+            if l_module not in l_modules:
+                print "%s module is loaded" % l_module
+        if not l_modules:
             return BMC_CONST.FW_SUCCESS
-        else:
-            l_msg = " %s module is not loaded" % i_module
+        l_modprobe, l_lsmod = self.host_run_batch(["modprobe -a %s" % " ".join(l_modules),
+                                                   "lsmod"])
+        if l_modprobe.cv_exitCode != 0:
+            l_msg = "Error in loading the module %s, modprobe failed" % " ".join(l_modules)
             print l_msg
             raise OpTestError(l_msg)
-
+        for l_module in l_modules:
+            if l_lsmod.cv_output.lower().__contains__(l_module.lower()):
+                print "%s module is loaded" % l_module
+                l_facts['modules'].add(l_module)
+            else:
+                l_msg = " %s module is not loaded" % l_module
+                print l_msg
+                raise OpTestError(l_msg)
+        return BMC_CONST.FW_SUCCESS
     ##
     # @brief This function will read real time clock(RTC) time using hwclock utility
     #
@@ -915,16 +1170,31 @@ class OpTestHost():
     # @return BMC_CONST.FW_SUCCESS or raise OpTestError
     #
     def host_load_module_based_on_config(self, i_kernel, i_config, i_module):
-        l_val = self.host_check_config(i_kernel, i_config)
-        if l_val == 'm':
-            self.host_load_module(i_module)
-        elif l_val == 'y':
-            print "Driver built into kernel itself"
-        else:
-            l_msg = "Config value is changed"
-            print l_msg
-            raise OpTestError(l_msg)
-        return BMC_CONST.FW_SUCCESS
+        return self.host_load_modules_based_on_config(i_kernel, [(i_config, i_module)])
+
+    ##
+    # @brief This function will load all the driver modules a test needs on
+    #        host, based on their config options, with a single modprobe.
+    #        See host_load_module_based_on_config().
+    #
+    # @param i_kernel @type string: kernel version to get config file
+    #        i_modules @type list: (config option, driver module) pairs
+    #
+    # @return BMC_CONST.FW_SUCCESS or raise OpTestError
+    #
+    def host_load_modules_based_on_config(self, i_kernel, i_modules):
+        l_modules = []
+        for l_config, l_module in i_modules:
+            l_val = self.host_check_config(i_kernel, l_config)
+            if l_val == 'm':
+                l_modules.append(l_module)
+            elif l_val == 'y':
+                print "Driver %s built into kernel itself" % l_module
+            else:
+                l_msg = "Config value is changed"
+                print l_msg
+                raise OpTestError(l_msg)
+        return self.host_load_modules(l_modules)
 
     ##
     # @brief This function will return the list of installed i2c buses on host in two formats
@@ -973,6 +1243,7 @@ class OpTestHost():
         else:
             l_res = self.host_run_command("dmesg -C")
             self.host_run_command("rmmod at24")
+            self._host_facts()['modules'].discard("at24")
             self.host_load_module("at24")
             l_res = self.host_run_command("dmesg | grep -i --color=never at24")
             if l_res.__contains__("at24"):
@@ -1042,8 +1313,9 @@ class OpTestHost():
     # @return BMC_CONST.FW_SUCCESS or raise OpTestError
     #
     def host_clone_skiboot_source(self, i_dir):
-        l_msg = 'https://github.com/open-power/skiboot.git/'
-        l_cmd = "git clone %s %s" % (l_msg, i_dir)
+        if self.host_checkout_source("skiboot", i_dir):
+            return BMC_CONST.FW_SUCCESS
+        l_cmd = "git clone %s %s" % (BMC_CONST.SKIBOOT_GIT_URL, i_dir)
         self.host_run_command("git config --global http.sslverify false")
         self.host_run_command("rm -rf %s" % i_dir)
         self.host_run_command("mkdir %s" % i_dir)
@@ -1110,3 +1382,112 @@ class OpTestHost():
             print l_msg
             raise OpTestError(l_msg)
 
+    ##
+    # @brief It will make the skiboot xscom-utils and gard tools available in
+    #        i_dir, laid out like host_compile_xscom_utilities() and
+    #        host_compile_gard_utility() leave them. Built tools are kept on
+    #        host in BMC_CONST.HOST_TOOL_CACHE_DIR, keyed by skiboot commit,
+    #        architecture and OS, which survives reboots. Cloning and building
+    #        only happens when the latest skiboot commit was not built yet.
+    #
+    # @param i_dir @type string: directory where skiboot would be cloned
+    #
+    # @return BMC_CONST.FW_SUCCESS or raise OpTestError
+    #
+    def host_prepare_skiboot_tools(self, i_dir):
+        l_facts = self._host_facts()
+        if i_dir in l_facts['tools']:
+            print "skiboot tools are available in %s" % i_dir
+            return BMC_CONST.FW_SUCCESS
+
+        # The skiboot commit comes from the source store if it has skiboot,
+        # git is only asked when the source is cloned from the internet
+        l_source = get_source("skiboot")
+        if l_source is not None:
+            l_latest = l_built = source_commit(l_source)
+        else:
+            l_latest = "$(git -c http.sslverify=false ls-remote %s HEAD | cut -f1)" % \
+                       BMC_CONST.SKIBOOT_GIT_URL
+            l_built = "$(cd %s && git rev-parse HEAD)" % i_dir
+        l_key = "$(uname -m)-$(. /etc/os-release; echo $ID-$VERSION_ID)"
+        l_tools = "external/xscom-utils/getscom external/xscom-utils/putscom external/gard/gard"
+        l_cmd = "l_commit=%s; " \
+                "l_cache=%s/$l_commit-%s; " \
+                "if [ -n \"$l_commit\" ] && (cd $l_cache 2>/dev/null && sha1sum -c --status MANIFEST); then " \
+                "rm -rf %s && mkdir -p %s && (cd $l_cache && cp --parents %s %s) && " \
+                "echo %s $l_cache; fi" % (l_latest, BMC_CONST.HOST_TOOL_CACHE_DIR,
+                                          l_key, i_dir, i_dir, l_tools, i_dir,
+                                          BMC_CONST.HOST_TOOL_CACHE_HIT)
+        l_res = self.host_run_command(l_cmd)
+        if BMC_CONST.HOST_TOOL_CACHE_HIT not in l_res:
+            self.host_clone_skiboot_source(i_dir)
+            self.host_compile_xscom_utilities(i_dir)
+            self.host_compile_gard_utility(i_dir)
+            l_cmd = "l_cache=%s/%s-%s; " \
+                    "rm -rf $l_cache && mkdir -p $l_cache && cd %s && cp --parents %s $l_cache && " \
+                    "cd $l_cache && sha1sum %s > MANIFEST; echo $?" % (
+                        BMC_CONST.HOST_TOOL_CACHE_DIR, l_built, l_key, i_dir, l_tools, l_tools)
+            l_res = self.host_run_command(l_cmd)
+            if int(l_res.splitlines()[-1]) != 0:
+                # Not fatal, the tools are built, they'll just be built again
+                print "Could not keep the skiboot tools in %s" % BMC_CONST.HOST_TOOL_CACHE_DIR
+        l_facts['tools'].add(i_dir)
+        return BMC_CONST.FW_SUCCESS
+
+    ##
+    # @brief It will copy a source tree from the local source store to host,
+    #        see OpTestSourceStore. The copy is kept on host in
+    #        BMC_CONST.HOST_SOURCE_DIR and only sent again when it changed.
+    #
+    # @param i_name @type string: name of the tree, e.g. skiboot
+    # @param i_ref @type string: branch or tag it was fetched at
+    #
+    # @return path of the copy on host, None if the store does not have the
+    #         tree, or raise OpTestError
+    #
+    def host_push_source(self, i_name, i_ref=BMC_CONST.SOURCE_DEFAULT_REF):
+        l_path = get_source(i_name, i_ref)
+        if l_path is None:
+            return None
+        l_digest = source_digest(l_path)
+        l_remote = "%s/%s/%s" % (BMC_CONST.HOST_SOURCE_DIR, i_name, os.path.basename(l_path))
+        l_res = self.host_run_command("mkdir -p %s; cat %s.sha1 2>/dev/null" % (
+            os.path.dirname(l_remote), l_remote))
+        if l_digest in l_res:
+            print "%s is up to date on host" % l_remote
+            return l_remote
+        print "Sending %s to host" % l_path
+        self.util.copyFilesToDest(l_path, self.user, self.ip, l_remote, self.passwd,
+                                  "2", BMC_CONST.SCP_TO_REMOTE)
+        # Only record the copy once it is known to be complete
+        l_res = self.host_run_command("sha1sum %s | cut -d' ' -f1 | tee %s.sha1" % (
+            l_remote, l_remote))
+        if l_digest not in l_res:
+            self.host_run_command("rm -f %s.sha1" % l_remote)
+            l_msg = "Copy of %s on host is corrupted" % l_path
+            print l_msg
+            raise OpTestError(l_msg)
+        return l_remote
+
+    ##
+    # @brief It will extract a source tree from the local source store into
+    #        i_dir on host, replacing it, see host_push_source()
+    #
+    # @param i_name @type string: name of the tree, e.g. skiboot
+    # @param i_dir @type string: directory where the source will be extracted
+    # @param i_ref @type string: branch or tag it was fetched at
+    #
+    # @return True if the store had the tree, False otherwise, or raise OpTestError
+    #
+    def host_checkout_source(self, i_name, i_dir, i_ref=BMC_CONST.SOURCE_DEFAULT_REF):
+        l_remote = self.host_push_source(i_name, i_ref)
+        if l_remote is None:
+            return False
+        l_cmd = "rm -rf %s && %s; echo $?" % (i_dir, source_checkout_cmd(l_remote, i_dir))
+        print l_cmd
+        l_res = self.host_run_command(l_cmd)
+        if int(l_res.splitlines()[-1]) != 0:
+            l_msg = "Extracting %s source on host failed" % i_name
+            print l_msg
+            raise OpTestError(l_msg)
+        return True
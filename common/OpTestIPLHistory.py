@@ -0,0 +1,282 @@
+#!/usr/bin/python
+# IBM_PROLOG_BEGIN_TAG
+# This is an automatically generated prolog.
+#
+# $Source: op-test-framework/common/OpTestIPLHistory.py $
+#
+# OpenPOWER Automated Test Project
+#
+# Contributors Listed Below - COPYRIGHT 2015
+# [+] International Business Machines Corp.
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+#
+# IBM_PROLOG_END_TAG
+
+## @package OpTestIPLHistory
+#  Boot time history across PNOR builds
+#
+#  The phase durations of every profiled IPL, see OpTestIPLProfile, are
+#  stored in a SQLite database (BMC_CONST.IPL_HISTORY_DB), keyed by machine,
+#  platform and PNOR level. Two builds are compared phase by
+#  phase with Welch's t-test: a phase that got slower by more than
+#  BMC_CONST.IPL_REGRESSION_MIN_DELTA with a p-value under
+#  BMC_CONST.IPL_REGRESSION_PVALUE is flagged as a regression.
+#
+#  Usage: OpTestIPLHistory.py <ipl_history.db> <machine> [<base pnor> <new pnor>]
+#         without levels, the last two builds seen on the machine are compared
+
+import re
+import sys
+import math
+import sqlite3
+import collections
+
+from OpTestConstants import OpTestConstants as BMC_CONST
+from OpTestError import OpTestError
+
+g_schema = """
+CREATE TABLE IF NOT EXISTS ipl (
+    id INTEGER PRIMARY KEY,
+    machine TEXT NOT NULL,
+    platform TEXT,
+    pnor TEXT NOT NULL,
+    start REAL NOT NULL,
+    total REAL);
+CREATE TABLE IF NOT EXISTS phase (
+    ipl INTEGER NOT NULL REFERENCES ipl(id),
+    phase TEXT NOT NULL,
+    duration REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS ipl_build ON ipl (machine, pnor);
+"""
+
+##
+# @brief Turns the output of OpTestIPMI.ipmi_get_PNOR_level() into a key
+#
+# @param i_level @type string: PNOR level as read from the BMC
+#
+# @return l_key @type string: the level on one line, without padding
+#
+def pnor_level_key(i_level):
+    return ' '.join(re.sub(r'[\x00-\x1f]', ' ', i_level).split())
+
+##
+# @brief Mean and sample variance of a list of numbers
+#
+def _mean_var(i_values):
+    l_mean = sum(i_values) / float(len(i_values))
+    if len(i_values) < 2:
+        return l_mean, 0.0
+    return l_mean, sum([(l_v - l_mean) ** 2 for l_v in i_values]) / (len(i_values) - 1)
+
+##
+# @brief Regularized incomplete beta function I_x(a, b), evaluated with its
+#        continued fraction (modified Lentz's method)
+#
+def _betainc(i_a, i_b, i_x):
+    if i_x <= 0.0:
+        return 0.0
+    if i_x >= 1.0:
+        return 1.0
+    if i_x > (i_a + 1.0) / (i_a + i_b + 2.0):
+        return 1.0 - _betainc(i_b, i_a, 1.0 - i_x)
+    l_front = math.exp(math.lgamma(i_a + i_b) - math.lgamma(i_a) - math.lgamma(i_b) +
+                       i_a * math.log(i_x) + i_b * math.log(1.0 - i_x)) / i_a
+    l_tiny = 1e-300
+    l_f = l_c = 1.0
+    l_d = 0.0
+    for l_i in range(400):
+        l_m = l_i // 2
+        if l_i == 0:
+            l_num = 1.0
+        elif l_i % 2 == 0:
+            l_num = l_m * (i_b - l_m) * i_x / ((i_a + 2 * l_m - 1) * (i_a + 2 * l_m))
+        else:
+            l_num = -(i_a + l_m) * (i_a + i_b + l_m) * i_x / ((i_a + 2 * l_m) * (i_a + 2 * l_m + 1))
+        l_d = 1.0 + l_num * l_d
+        l_d = 1.0 / (l_d if abs(l_d) > l_tiny else l_tiny)
+        l_c = 1.0 + l_num / l_c
+        if abs(l_c) < l_tiny:
+            l_c = l_tiny
+        l_f *= l_c * l_d
+        if abs(1.0 - l_c * l_d) < 1e-12:
+            break
+    return l_front * (l_f - 1.0)
+
+##
+# @brief One-sided Welch's t-test: is the mean of i_new greater than the
+#        mean of i_base?
+#
+# @return l_p @type float: p-value, None with less than two samples on a side
+#
+def welch_pvalue(i_base, i_new):
+    if len(i_base) < 2 or len(i_new) < 2:
+        return None
+    l_m1, l_v1 = _mean_var(i_base)
+    l_m2, l_v2 = _mean_var(i_new)
+    l_s1 = l_v1 / len(i_base)
+    l_s2 = l_v2 / len(i_new)
+    if l_s1 + l_s2 == 0.0:
+        return 0.0 if l_m2 > l_m1 else 1.0
+    l_t = (l_m2 - l_m1) / math.sqrt(l_s1 + l_s2)
+    l_df = (l_s1 + l_s2) ** 2 / ((l_s1 ** 2) / (len(i_base) - 1) +
+                                 (l_s2 ** 2) / (len(i_new) - 1))
+    # P(T > t) of Student's t distribution with l_df degrees of freedom
+    l_tail = 0.5 * _betainc(l_df / 2.0, 0.5, l_df / (l_df + l_t * l_t))
+    return l_tail if l_t > 0 else 1.0 - l_tail
+
+
+class OpTestIPLHistory():
+
+    ##
+    # @brief Initialize this object, creating the database if needed
+    #
+    # @param i_path @type string: SQLite database file
+    #
+    def __init__(self, i_path):
+        self.cv_path = i_path
+        try:
+            self.cv_db = sqlite3.connect(i_path, timeout=BMC_CONST.IPL_HISTORY_DB_TIMEOUT)
+            self.cv_db.executescript(g_schema)
+        except sqlite3.Error, e:
+            l_msg = "IPL history: can't open %s: %s" % (i_path, str(e))
+            print l_msg
+            raise OpTestError(l_msg)
+
+    def close(self):
+        self.cv_db.close()
+
+    ##
+    # @brief Stores the phases of a profiled IPL
+    #
+    # @param i_machine @type string: machine name, e.g. the BMC address
+    # @param i_platform @type string: BMC_CONST.HABANERO, FIRESTONE, ... or None
+    # @param i_pnor @type string: PNOR level, see pnor_level_key()
+    # @param i_profile @type OpTestIPLProfile: the IPL
+    #
+    # @return l_id @type int: id of the IPL in the database
+    #
+    def record(self, i_machine, i_platform, i_pnor, i_profile):
+        l_timeline = i_profile.timeline()
+        with self.cv_db:
+            l_cursor = self.cv_db.execute(
+                "INSERT INTO ipl (machine, platform, pnor, start, total) VALUES (?, ?, ?, ?, ?)",
+                (i_machine, i_platform, i_pnor, l_timeline['start'], l_timeline['total']))
+            l_id = l_cursor.lastrowid
+            l_phases = [(l_id, l_phase['phase'], l_phase['duration'])
+                        for l_phase in l_timeline['phases']]
+            if l_timeline['total'] is not None:
+                l_phases.append((l_id, BMC_CONST.IPL_HISTORY_TOTAL, l_timeline['total']))
+            self.cv_db.executemany("INSERT INTO phase (ipl, phase, duration) VALUES (?, ?, ?)",
+                                   l_phases)
+        print "IPL %d of %s with PNOR %s recorded in %s" % (l_id, i_machine, i_pnor,
+                                                             self.cv_path)
+        return l_id
+
+    ##
+    # @brief Returns the PNOR levels IPLed on a machine, oldest first
+    #
+    # @param i_machine @type string: machine name
+    #
+    # @return l_builds @type list: PNOR levels
+    #
+    def builds(self, i_machine):
+        l_rows = self.cv_db.execute(
+            "SELECT pnor FROM ipl WHERE machine = ? GROUP BY pnor ORDER BY MIN(start)",
+            (i_machine,))
+        return [l_row[0] for l_row in l_rows]
+
+    ##
+    # @brief Returns the durations of every phase for a build
+    #
+    # @return l_durations @type OrderedDict: phase -> list of seconds, phases
+    #         in boot order
+    #
+    def durations(self, i_machine, i_pnor):
+        l_durations = collections.OrderedDict()
+        for l_phase, l_duration in self.cv_db.execute(
+                "SELECT phase.phase, phase.duration FROM phase JOIN ipl ON phase.ipl = ipl.id "
+                "WHERE ipl.machine = ? AND ipl.pnor = ? ORDER BY ipl.start, phase.rowid",
+                (i_machine, i_pnor)):
+            l_durations.setdefault(l_phase, []).append(l_duration)
+        return l_durations
+
+    ##
+    # @brief Compares the phases of two builds on a machine
+    #
+    # @param i_machine @type string: machine name
+    # @param i_base @type string: PNOR level compared against
+    # @param i_new @type string: PNOR level compared
+    #
+    # @return l_rows @type list: one dict per phase with phase, base and new
+    #         (means), samples, delta (relative), p (None if there are not
+    #         enough samples) and regression (bool)
+    #
+    def compare(self, i_machine, i_base, i_new):
+        l_base = self.durations(i_machine, i_base)
+        l_new = self.durations(i_machine, i_new)
+        l_rows = []
+        for l_phase in [l_phase for l_phase in l_new if l_phase in l_base]:
+            l_m1 = _mean_var(l_base[l_phase])[0]
+            l_m2 = _mean_var(l_new[l_phase])[0]
+            l_delta = (l_m2 - l_m1) / l_m1 if l_m1 else 0.0
+            l_p = welch_pvalue(l_base[l_phase], l_new[l_phase])
+            l_rows.append({'phase': l_phase, 'base': l_m1, 'new': l_m2,
+                           'samples': (len(l_base[l_phase]), len(l_new[l_phase])),
+                           'delta': l_delta, 'p': l_p,
+                           'regression': l_p is not None and
+                                         l_p < BMC_CONST.IPL_REGRESSION_PVALUE and
+                                         l_delta > BMC_CONST.IPL_REGRESSION_MIN_DELTA})
+        return l_rows
+
+    ##
+    # @brief Returns a printable comparison of two builds, regressions marked
+    #
+    def report(self, i_machine, i_base, i_new):
+        l_rows = self.compare(i_machine, i_base, i_new)
+        l_lines = ["IPL times of %s" % i_machine,
+                   "  base: %s" % i_base,
+                   "  new:  %s" % i_new,
+                   "  %-28s %9s %9s %8s %7s %8s" % ("phase", "base", "new", "delta",
+                                                    "runs", "p")]
+        for l_row in l_rows:
+            l_lines.append("  %-28s %8.1fs %8.1fs %+7.1f%% %3d/%-3d %8s%s" % (
+                l_row['phase'], l_row['base'], l_row['new'], l_row['delta'] * 100,
+                l_row['samples'][0], l_row['samples'][1],
+                "-" if l_row['p'] is None else "%.4f" % l_row['p'],
+                "  REGRESSION" if l_row['regression'] else ""))
+        l_regressions = [l_row['phase'] for l_row in l_rows if l_row['regression']]
+        if l_regressions:
+            l_lines.append("Boot time regressions: %s" % ", ".join(l_regressions))
+        else:
+            l_lines.append("No boot time regression")
+        return "\n".join(l_lines)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (3, 5):
+        print "Usage: %s <ipl_history.db> <machine> [<base pnor> <new pnor>]" % sys.argv[0]
+        sys.exit(1)
+    l_history = OpTestIPLHistory(sys.argv[1])
+    if len(sys.argv) == 5:
+        l_base, l_new = sys.argv[3], sys.argv[4]
+    else:
+        l_builds = l_history.builds(sys.argv[2])
+        if len(l_builds) < 2:
+            print "Less than two builds IPLed on %s" % sys.argv[2]
+            sys.exit(1)
+        l_base, l_new = l_builds[-2], l_builds[-1]
+    print l_history.report(sys.argv[2], l_base, l_new)
+    l_rows = l_history.compare(sys.argv[2], l_base, l_new)
+    sys.exit(1 if [l_row for l_row in l_rows if l_row['regression']] else 0)
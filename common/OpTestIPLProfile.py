@@ -0,0 +1,250 @@
+#!/usr/bin/python
+# IBM_PROLOG_BEGIN_TAG
+# This is an automatically generated prolog.
+#
+# $Source: op-test-framework/common/OpTestIPLProfile.py $
+#
+# OpenPOWER Automated Test Project
+#
+# Contributors Listed Below - COPYRIGHT 2015
+# [+] International Business Machines Corp.
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+#
+# IBM_PROLOG_END_TAG
+
+## @package OpTestIPLProfile
+#  Timeline of an IPL, as seen on the SOL console
+#
+#  The milestones of a boot are taken from a running OpTestSOLCapture as the
+#  console prints them: every hostboot ISTEP, skiboot starting, the end of
+#  the OPAL init, petitboot, the host kernel and its login prompt. The
+#  timeline is saved as ipl_profile_<time>.json in the FFDC directory:
+#
+#    {"start": <epoch of the power on>,
+#     "milestones": [{"name": "skiboot", "time": 312.4}, ...],
+#     "isteps": [{"istep": "6.3", "name": "host_init_fsi", "time": 20.1}, ...],
+#     "phases": [{"phase": "hostboot -> skiboot", "start": 18.2, "duration": 294.2}, ...],
+#     "total": 612.9}
+#
+#  Times are seconds since the power on.
+
+import os
+import time
+import json
+import threading
+
+from OpTestConstants import OpTestConstants as BMC_CONST
+from OpTestError import OpTestError
+
+
+class OpTestIPLProfile():
+
+    ##
+    # @brief Initialize this object
+    #
+    # @param i_capture @type OpTestSOLCapture: running capture of the host console
+    #
+    def __init__(self, i_capture):
+        self.cv_capture = i_capture
+        self.cv_start = None
+        self.cv_milestones = []
+        self.cv_isteps = []
+        self.cv_panic = None
+        self.cv_subs = []
+        self.cv_lock = threading.Lock()
+        self.cv_done = threading.Event()
+
+    ##
+    # @brief Starts following the console, call it right before the power on
+    #
+    # @return self
+    #
+    def start(self):
+        self.cv_start = time.time()
+        self.cv_subs.append(self.cv_capture.subscribe(BMC_CONST.IPL_PROFILE_ISTEP,
+                                                      self._istep, True))
+        for l_name, l_pattern, l_after in BMC_CONST.IPL_PROFILE_MILESTONES:
+            self.cv_subs.append(self.cv_capture.subscribe(
+                l_pattern, self._milestone_callback(l_name, l_after), True))
+        self.cv_subs.append(self.cv_capture.subscribe(BMC_CONST.SOL_KERNEL_PANIC,
+                                                      self._panic))
+        return self
+
+    ##
+    # @brief Stops following the console
+    #
+    def stop(self):
+        for l_sub in self.cv_subs:
+            self.cv_capture.unsubscribe(l_sub)
+        self.cv_subs = []
+        self.cv_done.set()
+
+    ##
+    # @brief Waits for the login prompt of the host
+    #
+    # @param i_timeout @type int: seconds to wait
+    #
+    # @return True when the login prompt showed up, False on timeout, a kernel
+    #         panic or when the capture stopped
+    #
+    def wait(self, i_timeout=BMC_CONST.IPL_PROFILE_TIMEOUT):
+        l_deadline = time.time() + i_timeout
+        while not self.cv_done.is_set() and time.time() < l_deadline:
+            if not self.cv_capture.is_running():
+                break
+            self.cv_done.wait(BMC_CONST.SOL_CAPTURE_READ_TIMEOUT)
+        return self.time(BMC_CONST.IPL_PROFILE_LOGIN) is not None
+
+    ##
+    # @brief Returns when a milestone was reached
+    #
+    # @param i_name @type string: BMC_CONST.IPL_PROFILE_* milestone
+    #
+    # @return seconds since the power on, None if it was not reached
+    #
+    def time(self, i_name):
+        with self.cv_lock:
+            for l_milestone in self.cv_milestones:
+                if l_milestone['name'] == i_name:
+                    return l_milestone['time']
+        return None
+
+    ##
+    # @brief Returns the phases of the IPL, from one milestone reached to the
+    #        next one
+    #
+    # @return l_phases @type list: {"phase", "start", "duration"} dicts
+    #
+    def phases(self):
+        with self.cv_lock:
+            l_points = [("power on", 0.0)] + [(l_milestone['name'], l_milestone['time'])
+                                              for l_milestone in self.cv_milestones]
+        l_phases = []
+        for l_from, l_to in zip(l_points, l_points[1:]):
+            l_phases.append({'phase': "%s -> %s" % (l_from[0], l_to[0]),
+                             'start': l_from[1],
+                             'duration': l_to[1] - l_from[1]})
+        return l_phases
+
+    ##
+    # @brief Returns the ISTEPs that took longest
+    #
+    # @param i_count @type int: number of ISTEPs
+    #
+    # @return l_isteps @type list: {"istep", "name", "time", "duration"} dicts
+    #
+    def slowest_isteps(self, i_count=BMC_CONST.IPL_PROFILE_SLOWEST_ISTEPS):
+        with self.cv_lock:
+            l_isteps = [dict(l_istep) for l_istep in self.cv_isteps]
+        # The last ISTEP ends when skiboot starts
+        l_end = self.time(BMC_CONST.IPL_PROFILE_SKIBOOT)
+        for l_istep, l_next in zip(l_isteps, l_isteps[1:] + [None]):
+            if l_next is not None:
+                l_istep['duration'] = l_next['time'] - l_istep['time']
+            elif l_end is not None:
+                l_istep['duration'] = l_end - l_istep['time']
+            else:
+                l_istep['duration'] = 0.0
+        l_isteps.sort(key=lambda l_istep: l_istep['duration'], reverse=True)
+        return l_isteps[:i_count]
+
+    ##
+    # @brief Returns the timeline, as saved by save()
+    #
+    # @return l_timeline @type dict
+    #
+    def timeline(self):
+        l_phases = self.phases()
+        with self.cv_lock:
+            l_timeline = {'start': self.cv_start,
+                          'milestones': list(self.cv_milestones),
+                          'isteps': list(self.cv_isteps),
+                          'phases': l_phases,
+                          'total': l_phases[-1]['start'] + l_phases[-1]['duration']
+                                   if l_phases else None}
+            if self.cv_panic is not None:
+                l_timeline['panic'] = self.cv_panic
+        return l_timeline
+
+    ##
+    # @brief Saves the timeline as JSON
+    #
+    # @param i_dir @type string: directory, usually the FFDC one
+    #
+    # @return l_path @type string: file written or raise OpTestError
+    #
+    def save(self, i_dir):
+        l_path = os.path.join(i_dir, 'ipl_profile_%s.json' %
+                              time.strftime("%Y%m%d_%H%M%S", time.localtime(self.cv_start)))
+        try:
+            with open(l_path, 'w') as l_file:
+                json.dump(self.timeline(), l_file, indent=2, sort_keys=True)
+        except IOError, e:
+            l_msg = "IPL profile can not be saved to %s: %s" % (l_path, str(e))
+            print l_msg
+            raise OpTestError(l_msg)
+        print "IPL profile saved to %s" % l_path
+        return l_path
+
+    ##
+    # @brief Returns a printable summary of the phases and the slowest ISTEPs
+    #
+    def summary(self):
+        l_lines = ["IPL profile:"]
+        l_total = 0.0
+        for l_phase in self.phases():
+            l_lines.append("  %-24s %8.1fs" % (l_phase['phase'], l_phase['duration']))
+            l_total = l_phase['start'] + l_phase['duration']
+        l_lines.append("  %-24s %8.1fs" % ("total", l_total))
+        l_isteps = self.slowest_isteps()
+        if l_isteps:
+            l_lines.append("Slowest ISTEPs:")
+            for l_istep in l_isteps:
+                l_lines.append("  %-6s %-24s %8.1fs" % (l_istep['istep'], l_istep['name'] or "",
+                                                        l_istep['duration']))
+        if self.cv_panic is not None:
+            l_lines.append("Kernel panic at %.1fs" % self.cv_panic)
+        return "\n".join(l_lines)
+
+    def _elapsed(self):
+        return round(time.time() - self.cv_start, 3)
+
+    def _istep(self, i_match):
+        l_time = self._elapsed()
+        with self.cv_lock:
+            if not self.cv_isteps:
+                self.cv_milestones.append({'name': BMC_CONST.IPL_PROFILE_HOSTBOOT,
+                                           'time': l_time})
+            self.cv_isteps.append({'istep': "%s.%s" % (i_match.group(1), i_match.group(2)),
+                                   'name': i_match.group(3),
+                                   'time': l_time})
+
+    def _milestone_callback(self, i_name, i_after):
+        def _milestone(i_match):
+            l_time = self._elapsed()
+            with self.cv_lock:
+                l_names = [l_milestone['name'] for l_milestone in self.cv_milestones]
+                # Only the first one counts, e.g. the kernel of petitboot
+                # prints its Linux version too, before petitboot
+                if i_name in l_names or (i_after is not None and i_after not in l_names):
+                    return
+                self.cv_milestones.append({'name': i_name, 'time': l_time})
+            if i_name == BMC_CONST.IPL_PROFILE_LOGIN:
+                self.cv_done.set()
+        return _milestone
+
+    def _panic(self, i_match):
+        self.cv_panic = self._elapsed()
+        self.cv_done.set()
@@ -36,12 +36,23 @@ import subprocess
 import os
 import pexpect
 import sys
-import commands
+import re
+import errno
+import threading
 #from subprocess import check_output
 from OpTestConstants import OpTestConstants as BMC_CONST
 from OpTestError import OpTestError
 from OpTestHost import OpTestHost
 from OpTestUtil import OpTestUtil
+from OpTestIPMIPool import get_ipmi_pool
+from OpTestIPMILan import get_ipmi_lan, OpTestIPMILanSOL
+from OpTestSensorIndex import get_sensor_index, sdr_cache_file
+from OpTestSOLCapture import OpTestSOLCapture
+from OpTestConsoleManager import get_console_manager, OpTestConsoleSession, OpTestConsoleResult
+from OpTestBMCShell import close_bmc_shell
+from OpTestBMCReady import OpTestBMCReady
+from OpTestIPLProfile import OpTestIPLProfile
+from OpTestFFS import pnor_flashed_forget
 
 class OpTestIPMI():
 
@@ -55,9 +66,15 @@ class OpTestIPMI():
     # @param i_hostIP The IP address of the HOST
     # @param i_hostuser The userid to log into the HOST
     # @param i_hostPasswd The password of the userid to log into the HOST with
+    # @param i_backend @type string: Optional param to select how ipmitool commands
+    #        are issued, BMC_CONST.IPMI_BACKEND_IPMITOOL spawns one ipmitool per
+    #        command, BMC_CONST.IPMI_BACKEND_POOL reuses persistent sessions and
+    #        BMC_CONST.IPMI_BACKEND_NATIVE talks RMCP+ to the BMC in-process.
+    #        Default is the OP_IPMI_BACKEND environment variable, or
+    #        BMC_CONST.IPMI_DEFAULT_BACKEND if it is not set.
     #
     def __init__(self, i_bmcIP, i_bmcUser, i_bmcPwd, i_ffdcDir, i_hostip=None,
-                       i_hostuser=None, i_hostPasswd=None):
+                       i_hostuser=None, i_hostPasswd=None, i_backend=None):
 
         self.cv_bmcIP = i_bmcIP
         self.cv_bmcUser = i_bmcUser
@@ -73,6 +90,28 @@ class OpTestIPMI():
         self.host_ip = i_hostip
         self.host_user = i_hostuser
         self.host_passwd = i_hostPasswd
+        if i_backend is None:
+            i_backend = os.environ.get(BMC_CONST.IPMI_BACKEND_ENV,
+                                       BMC_CONST.IPMI_DEFAULT_BACKEND)
+        if i_backend not in BMC_CONST.IPMI_BACKENDS:
+            l_msg = "Unknown IPMI backend %s, use one of %s" % (
+                i_backend, ", ".join(BMC_CONST.IPMI_BACKENDS))
+            print l_msg
+            raise OpTestError(l_msg)
+        self.cv_backend = i_backend
+        self.cv_ipmiBackend = None
+        if i_backend == BMC_CONST.IPMI_BACKEND_POOL:
+            self.cv_ipmiBackend = get_ipmi_pool(self.cv_baseIpmiCmd)
+        elif i_backend == BMC_CONST.IPMI_BACKEND_NATIVE:
+            self.cv_ipmiBackend = get_ipmi_lan(self.cv_bmcIP, self.cv_bmcUser,
+                                               self.cv_bmcPwd)
+        # None until built, False if it can't be built for this BMC
+        self.cv_sensorIndex = None
+        self.cv_sensorIndexRetry = 0
+        # wait_for() reads sensors from several threads
+        self.cv_sensorIndexLock = threading.Lock()
+        self.cv_solCapture = None
+        self.cv_frameId = 0
 
 
     ##
@@ -91,12 +130,19 @@ class OpTestIPMI():
     #
     # @returns When background=1 it returns the subprocess child object. When
     #        background==False,it returns the output of the command.
+    #        Foreground commands are handed to the selected backend when it
+    #        supports them, anything else runs a standalone ipmitool.
     #
     #        raises: OpTestError when fails
     #
     def _ipmitool_cmd_run(self, cmd, background=False):
 
         print cmd
+        if not background and self.cv_ipmiBackend is not None and \
+           cmd.startswith(self.cv_baseIpmiCmd):
+            l_output = self._ipmi_backend_run(cmd[len(self.cv_baseIpmiCmd):])
+            if l_output is not None:
+                return l_output
         if background:
             try:
                 child = subprocess.Popen(cmd, shell=True)
@@ -119,6 +165,54 @@ class OpTestIPMI():
             return output
 
 
+    ##
+    # @brief Runs ipmitool arguments through the selected backend. A trailing
+    #        pipeline (sdr elist |grep 'Host Status') is applied locally to the
+    #        output, the same way the shell would have done it.
+    #
+    # @param i_args @type string: ipmitool arguments, for example: sdr elist|grep Host
+    #
+    # @return l_output @type string: output of the command, or None when the
+    #         command has to go through a standalone ipmitool
+    #
+    def _ipmi_backend_run(self, i_args):
+        l_parts = i_args.split('|', 1)
+        l_args = l_parts[0].strip()
+        l_pipe = None
+        if len(l_parts) > 1:
+            l_pipe = l_parts[1].strip()
+            if re.search(BMC_CONST.IPMI_BACKEND_PIPE_CHARS, l_pipe):
+                return None
+        if re.search(BMC_CONST.IPMI_BACKEND_SHELL_CHARS, l_args) or \
+           not self.cv_ipmiBackend.is_supported(l_args):
+            return None
+        try:
+            l_output = self.cv_ipmiBackend.run(l_args)
+        except OpTestError:
+            print "Falling back to a standalone ipmitool"
+            return None
+        if l_output is None or l_pipe is None:
+            return l_output
+        try:
+            l_proc = subprocess.Popen(l_pipe, stdin=subprocess.PIPE,
+                                      stdout=subprocess.PIPE,
+                                      stderr=subprocess.STDOUT, shell=True)
+        except:
+            l_msg = "Ipmitool Command Failed"
+            print l_msg
+            raise OpTestError(l_msg)
+        return l_proc.communicate(l_output)[0]
+
+    ##
+    # @brief Closes the backend sessions and the BMC shell, the BMC drops every
+    #        session when it gets reset so they have to be re-established afterwards.
+    #
+    def _ipmi_backend_close(self):
+        if self.cv_ipmiBackend is not None:
+            self.cv_ipmiBackend.close()
+        close_bmc_shell(self.cv_bmcIP)
+
+
     ##
     # @brief Runs an ipmitool command
     #    The command argument is the last ipmitool command argument, for example:
@@ -165,7 +259,14 @@ class OpTestIPMI():
     #
     def ipmi_power_off(self):
         output = self._ipmitool_cmd_run(self.cv_baseIpmiCmd + 'chassis power off')
-        time.sleep(BMC_CONST.LONG_WAIT_IPL)
+        l_timeout = time.time() + BMC_CONST.LONG_WAIT_IPL
+        while time.time() < l_timeout:
+            try:
+                if self.ipmi_power_status() == BMC_CONST.CHASSIS_POWER_OFF:
+                    break
+            except OpTestError:
+                pass
+            time.sleep(BMC_CONST.WAIT_POLL_INTERVAL)
         if 'Down/Off' in output:
             return BMC_CONST.FW_SUCCESS
         else:
@@ -196,7 +297,8 @@ class OpTestIPMI():
     #
     def ipmi_power_soft(self):
         output = self._ipmitool_cmd_run(self.cv_baseIpmiCmd + 'chassis power soft')
-        time.sleep(BMC_CONST.SHORT_WAIT_IPL)
+        self._ipmi_wait_sensor_leaves(BMC_CONST.IPMI_SENSOR_HOST_STATUS,
+                                      'S0/G0: working', BMC_CONST.SHORT_WAIT_IPL)
         if "Chassis Power Control: Soft" in output:
             return BMC_CONST.FW_SUCCESS
         else:
@@ -211,7 +313,8 @@ class OpTestIPMI():
     #
     def ipmi_power_cycle(self):
         output = self._ipmitool_cmd_run(self.cv_baseIpmiCmd + 'chassis power cycle')
-        time.sleep(BMC_CONST.SHORT_WAIT_IPL)
+        self._ipmi_wait_sensor_leaves(BMC_CONST.IPMI_SENSOR_HOST_STATUS,
+                                      'S0/G0: working', BMC_CONST.SHORT_WAIT_IPL)
         if "Chassis Power Control: Cycle" in output:
             return BMC_CONST.FW_SUCCESS
         else:
@@ -226,7 +329,8 @@ class OpTestIPMI():
     #
     def ipmi_power_reset(self):
         l_output = self._ipmitool_cmd_run(self.cv_baseIpmiCmd + 'chassis power reset')
-        time.sleep(BMC_CONST.SHORT_WAIT_IPL)
+        self._ipmi_wait_sensor_leaves(BMC_CONST.IPMI_SENSOR_HOST_STATUS,
+                                      'S0/G0: working', BMC_CONST.SHORT_WAIT_IPL)
         if BMC_CONST.CHASSIS_POWER_RESET in l_output:
             return BMC_CONST.FW_SUCCESS
         else:
@@ -236,12 +340,33 @@ class OpTestIPMI():
 
 
     ##
-    # @brief Spawns the sol logger expect script as a background process. In order to
-    #        properly kill the process the caller should call the ipmitool sol
-    #        deactivate command, i.e.: ipmitool_cmd_run('sol deactivate'). The sol.log
-    #        file is placed in the FFDC directory
+    # @brief Polls a sensor until it leaves a state, so that the state from
+    #        before a power control command is not taken for the new one
+    #
+    # @param i_name @type string: sensor name, for example: BMC_CONST.IPMI_SENSOR_HOST_STATUS
+    # @param i_state @type string: state to leave, for example: S0/G0: working
+    # @param i_timeout @type int: The number of seconds to wait at most
+    #
+    # @return True if the sensor left the state, False on timeout
+    #
+    def _ipmi_wait_sensor_leaves(self, i_name, i_state, i_timeout):
+        l_timeout = time.time() + i_timeout
+        while time.time() < l_timeout:
+            try:
+                if i_state not in self.ipmi_get_sensor_state(i_name):
+                    return True
+            except OpTestError:
+                pass
+            time.sleep(BMC_CONST.WAIT_POLL_INTERVAL)
+        return False
+
+    ##
+    # @brief Activates the SOL console and starts capturing it in the background.
+    #        The output goes to a host_sol_<time>.log file in the FFDC directory
+    #        and is kept in memory, see OpTestSOLCapture.subscribe(). The caller
+    #        should stop() the capture, deactivating the SOL also ends it.
     #
-    # @return OpTestError
+    # @return l_capture @type OpTestSOLCapture: running capture or raise OpTestError
     #
     def _ipmi_sol_capture(self):
 
@@ -251,19 +376,120 @@ class OpTestIPMI():
             print 'SOL already deactivated'
         time.sleep(BMC_CONST.SHORT_WAIT_IPL)
 
-        l_res = commands.getstatusoutput("date +%Y%m%d_%H%M")
+        logFile = self.cv_ffdcDir + '/' + 'host_sol_%s.log' % time.strftime("%Y%m%d_%H%M")
+        print "logfile: %s" % logFile
+        l_con = self.ipmi_sol_activate()
+        self.cv_solCapture = OpTestSOLCapture(l_con, logFile).start()
+        return self.cv_solCapture
 
-        logFile = self.cv_ffdcDir + '/' + 'host_sol_%s.log' % l_res[1]
-        print "Time: %s, logfile: %s" % (l_res, logFile)
-        cmd = os.getcwd() + "/../common/sol_logger.exp %s %s" % (
-            logFile, self.cv_baseIpmiCmd)
-        print cmd
+
+    ##
+    # @brief Returns a key identifying the BMC firmware level, made of the
+    #        Get Device ID response (firmware, auxiliary firmware and product
+    #        revisions)
+    #
+    # @return l_key @type string: version key or raise OpTestError
+    #
+    def ipmi_get_bmc_version_key(self):
+        l_output = self._ipmitool_cmd_run(self.cv_baseIpmiCmd + BMC_CONST.BMC_GET_DEVICE_ID)
+        l_bytes = l_output.split()
+        if len(l_bytes) < 11 or not all(re.match(r'^[0-9a-fA-F]{2}$', l_byte)
+                                        for l_byte in l_bytes):
+            l_msg = "IPMI: can't get the BMC version: %s" % l_output
+            print l_msg
+            raise OpTestError(l_msg)
+        return ''.join(l_bytes)
+
+    ##
+    # @brief Returns the sensor index of the BMC. The SDR repository is dumped
+    #        once per BMC firmware level into BMC_CONST.IPMI_SDR_CACHE_DIR, the
+    #        file doubles as an "ipmitool -S" cache.
+    #        When the BMC does not answer, e.g. during an IPL, building it is
+    #        tried again after BMC_CONST.IPMI_SENSOR_INDEX_RETRY_DELAY. Only
+    #        an SDR dump that can't be parsed disables the index for good.
+    #
+    # @return l_index @type OpTestSensorIndex: sensor index or raise OpTestError
+    #
+    def ipmi_get_sensor_index(self):
+        with self.cv_sensorIndexLock:
+            if self.cv_sensorIndex:
+                return self.cv_sensorIndex
+            if self.cv_sensorIndex is False or time.time() < self.cv_sensorIndexRetry:
+                l_msg = "IPMI: no sensor index for %s" % self.cv_bmcIP
+                raise OpTestError(l_msg)
+            try:
+                l_file = self._ipmi_sdr_dump()
+            except OpTestError:
+                self.cv_sensorIndexRetry = time.time() + BMC_CONST.IPMI_SENSOR_INDEX_RETRY_DELAY
+                raise
+            try:
+                self.cv_sensorIndex = get_sensor_index(l_file)
+            except OpTestError:
+                self.cv_sensorIndex = False
+                raise
+            return self.cv_sensorIndex
+
+    ##
+    # @brief Dumps the SDR repository to the cache, unless it is there already
+    #
+    # @return l_file @type string: SDR cache file or raise OpTestError
+    #
+    def _ipmi_sdr_dump(self):
+        l_file = sdr_cache_file(self.cv_bmcIP, self.ipmi_get_bmc_version_key())
+        if os.path.exists(l_file):
+            return l_file
         try:
-            solChild = subprocess.Popen(cmd, shell=True)
-        except:
-            raise OpTestError("sol capture Failed")
-        return solChild
+            os.makedirs(BMC_CONST.IPMI_SDR_CACHE_DIR)
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+        # Dump to a private name first, other runs may share the cache
+        l_tmp = "%s.%d" % (l_file, os.getpid())
+        l_output = self._ipmitool_cmd_run(self.cv_baseIpmiCmd +
+                                          BMC_CONST.BMC_SDR_DUMP + l_tmp)
+        if not os.path.exists(l_tmp):
+            l_msg = "IPMI: SDR dump failed: %s" % l_output
+            print l_msg
+            raise OpTestError(l_msg)
+        os.rename(l_tmp, l_file)
+        return l_file
 
+    ##
+    # @brief Reads a single sensor through the sensor index and returns the
+    #        asserted states the way sdr elist prints them. Without an index
+    #        entry it falls back to grepping the full sdr elist.
+    #
+    # @param i_name @type string: sensor name, for example: BMC_CONST.IPMI_SENSOR_HOST_STATUS
+    #
+    # @return l_output @type string: sensor states, for example: S0/G0: working
+    #
+    def ipmi_get_sensor_state(self, i_name):
+        try:
+            l_index = self.ipmi_get_sensor_index()
+            l_sensor = l_index.get(i_name)
+        except OpTestError:
+            l_sensor = None
+        if l_sensor is None:
+            return self._ipmitool_cmd_run(self.cv_baseIpmiCmd +
+                                          "sdr elist |grep '%s'" % i_name)
+        l_output = self._ipmitool_cmd_run(self.cv_baseIpmiCmd +
+                                          l_index.reading_cmd(l_sensor))
+        return l_index.decode(l_sensor, l_output)
+
+    ##
+    # @brief Returns the number of a sensor, as used by the raw sensor commands
+    #
+    # @param i_name @type string: sensor name, for example: BMC_CONST.IPMI_SENSOR_BOOT_COUNT
+    #
+    # @return sensor number @type string: for example 0x5c or raise OpTestError
+    #
+    def ipmi_get_sensor_id(self, i_name):
+        l_sensor = self.ipmi_get_sensor_index().get(i_name)
+        if l_sensor is None:
+            l_msg = "IPMI: no sensor named %s" % i_name
+            print l_msg
+            raise OpTestError(l_msg)
+        return "0x%02x" % l_sensor['number']
 
     ##
     # @brief This function starts the sol capture and waits for the IPL to end. The
@@ -279,37 +505,65 @@ class OpTestIPMI():
     #
     def ipl_wait_for_working_state(self, timeout=10):
 
-        ''' WORKAROUND FOR AMI BUG
-         A sleep is required here because Host status sensor is set incorrectly
-         to working state right after power on '''
         sol = self._ipmi_sol_capture()
-        time.sleep(60)
+        l_panic = sol.subscribe(BMC_CONST.SOL_KERNEL_PANIC)
 
         timeout = time.time() + 60*timeout
 
-        ''' AMI BUG is fixed now
-         After updating the AMI level the Host Status sensor works as expected.
-         '''
-        cmd = 'sdr elist |grep \'Host Status\''
-        while True:
-            output = self._ipmitool_cmd_run(self.cv_baseIpmiCmd + cmd)
-            if 'S0/G0: working' in output:
-                print "Host Status is S0/G0: working, IPL finished"
-                break
-            if time.time() > timeout:
-                l_msg = "IPL timeout"
+        try:
+            while True:
+                output = self.ipmi_get_sensor_state(BMC_CONST.IPMI_SENSOR_HOST_STATUS)
+                if 'S0/G0: working' in output:
+                    print "Host Status is S0/G0: working, IPL finished"
+                    break
+                if l_panic.match() is not None:
+                    l_msg = "IPL failed, host console shows: %s" % l_panic.match().group(0)
+                    print l_msg
+                    raise OpTestError(l_msg)
+                if time.time() > timeout:
+                    l_msg = "IPL timeout"
+                    print l_msg
+                    raise OpTestError(l_msg)
+                time.sleep(BMC_CONST.WAIT_POLL_INTERVAL)
+
+            try:
+                self._ipmitool_cmd_run(self.cv_baseIpmiCmd + 'sol deactivate')
+            except subprocess.CalledProcessError:
+                l_msg = 'SOL already deactivated'
                 print l_msg
                 raise OpTestError(l_msg)
-            time.sleep(5)
+        finally:
+            sol.stop()
+
+        return BMC_CONST.FW_SUCCESS
+
 
+    ##
+    # @brief Powers the system on and profiles the IPL from the SOL console
+    #        until the host login prompt, see OpTestIPLProfile. The timeline is
+    #        saved in the FFDC directory and its summary printed. The system
+    #        should be in standby.
+    #
+    # @param i_timeout @type int: seconds to wait for the login prompt
+    #
+    # @return l_profile @type OpTestIPLProfile or raise OpTestError
+    #
+    def ipmi_ipl_profile(self, i_timeout=BMC_CONST.IPL_PROFILE_TIMEOUT):
+        sol = self._ipmi_sol_capture()
+        l_profile = OpTestIPLProfile(sol).start()
         try:
-            self._ipmitool_cmd_run(self.cv_baseIpmiCmd + 'sol deactivate')
-        except subprocess.CalledProcessError:
-            l_msg = 'SOL already deactivated'
+            self.ipmi_power_on()
+            l_rc = l_profile.wait(i_timeout)
+        finally:
+            l_profile.stop()
+            sol.stop()
+        l_profile.save(self.cv_ffdcDir)
+        print l_profile.summary()
+        if not l_rc:
+            l_msg = "IPL profile: host login prompt not seen"
             print l_msg
             raise OpTestError(l_msg)
-
-        return BMC_CONST.FW_SUCCESS
+        return l_profile
 
 
     ##
@@ -326,9 +580,8 @@ class OpTestIPMI():
     #
     def ipmi_wait_for_standby_state(self, i_timeout=120):
         l_timeout = time.time() + i_timeout
-        l_cmd = 'sdr elist |grep \'Host Status\''
         while True:
-            l_output = self._ipmitool_cmd_run(self.cv_baseIpmiCmd + l_cmd)
+            l_output = self.ipmi_get_sensor_state(BMC_CONST.IPMI_SENSOR_HOST_STATUS)
             if BMC_CONST.CHASSIS_SOFT_OFF in l_output:
                 print "Host Status is S5/G2: soft-off, system reached standby"
                 break
@@ -355,9 +608,8 @@ class OpTestIPMI():
     #
     def ipmi_wait_for_os_boot_complete(self, i_timeout=10):
         l_timeout = time.time() + 60*i_timeout
-        l_cmd = 'sdr elist |grep \'OS Boot\''
         while True:
-            l_output = self._ipmitool_cmd_run(self.cv_baseIpmiCmd + l_cmd)
+            l_output = self.ipmi_get_sensor_state(BMC_CONST.IPMI_SENSOR_OS_BOOT)
             if BMC_CONST.OS_BOOT_COMPLETE in l_output:
                 print "Host OS is booted"
                 break
@@ -365,7 +617,7 @@ class OpTestIPMI():
                 l_msg = "IPL timeout"
                 print l_msg
                 raise OpTestError(l_msg)
-            time.sleep(BMC_CONST.SHORT_WAIT_IPL)
+            time.sleep(BMC_CONST.WAIT_POLL_INTERVAL)
 
         return BMC_CONST.FW_SUCCESS
 
@@ -419,9 +671,11 @@ class OpTestIPMI():
         l_initstatus = self.ipmi_power_status()
         print ("Applying Cold reset.")
         rc = self._ipmitool_cmd_run(self.cv_baseIpmiCmd + BMC_CONST.BMC_COLD_RESET)
+        self._ipmi_backend_close()
+        self.cv_sensorIndex = None
+        self.cv_sensorIndexRetry = 0
         if BMC_CONST.BMC_PASS_COLD_RESET in rc:
-            time.sleep(BMC_CONST.SHORT_WAIT_IPL)
-            self.util.PingFunc(self.cv_bmcIP, BMC_CONST.PING_RETRY_FOR_STABILITY)
+            self.ipmi_wait_for_bmc_ready()
             l_finalstatus = self.ipmi_power_status()
             if (l_initstatus != l_finalstatus):
                 print('initial status ' + str(l_initstatus))
@@ -443,12 +697,14 @@ class OpTestIPMI():
     def ipmi_warm_reset(self):
 
         l_cmd = BMC_CONST.BMC_WARM_RESET
-        print ("Applying Warm reset. Wait for "
-                            + str(BMC_CONST.BMC_WARM_RESET_DELAY) + "sec")
+        print ("Applying Warm reset.")
         rc = self._ipmitool_cmd_run(self.cv_baseIpmiCmd + l_cmd)
+        self._ipmi_backend_close()
+        self.cv_sensorIndex = None
+        self.cv_sensorIndexRetry = 0
         if BMC_CONST.BMC_PASS_WARM_RESET in rc:
             print rc
-            time.sleep(BMC_CONST.BMC_WARM_RESET_DELAY)
+            self.ipmi_wait_for_bmc_ready()
             return BMC_CONST.FW_SUCCESS
         else:
             l_msg = "Warm reset Failed"
@@ -456,6 +712,21 @@ class OpTestIPMI():
             raise OpTestError(l_msg)
 
 
+    ##
+    # @brief Waits for the BMC to be back after a reset, until it answers IPMI
+    #        and its sensor repository is populated, see OpTestBMCReady
+    #
+    # @param i_timeout @type int: seconds for the BMC to be ready
+    # @param i_waitDown @type bool: wait for the BMC to go down first
+    #
+    # @return l_timings @type list: (phase, seconds) tuples of the reset, or
+    #         raise OpTestError
+    #
+    def ipmi_wait_for_bmc_ready(self, i_timeout=BMC_CONST.BMC_READY_TIMEOUT, i_waitDown=True):
+        return OpTestBMCReady(self.cv_bmcIP, self.ipmitool_execute_command).wait(
+            i_timeout, i_waitDown)
+
+
     ##
     # @brief Preserves the network setting
     #
@@ -487,6 +758,8 @@ class OpTestIPMI():
     #
     def ipmi_code_update(self, i_image, i_imagecomponent):
 
+        # The PNOR no longer holds the image OpTestBMC.pnor_img_flash_delta() knows
+        pnor_flashed_forget(self.cv_bmcIP)
         self.ipmi_cold_reset()
         l_cmd = BMC_CONST.BMC_HPM_UPDATE + i_image + " " + i_imagecomponent
         self.ipmi_preserve_network_setting()
@@ -950,14 +1223,20 @@ class OpTestIPMI():
     ##
     # @brief Sets BIOS sensor and BOOT count to boot pnor from the primary side
     #
-    # @param i_bios_sensor @type string: Id for BIOS Golden Sensor (example habanero=0x5c)
-    # @param i_boot_sensor @type string: Id for BOOT Count Sensor (example habanero=80)
+    # @param i_bios_sensor @type string: Id for BIOS Golden Sensor (example habanero=0x5c),
+    #        looked up in the sensor index if None
+    # @param i_boot_sensor @type string: Id for BOOT Count Sensor (example habanero=80),
+    #        looked up in the sensor index if None
     #
     # @return BMC_CONST.FW_SUCCESS or else raise OpTestError if failed
     #
-    def ipmi_set_pnor_primary_side(self, i_bios_sensor, i_boot_sensor):
+    def ipmi_set_pnor_primary_side(self, i_bios_sensor=None, i_boot_sensor=None):
 
         print '\nSetting PNOR to boot into Primary Side'
+        if i_bios_sensor is None:
+            i_bios_sensor = self.ipmi_get_sensor_id(BMC_CONST.IPMI_SENSOR_BIOS_GOLDEN)
+        if i_boot_sensor is None:
+            i_boot_sensor = self.ipmi_get_sensor_id(BMC_CONST.IPMI_SENSOR_BOOT_COUNT)
 
         #Set the Boot Count sensor to 2
         l_cmd = BMC_CONST.BMC_BOOT_COUNT_2.replace('xx', i_boot_sensor)
@@ -972,14 +1251,20 @@ class OpTestIPMI():
     ##
     # @brief Sets BIOS sensor and BOOT count to boot pnor from the golden side
     #
-    # @param i_bios_sensor @type string: Id for BIOS Golden Sensor (example habanero=0x5c)
-    # @param i_boot_sensor @type string: Id for BOOT Count Sensor (example habanero=80)
+    # @param i_bios_sensor @type string: Id for BIOS Golden Sensor (example habanero=0x5c),
+    #        looked up in the sensor index if None
+    # @param i_boot_sensor @type string: Id for BOOT Count Sensor (example habanero=80),
+    #        looked up in the sensor index if None
     #
     # @return BMC_CONST.FW_SUCCESS or else raise OpTestError if failed
     #
-    def ipmi_set_pnor_golden_side(self, i_bios_sensor, i_boot_sensor):
+    def ipmi_set_pnor_golden_side(self, i_bios_sensor=None, i_boot_sensor=None):
 
         print '\nSetting PNOR to boot into Golden Side'
+        if i_bios_sensor is None:
+            i_bios_sensor = self.ipmi_get_sensor_id(BMC_CONST.IPMI_SENSOR_BIOS_GOLDEN)
+        if i_boot_sensor is None:
+            i_boot_sensor = self.ipmi_get_sensor_id(BMC_CONST.IPMI_SENSOR_BOOT_COUNT)
 
         #Set the Boot Count sensor to 2
         l_cmd = BMC_CONST.BMC_BOOT_COUNT_2.replace('xx', i_boot_sensor)
@@ -1036,10 +1321,18 @@ class OpTestIPMI():
 
     ##
     # @brief This function will activates ipmi sol console
+    #        With the native backend the console is bridged in-process and is a
+    #        pexpect fdspawn object instead.
     #
     # @return l_con @type Object: it is a object of pexpect.spawn class or raise OpTestError
     #
     def ipmi_sol_activate(self):
+        if self.cv_backend == BMC_CONST.IPMI_BACKEND_NATIVE:
+            try:
+                return OpTestIPMILanSOL(self.cv_bmcIP, self.cv_bmcUser,
+                                        self.cv_bmcPwd).activate()
+            except OpTestError:
+                print "Falling back to ipmitool sol activate"
         print  "running:%s sol activate" % self.cv_baseIpmiCmd
         try:
             l_con = pexpect.spawn('%s sol activate' % self.cv_baseIpmiCmd)
@@ -1049,28 +1342,15 @@ class OpTestIPMI():
         return l_con
 
     ##
-    # @brief This function waits for getting ipmi sol console activated.
+    # @brief This function returns a session on the shared ipmi sol console of
+    #        the machine. The console is only activated when there is no live
+    #        one already, see OpTestConsoleManager.
     #
-    # @return l_con @type Object: it is a object of pexpect.spawn class
-    #         or raise OpTestError in case of not connecting up to 10mins.
+    # @return l_con @type OpTestConsoleSession: used like a pexpect.spawn object
+    #         or raise OpTestError in case of not connecting.
     #
     def ipmi_get_console(self):
-        self.ipmi_sol_deactivate()
-        # Waiting for a small time interval as latter versions of ipmi takes a bit of time to deactivate.
-        time.sleep(BMC_CONST.IPMI_SOL_DEACTIVATE_TIME)
-        l_con = self.ipmi_sol_activate()
-        time.sleep(BMC_CONST.IPMI_SOL_ACTIVATE_TIME)
-        count = 0
-        while (not l_con.isalive()):
-            l_con = self.ipmi_sol_activate()
-            time.sleep(BMC_CONST.IPMI_SOL_ACTIVATE_TIME)
-            count += 1
-            if count > 120:
-                l_msg = "IPMI: not able to get sol console"
-                raise OpTestError(l_msg)
-        l_con.logfile = sys.stdout
-        l_con.delaybeforesend = BMC_CONST.IPMI_CON_DELAY_BEFORE_SEND
-        return l_con
+        return get_console_manager(self.cv_bmcIP).acquire(self)
 
     ##
     # @brief This function make sure, ipmi console is activated and then login to the host
@@ -1086,17 +1366,28 @@ class OpTestIPMI():
         l_host = self.host_ip
         l_user = self.host_user
         l_pwd = self.host_passwd
-        l_rc = l_con.expect_exact(BMC_CONST.IPMI_SOL_CONSOLE_ACTIVATE_OUTPUT, timeout=120)
-        if l_rc == 0:
-            print "IPMI: sol console activated"
+        if isinstance(l_con, OpTestConsoleSession):
+            # Shared console, already activated and maybe still logged in
+            l_rc = l_con.probe()
+            if l_rc in BMC_CONST.IPMI_CONSOLE_EXPECT_RANDOM_STATE:
+                l_con.reconnect(self)
+                l_rc = l_con.probe()
+            if l_rc in [BMC_CONST.IPMI_CONSOLE_EXPECT_UNIQUE_PROMPT,
+                        BMC_CONST.IPMI_CONSOLE_EXPECT_SHELL]:
+                print "IPMI: host is already logged in on the console"
+                return BMC_CONST.FW_SUCCESS
         else:
-            l_msg = "Error: not able to get IPMI console"
-            raise OpTestError(l_msg)
+            l_rc = l_con.expect_exact(BMC_CONST.IPMI_SOL_CONSOLE_ACTIVATE_OUTPUT, timeout=120)
+            if l_rc == 0:
+                print "IPMI: sol console activated"
+            else:
+                l_msg = "Error: not able to get IPMI console"
+                raise OpTestError(l_msg)
 
-        time.sleep(BMC_CONST.SHORT_WAIT_IPL)
-        l_con.send("\r")
-        time.sleep(BMC_CONST.SHORT_WAIT_IPL)
-        l_rc = l_con.expect_exact(BMC_CONST.IPMI_CONSOLE_EXPECT_ENTER_OUTPUT, timeout=120)
+            time.sleep(BMC_CONST.SHORT_WAIT_IPL)
+            l_con.send("\r")
+            time.sleep(BMC_CONST.SHORT_WAIT_IPL)
+            l_rc = l_con.expect_exact(BMC_CONST.IPMI_CONSOLE_EXPECT_ENTER_OUTPUT, timeout=120)
         if l_rc == BMC_CONST.IPMI_CONSOLE_EXPECT_LOGIN:
             l_con.sendline(l_user)
             l_rc = l_con.expect([r"[Pp]assword:", pexpect.TIMEOUT, pexpect.EOF], timeout=120)
@@ -1128,10 +1419,15 @@ class OpTestIPMI():
     #
     def ipmi_host_set_unique_prompt(self, i_con):
         self.l_con = i_con
+        if isinstance(i_con, OpTestConsoleSession) and i_con.has_prompt():
+            print "Shell prompt already set"
+            return BMC_CONST.FW_SUCCESS
         self.l_con.sendline(BMC_CONST.IPMI_HOST_UNIQUE_PROMPT)
         l_rc = self.l_con.expect_exact(BMC_CONST.IPMI_HOST_EXPECT_PEXPECT_PROMPT)
         if l_rc == 0:
             print "Shell prompt changed"
+            if isinstance(i_con, OpTestConsoleSession):
+                i_con.set_prompt()
             return BMC_CONST.FW_SUCCESS
         else:
             l_msg = "Failed during change of shell prompt"
@@ -1148,29 +1444,68 @@ class OpTestIPMI():
     #
     # @param i_cmd @type string: host linux command
     #
-    # @return res @type list: command output-if successfull,
+    # @return res @type list: the command followed by its output lines-if successfull,
     #                         monitor and returns console output(up to 8 mins)- if fails or raise OpTestError
     #
     def run_host_cmd_on_ipmi_console(self, i_cmd):
-        self.l_con.sendline(i_cmd)
-        time.sleep(BMC_CONST.SHORT_WAIT_IPL)
+        l_res = self.run_host_cmd_on_ipmi_console_framed(i_cmd)
+        if l_res.cv_exitCode is None:
+            return l_res.lines()
+        return [i_cmd] + l_res.lines()
+
+    ##
+    # @brief Runs a host OS command on the ipmi console, framed by unique begin and end
+    #        markers. The end marker carries the exit status, so the command is over as
+    #        soon as the marker shows up, without waiting for the prompt. Needs the same
+    #        setup as run_host_cmd_on_ipmi_console().
+    #
+    # @param i_cmd @type string: host linux command
+    # @param i_timeout @type int: The number of seconds to wait for the command to end
+    #
+    # @return l_res @type OpTestConsoleResult: exit status, output and elapsed time.
+    #         The exit status is None if the command did not end, the output is
+    #         then what the console showed in the meantime. Or raise OpTestError
+    #
+    def run_host_cmd_on_ipmi_console_framed(self, i_cmd, i_timeout=BMC_CONST.IPMI_CONSOLE_CMD_TIMEOUT):
+        self.cv_frameId += 1
+        l_tag = "%d_%d" % (os.getpid(), self.cv_frameId)
+        l_begin = BMC_CONST.IPMI_CONSOLE_FRAME_BEGIN + l_tag
+        l_end = BMC_CONST.IPMI_CONSOLE_FRAME_END + l_tag
+        # Split the markers with quotes, so the echo of the command line
+        # itself can't match them. The command goes in a group on its own
+        # line, so a trailing ; or & or a comment can't break the frame.
+        l_cmd = "echo %s''%s; { %s\n}; echo %s''%s $?" % (l_begin[:4], l_begin[4:],
+                                                          i_cmd.rstrip(),
+                                                          l_end[:4], l_end[4:])
+        l_start = time.time()
         try:
-            rc = self.l_con.expect(BMC_CONST.IPMI_HOST_EXPECT_PEXPECT_PROMPT_LIST, timeout=500)
-            if rc == 0:
-                res = self.l_con.before
-                res = res.splitlines()
-                return res
-            else:
-                res = self.l_con.before
-                res = res.split(i_cmd)
-                return res[-1].splitlines()
+            self.l_con.sendline(l_cmd)
+            l_rc = self.l_con.expect([re.escape(l_end) + r" (\d+)", pexpect.TIMEOUT, pexpect.EOF],
+                                     timeout=i_timeout)
         except pexpect.ExceptionPexpect, e:
             l_msg =  "host command execution on ipmi sol console failed"
             print str(e)
             raise OpTestError(l_msg)
+        l_elapsed = time.time() - l_start
+        l_output = self.l_con.before
+        l_index = l_output.rfind(l_begin)
+        if l_index >= 0:
+            l_output = l_output[l_index + len(l_begin):]
+        if l_rc != 0:
+            return OpTestConsoleResult(None, l_output.lstrip('\r\n'), l_elapsed)
+        l_exitCode = int(self.l_con.match.group(1))
+        # Eat the prompt, the next command must not see it
+        try:
+            self.l_con.expect_exact([BMC_CONST.IPMI_HOST_EXPECT_PEXPECT_PROMPT, pexpect.TIMEOUT],
+                                    timeout=BMC_CONST.IPMI_CON_DELAY_BEFORE_SEND)
+        except pexpect.ExceptionPexpect:
+            pass
+        return OpTestConsoleResult(l_exitCode, l_output.strip('\r\n'), l_elapsed)
 
     ##
-    # @brief This function will closes ipmi sol console
+    # @brief This function will closes ipmi sol console. A session on the shared
+    #        console is only handed back, the console stays open for the next
+    #        test, see ipmi_shutdown_console().
     #
     # @param i_con @type Object: it is a object of pexpect.spawn class
     #                            this is the active ipmi sol console object
@@ -1179,6 +1514,9 @@ class OpTestIPMI():
     #
     def ipmi_close_console(self, i_con):
         l_con = i_con
+        if isinstance(l_con, OpTestConsoleSession):
+            l_con.release()
+            return BMC_CONST.FW_SUCCESS
         try:
             l_con.send('~.')
             time.sleep(BMC_CONST.IPMI_WAIT_FOR_TERMINATING_SESSION)
@@ -1187,3 +1525,13 @@ class OpTestIPMI():
             l_msg = "IPMI: failed to close ipmi console"
             raise OpTestError(l_msg)
         return BMC_CONST.FW_SUCCESS
+
+    ##
+    # @brief This function closes the shared ipmi sol console of the machine
+    #        for good, e.g. before something else needs the SOL
+    #
+    # @return BMC_CONST.FW_SUCCESS
+    #
+    def ipmi_shutdown_console(self):
+        get_console_manager(self.cv_bmcIP).close()
+        return BMC_CONST.FW_SUCCESS
@@ -0,0 +1,1040 @@
+#!/usr/bin/python
+# IBM_PROLOG_BEGIN_TAG
+# This is an automatically generated prolog.
+#
+# $Source: op-test-framework/common/OpTestIPMILan.py $
+#
+# OpenPOWER Automated Test Project
+#
+# Contributors Listed Below - COPYRIGHT 2015
+# [+] International Business Machines Corp.
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+#
+# IBM_PROLOG_END_TAG
+
+## @package OpTestIPMILan
+#  Native IPMI v2.0 RMCP+ (lanplus) client
+#
+#  Talks IPMI over LAN to the BMC from python instead of forking ipmitool for
+#  every command. Sessions use RAKP-HMAC-SHA1 authentication, HMAC-SHA1-96
+#  integrity and AES-CBC-128 confidentiality (cipher suite 3, the ipmitool
+#  default) and stay open between commands. run() takes ipmitool argument
+#  strings and prints like ipmitool, so OpTestIPMI can use it as a backend.
+
+import os
+import time
+import math
+import shlex
+import socket
+import select
+import struct
+import hmac
+import hashlib
+import threading
+try:
+    import fdpexpect
+except ImportError:
+    from pexpect import fdpexpect
+
+from OpTestConstants import OpTestConstants as BMC_CONST
+from OpTestError import OpTestError
+
+# Clients are shared by every OpTestIPMI object talking to the same BMC
+g_clients = {}
+g_clientsLock = threading.Lock()
+
+RMCP_HEADER = '\x06\x00\xff\x07'
+AUTH_TYPE_RMCPP = 0x06
+
+PAYLOAD_IPMI = 0x00
+PAYLOAD_SOL = 0x01
+PAYLOAD_OPEN_SESSION_REQ = 0x10
+PAYLOAD_OPEN_SESSION_RSP = 0x11
+PAYLOAD_RAKP1 = 0x12
+PAYLOAD_RAKP2 = 0x13
+PAYLOAD_RAKP3 = 0x14
+PAYLOAD_RAKP4 = 0x15
+
+NETFN_CHASSIS = 0x00
+NETFN_SENSOR = 0x04
+NETFN_APP = 0x06
+NETFN_STORAGE = 0x0a
+NETFN_DCMI = 0x2c
+DCMI_GROUP = 0xdc
+
+# Completion codes, worded like ipmitool does
+CC_STRINGS = {
+    0xc0: "Node busy",
+    0xc1: "Invalid command",
+    0xc2: "Invalid command on LUN",
+    0xc3: "Timeout",
+    0xc4: "Out of space",
+    0xc5: "Reservation cancelled or invalid",
+    0xc6: "Request data truncated",
+    0xc7: "Request data length invalid",
+    0xc8: "Request data field length limit exceeded",
+    0xc9: "Parameter out of range",
+    0xca: "Cannot return number of requested data bytes",
+    0xcb: "Requested sensor, data, or record not found",
+    0xcc: "Invalid data field in request",
+    0xcd: "Command illegal for specified sensor or record type",
+    0xce: "Command response could not be provided",
+    0xcf: "Cannot execute duplicated request",
+    0xd0: "SDR Repository in update mode",
+    0xd1: "Device firmeware in update mode",
+    0xd2: "BMC initialization in progress",
+    0xd3: "Destination unavailable",
+    0xd4: "Insufficient privilege level",
+    0xd5: "Command not supported in present state",
+    0xd6: "Cannot execute command, command disabled",
+    0xff: "Unspecified error"}
+
+CHASSIS_CONTROLS = {"off": (0x00, "Down/Off"),
+                    "on": (0x01, "Up/On"),
+                    "cycle": (0x02, "Cycle"),
+                    "reset": (0x03, "Reset"),
+                    "diag": (0x04, "Diag"),
+                    "soft": (0x05, "Soft")}
+
+CHASSIS_POLICIES = {"always-off": 0x00, "previous": 0x01, "always-on": 0x02}
+
+DCMI_EXCEPTION_ACTIONS = {0x00: "No Action",
+                          0x01: "Hard Power Off & Log Event to SEL",
+                          0x11: "Log Event to SEL"}
+
+SENSOR_UNITS = ["unspecified", "degrees C", "degrees F", "degrees K", "Volts",
+                "Amps", "Watts", "Joules", "Coulombs", "VA", "Nits", "lumen",
+                "lux", "Candela", "kPa", "PSI", "Newton", "CFM", "RPM", "Hz",
+                "microsecond", "millisecond", "second", "minute", "hour", "day",
+                "week"]
+
+SENSOR_LINEARIZATION = {0x01: math.log, 0x02: math.log10,
+                        0x03: lambda x: math.log(x, 2), 0x04: math.exp,
+                        0x05: lambda x: 10 ** x, 0x06: lambda x: 2 ** x,
+                        0x07: lambda x: 1.0 / x, 0x08: lambda x: x * x,
+                        0x09: lambda x: x * x * x, 0x0a: math.sqrt,
+                        0x0b: lambda x: x ** (1.0 / 3)}
+
+# Generic discrete states, indexed by event/reading type code
+SENSOR_GENERIC_STATES = {
+    0x02: ["Transition to Idle", "Transition to Active", "Transition to Busy"],
+    0x03: ["State Deasserted", "State Asserted"],
+    0x04: ["Predictive Failure Deasserted", "Predictive Failure Asserted"],
+    0x05: ["Limit Not Exceeded", "Limit Exceeded"],
+    0x06: ["Performance Met", "Performance Lags"],
+    0x07: ["Transition to OK", "Transition to Non-critical from OK",
+           "Transition to Critical from less severe",
+           "Transition to Non-recoverable from less severe",
+           "Transition to Non-critical from more severe",
+           "Transition to Critical from Non-recoverable",
+           "Transition to Non-recoverable", "Monitor", "Informational"],
+    0x08: ["Device Absent", "Device Present"],
+    0x09: ["Device Disabled", "Device Enabled"],
+    0x0a: ["Transition to Running", "Transition to In Test",
+           "Transition to Power Off", "Transition to On Line",
+           "Transition to Off Line", "Transition to Off Duty",
+           "Transition to Degraded", "Transition to Power Save",
+           "Install Error"],
+    0x0b: ["Fully Redundant", "Redundancy Lost", "Redundancy Degraded",
+           "Non-Redundant: Sufficient from Redundant",
+           "Non-Redundant: Sufficient from Insufficient",
+           "Non-Redundant: Insufficient",
+           "Redundancy Degraded from Fully Redundant",
+           "Redundancy Degraded from Non-Redundant"],
+    0x0c: ["D0 Power State", "D1 Power State", "D2 Power State",
+           "D3 Power State"]}
+
+# Sensor specific states (event/reading type 0x6f), indexed by sensor type
+SENSOR_SPECIFIC_STATES = {
+    0x07: ["IERR", "Thermal Trip", "FRB1/BIST failure",
+           "FRB2/Hang in POST failure", "FRB3/Processor Startup/Init failure",
+           "Configuration Error", "SM BIOS Uncorrectable CPU-complex Error",
+           "Presence detected", "Disabled", "Terminator presence detected",
+           "Throttled", "Uncorrectable machine check exception",
+           "Correctable machine check error"],
+    0x0c: ["Correctable ECC", "Uncorrectable ECC", "Parity",
+           "Memory Scrub Failed", "Memory Device Disabled",
+           "Correctable ECC logging limit reached", "Presence Detected",
+           "Configuration Error", "Spare", "Throttled",
+           "Critical Overtemperature"],
+    0x0f: ["System Firmware Error", "System Firmware Hang",
+           "System Firmware Progress"],
+    0x1f: ["A: boot completed", "C: boot completed", "PXE boot completed",
+           "Diagnostic boot completed", "CD-ROM boot completed",
+           "ROM boot completed", "boot completed - device not specified",
+           "Installation started", "Installation completed",
+           "Installation aborted", "Installation failed"],
+    0x22: ["S0/G0: working",
+           "S1: sleeping with system hw & processor context maintained",
+           "S2: sleeping, processor context lost",
+           "S3: sleeping, processor & hw context lost, memory retained",
+           "S4: non-volatile sleep/suspend-to-disk", "S5/G2: soft-off",
+           "S4/S5: soft-off", "G3: mechanical off",
+           "Sleeping in S1/S2/S3 state", "G1: sleeping",
+           "S5: entered by override", "Legacy ON state", "Legacy OFF state",
+           "Unknown"],
+    0x23: ["Timer expired", "Hard reset", "Power down", "Power cycle",
+           "reserved", "reserved", "reserved", "reserved", "Timer interrupt"],
+    0x25: ["Present", "Absent", "Disabled"]}
+
+##
+# @brief Returns the RMCP+ client for a given BMC, creating it on first use.
+#
+# @param i_bmcIP @type string: IP Address of the BMC
+# @param i_bmcUser @type string: Userid to log into the BMC
+# @param i_bmcPwd @type string: Password of the userid to log into the BMC
+#
+# @return l_client @type OpTestIPMILan: client shared by all users of this BMC
+#
+def get_ipmi_lan(i_bmcIP, i_bmcUser, i_bmcPwd):
+    l_key = (i_bmcIP, i_bmcUser, i_bmcPwd)
+    with g_clientsLock:
+        l_client = g_clients.get(l_key)
+        if l_client is None:
+            l_client = OpTestIPMILan(i_bmcIP, i_bmcUser, i_bmcPwd)
+            g_clients[l_key] = l_client
+        return l_client
+
+
+def _rotl8(i_x, i_shift):
+    return ((i_x << i_shift) | (i_x >> (8 - i_shift))) & 0xff
+
+def _gmul(i_a, i_b):
+    l_res = 0
+    while i_b:
+        if i_b & 1:
+            l_res ^= i_a
+        i_a = ((i_a << 1) ^ 0x1b) & 0xff if i_a & 0x80 else i_a << 1
+        i_b >>= 1
+    return l_res
+
+def _aes_sboxes():
+    l_sbox = [0] * 256
+    l_p = l_q = 1
+    while True:
+        # Walk the multiplicative group with p * 3 and q / 3, so q is the
+        # inverse of p, then apply the affine transformation
+        l_p = l_p ^ ((l_p << 1) & 0xff) ^ (0x1b if l_p & 0x80 else 0)
+        l_q ^= l_q << 1
+        l_q ^= l_q << 2
+        l_q ^= l_q << 4
+        l_q &= 0xff
+        if l_q & 0x80:
+            l_q ^= 0x09
+        l_x = l_q ^ _rotl8(l_q, 1) ^ _rotl8(l_q, 2) ^ _rotl8(l_q, 3) ^ _rotl8(l_q, 4)
+        l_sbox[l_p] = l_x ^ 0x63
+        if l_p == 1:
+            break
+    l_sbox[0] = 0x63
+    l_invSbox = [0] * 256
+    for l_i in range(256):
+        l_invSbox[l_sbox[l_i]] = l_i
+    return l_sbox, l_invSbox
+
+AES_SBOX, AES_INV_SBOX = _aes_sboxes()
+AES_MUL = dict((l_n, [_gmul(l_i, l_n) for l_i in range(256)])
+               for l_n in (2, 3, 9, 11, 13, 14))
+AES_RCON = [0x01, 0x02, 0x04, 0x08, 0x10, 0x20, 0x40, 0x80, 0x1b, 0x36]
+
+
+class _AES128():
+    # Plain python AES-128, only ever used on IPMI sized payloads
+
+    def __init__(self, i_key):
+        l_words = [list(bytearray(i_key[l_i:l_i + 4])) for l_i in range(0, 16, 4)]
+        for l_i in range(4, 44):
+            l_temp = list(l_words[l_i - 1])
+            if l_i % 4 == 0:
+                l_temp = [AES_SBOX[l_b] for l_b in l_temp[1:] + l_temp[:1]]
+                l_temp[0] ^= AES_RCON[l_i / 4 - 1]
+            l_words.append([l_a ^ l_b for l_a, l_b in zip(l_words[l_i - 4], l_temp)])
+        self.cv_roundKeys = [sum(l_words[l_r * 4:l_r * 4 + 4], []) for l_r in range(11)]
+
+    def _add_round_key(self, i_state, i_round):
+        return [l_a ^ l_b for l_a, l_b in zip(i_state, self.cv_roundKeys[i_round])]
+
+    def encrypt_block(self, i_block):
+        l_s = self._add_round_key(i_block, 0)
+        for l_round in range(1, 11):
+            l_s = [AES_SBOX[l_s[(l_i + 4 * (l_i % 4)) % 16]] for l_i in range(16)]
+            if l_round != 10:
+                l_mix = []
+                for l_c in range(0, 16, 4):
+                    l_a0, l_a1, l_a2, l_a3 = l_s[l_c:l_c + 4]
+                    l_mix += [AES_MUL[2][l_a0] ^ AES_MUL[3][l_a1] ^ l_a2 ^ l_a3,
+                              l_a0 ^ AES_MUL[2][l_a1] ^ AES_MUL[3][l_a2] ^ l_a3,
+                              l_a0 ^ l_a1 ^ AES_MUL[2][l_a2] ^ AES_MUL[3][l_a3],
+                              AES_MUL[3][l_a0] ^ l_a1 ^ l_a2 ^ AES_MUL[2][l_a3]]
+                l_s = l_mix
+            l_s = self._add_round_key(l_s, l_round)
+        return l_s
+
+    def decrypt_block(self, i_block):
+        l_s = self._add_round_key(i_block, 10)
+        for l_round in range(9, -1, -1):
+            l_s = [AES_INV_SBOX[l_s[(l_i - 4 * (l_i % 4)) % 16]] for l_i in range(16)]
+            l_s = self._add_round_key(l_s, l_round)
+            if l_round != 0:
+                l_mix = []
+                for l_c in range(0, 16, 4):
+                    l_a0, l_a1, l_a2, l_a3 = l_s[l_c:l_c + 4]
+                    l_mix += [AES_MUL[14][l_a0] ^ AES_MUL[11][l_a1] ^ AES_MUL[13][l_a2] ^ AES_MUL[9][l_a3],
+                              AES_MUL[9][l_a0] ^ AES_MUL[14][l_a1] ^ AES_MUL[11][l_a2] ^ AES_MUL[13][l_a3],
+                              AES_MUL[13][l_a0] ^ AES_MUL[9][l_a1] ^ AES_MUL[14][l_a2] ^ AES_MUL[11][l_a3],
+                              AES_MUL[11][l_a0] ^ AES_MUL[13][l_a1] ^ AES_MUL[9][l_a2] ^ AES_MUL[14][l_a3]]
+                l_s = l_mix
+        return l_s
+
+    def cbc_encrypt(self, i_iv, i_data):
+        l_prev = list(bytearray(i_iv))
+        l_data = bytearray(i_data)
+        l_out = []
+        for l_i in range(0, len(l_data), 16):
+            l_prev = self.encrypt_block([l_a ^ l_b for l_a, l_b in zip(l_data[l_i:l_i + 16], l_prev)])
+            l_out += l_prev
+        return str(bytearray(l_out))
+
+    def cbc_decrypt(self, i_iv, i_data):
+        l_prev = list(bytearray(i_iv))
+        l_data = bytearray(i_data)
+        l_out = []
+        for l_i in range(0, len(l_data), 16):
+            l_block = list(l_data[l_i:l_i + 16])
+            l_out += [l_a ^ l_b for l_a, l_b in zip(self.decrypt_block(l_block), l_prev)]
+            l_prev = l_block
+        return str(bytearray(l_out))
+
+
+class OpTestIPMILan():
+
+    ##
+    # @brief Initialize this object
+    #
+    # @param i_bmcIP @type string: IP Address of the BMC
+    # @param i_bmcUser @type string: Userid to log into the BMC
+    # @param i_bmcPwd @type string: Password of the userid to log into the BMC
+    # @param i_port @type int: UDP port of the BMC RMCP+ service
+    #
+    def __init__(self, i_bmcIP, i_bmcUser, i_bmcPwd, i_port=BMC_CONST.IPMI_LAN_PORT):
+        self.cv_bmcIP = i_bmcIP
+        self.cv_bmcUser = i_bmcUser or ''
+        self.cv_bmcPwd = i_bmcPwd or ''
+        self.cv_port = i_port
+        self.cv_lock = threading.RLock()
+        self.cv_sock = None
+        self.cv_lastUsed = 0
+        self.cv_rqSeq = 0
+        self.cv_sdrs = None
+        self._session_reset()
+
+    ##
+    # @brief Checks whether an ipmitool argument string is implemented by
+    #        this client. Anything else has to go through ipmitool.
+    #
+    # @param i_args @type string: ipmitool arguments, for example: chassis power on
+    #
+    # @return True if run() knows the command, else False
+    #
+    def is_supported(self, i_args):
+        try:
+            l_args = shlex.split(i_args)
+        except ValueError:
+            return False
+        return self._lookup(l_args) is not None
+
+    ##
+    # @brief Runs an ipmitool command natively
+    #
+    # @param i_args @type string: ipmitool arguments, see is_supported()
+    #
+    # @return l_output @type string: output formatted the way ipmitool prints it,
+    #         None if this particular case still needs ipmitool, or raise OpTestError
+    #
+    def run(self, i_args):
+        l_args = shlex.split(i_args)
+        l_func = self._lookup(l_args)
+        if l_func is None:
+            l_msg = "IPMI: command not supported by the RMCP+ client: %s" % i_args
+            print l_msg
+            raise OpTestError(l_msg)
+        return l_func(l_args)
+
+    ##
+    # @brief Sends an IPMI request to the BMC, opening or re-opening the
+    #        session if needed
+    #
+    # @param i_netfn @type int: network function
+    # @param i_cmd @type int: command
+    # @param i_data @type list: request data bytes
+    # @param i_lun @type int: responder LUN
+    # @param i_retry @type bool: re-send on a new session if the BMC did not
+    #        answer. Only for reads: the BMC may have run a command whose
+    #        reply got lost, e.g. a power off, and it would run twice.
+    #
+    # @return (completion code, response data bytes) or raise OpTestError
+    #
+    def raw(self, i_netfn, i_cmd, i_data=[], i_lun=0, i_retry=False):
+        with self.cv_lock:
+            for l_try in range(2):
+                if self.cv_sock is not None and \
+                   time.time() - self.cv_lastUsed > BMC_CONST.IPMI_LAN_IDLE_TIMEOUT:
+                    # The BMC has most likely timed out this session already
+                    self.close()
+                if self.cv_sock is None:
+                    self._session_open()
+                try:
+                    l_rsp = self._ipmi_request(i_netfn, i_cmd, i_data, i_lun)
+                    self.cv_lastUsed = time.time()
+                    return l_rsp
+                except OpTestError:
+                    self._session_drop()
+                    if l_try or not i_retry:
+                        raise
+
+    ##
+    # @brief Closes the session with the BMC and forgets the cached SDRs.
+    #        Used when the BMC gets reset under the client.
+    #
+    def close(self):
+        with self.cv_lock:
+            if self.cv_sock is not None and self.cv_aes is not None:
+                try:
+                    self._ipmi_request(NETFN_APP, 0x3c,
+                                       list(bytearray(struct.pack('<I', self.cv_sidc))),
+                                       i_tries=1)
+                except OpTestError:
+                    pass
+            self._session_drop()
+            self.cv_sdrs = None
+
+    def _lookup(self, i_args):
+        l_len = len(i_args)
+        if l_len == 3 and i_args[:2] == ["chassis", "power"] and \
+           (i_args[2] in CHASSIS_CONTROLS or i_args[2] == "status"):
+            return self._cmd_chassis_power
+        if l_len == 3 and i_args[:2] == ["chassis", "policy"] and \
+           i_args[2] in CHASSIS_POLICIES:
+            return self._cmd_chassis_policy
+        if l_len == 3 and i_args[:2] == ["mc", "reset"] and i_args[2] in ("cold", "warm"):
+            return self._cmd_mc_reset
+        if l_len >= 3 and i_args[0] == "raw":
+            try:
+                [int(l_arg, 0) for l_arg in i_args[1:]]
+            except ValueError:
+                return None
+            return self._cmd_raw
+        if i_args in (["sel", "clear"], ["sel", "list"], ["sel", "elist"]):
+            return self._cmd_sel
+        if i_args == ["sdr", "elist"]:
+            return self._cmd_sdr_elist
+        if i_args == ["sol", "deactivate"]:
+            return self._cmd_sol_deactivate
+        if l_len >= 3 and i_args[:2] == ["dcmi", "power"]:
+            if i_args[2:] in (["reading"], ["get_limit"], ["activate"], ["deactivate"]):
+                return self._cmd_dcmi_power
+            if l_len == 5 and i_args[2:4] == ["set_limit", "limit"] and i_args[4].isdigit():
+                return self._cmd_dcmi_power
+        return None
+
+    def _cc_str(self, i_cc):
+        return CC_STRINGS.get(i_cc, "Unknown (0x%02x)" % i_cc)
+
+    def _cmd_chassis_power(self, i_args):
+        if i_args[2] == "status":
+            l_cc, l_rsp = self.raw(NETFN_CHASSIS, 0x01, i_retry=True)
+            if l_cc != 0 or not l_rsp:
+                return "Error sending Chassis Status command: %s\n" % self._cc_str(l_cc)
+            return "Chassis Power is %s\n" % ("on" if l_rsp[0] & 0x01 else "off")
+        l_ctl, l_desc = CHASSIS_CONTROLS[i_args[2]]
+        l_cc, l_rsp = self.raw(NETFN_CHASSIS, 0x02, [l_ctl])
+        if l_cc != 0:
+            return "Set Chassis Power Control to %s failed: %s\n" % (l_desc, self._cc_str(l_cc))
+        return "Chassis Power Control: %s\n" % l_desc
+
+    def _cmd_chassis_policy(self, i_args):
+        l_cc, l_rsp = self.raw(NETFN_CHASSIS, 0x06, [CHASSIS_POLICIES[i_args[2]]])
+        if l_cc != 0:
+            return "Error in Power Restore Policy command: %s\n" % self._cc_str(l_cc)
+        return "Set chassis power restore policy to %s\n" % i_args[2]
+
+    def _cmd_mc_reset(self, i_args):
+        l_cmd = 0x02 if i_args[2] == "cold" else 0x03
+        try:
+            l_cc, l_rsp = self.raw(NETFN_APP, l_cmd)
+        except OpTestError:
+            # A cold reset may take the BMC down before it answers
+            if i_args[2] != "cold":
+                return "MC reset command failed.\n"
+            l_cc = 0
+        self._session_drop()
+        self.cv_sdrs = None
+        if l_cc != 0:
+            return "MC reset command failed: %s\n" % self._cc_str(l_cc)
+        return "Sent %s reset command to MC\n" % i_args[2]
+
+    def _cmd_raw(self, i_args):
+        l_bytes = [int(l_arg, 0) & 0xff for l_arg in i_args[1:]]
+        l_netfn, l_cmd, l_data = l_bytes[0], l_bytes[1], l_bytes[2:]
+        try:
+            l_cc, l_rsp = self.raw(l_netfn, l_cmd, l_data)
+        except OpTestError:
+            return "Unable to send RAW command (channel=0x0 netfn=0x%x lun=0x0 cmd=0x%x)\n" % \
+                   (l_netfn, l_cmd)
+        if l_cc != 0:
+            return "Unable to send RAW command (channel=0x0 netfn=0x%x lun=0x0 cmd=0x%x rsp=0x%x): %s\n" % \
+                   (l_netfn, l_cmd, l_cc, self._cc_str(l_cc))
+        l_output = ''
+        for l_i in range(len(l_rsp)):
+            if l_i and l_i % 16 == 0:
+                l_output += '\n'
+            l_output += ' %02x' % l_rsp[l_i]
+        return l_output + '\n'
+
+    def _cmd_sel(self, i_args):
+        if i_args[1] == "clear":
+            l_cc, l_rsp = self.raw(NETFN_STORAGE, 0x42)
+            if l_cc != 0 or len(l_rsp) < 2:
+                return "Unable to reserve SEL: %s\n" % self._cc_str(l_cc)
+            l_cc, l_rsp = self.raw(NETFN_STORAGE, 0x47,
+                                   l_rsp[:2] + [ord('C'), ord('L'), ord('R'), 0xaa])
+            if l_cc != 0:
+                return "Unable to clear SEL: %s\n" % self._cc_str(l_cc)
+            return "Clearing SEL.  Please allow a few seconds to erase.\n"
+        l_cc, l_rsp = self.raw(NETFN_STORAGE, 0x40, i_retry=True)
+        if l_cc == 0 and len(l_rsp) >= 3 and l_rsp[1] == 0 and l_rsp[2] == 0:
+            return "SEL has no entries\n"
+        # Decoding events is left to ipmitool
+        return None
+
+    def _cmd_sol_deactivate(self, i_args):
+        l_cc, l_rsp = self.raw(NETFN_APP, 0x49, [PAYLOAD_SOL, 0x01, 0, 0, 0, 0])
+        if l_cc == 0x80:
+            return "Info: SOL payload already de-activated\n"
+        if l_cc != 0:
+            return "Error de-activating SOL payload: %s\n" % self._cc_str(l_cc)
+        return ''
+
+    def _cmd_dcmi_power(self, i_args):
+        if i_args[2] == "reading":
+            l_cc, l_rsp = self.raw(NETFN_DCMI, 0x02, [DCMI_GROUP, 0x01, 0x00, 0x00],
+                                   i_retry=True)
+            if l_cc != 0 or len(l_rsp) < 18:
+                return "Get Power Reading failed: %s\n" % self._cc_str(l_cc)
+            l_cur, l_min, l_max, l_avg, l_time, l_period, l_state = \
+                struct.unpack('<HHHHIIB', str(bytearray(l_rsp[1:18])))
+            return "\n" \
+                   "    Instantaneous power reading:              %8d Watts\n" \
+                   "    Minimum during sampling period:           %8d Watts\n" \
+                   "    Maximum during sampling period:           %8d Watts\n" \
+                   "    Average power reading over sample period: %8d Watts\n" \
+                   "    IPMI timestamp:                           %s\n" \
+                   "    Sampling period:                          %08u Milliseconds\n" \
+                   "    Power reading state is:                   %s\n\n\n" % \
+                   (l_cur, l_min, l_max, l_avg, time.ctime(l_time), l_period,
+                    "activated" if l_state & 0x40 else "deactivated")
+        if i_args[2] in ("activate", "deactivate"):
+            l_on = 0x01 if i_args[2] == "activate" else 0x00
+            l_cc, l_rsp = self.raw(NETFN_DCMI, 0x05, [DCMI_GROUP, l_on, 0x00, 0x00])
+            if l_cc != 0:
+                return "\n    Power limit %s failed: %s\n" % (i_args[2], self._cc_str(l_cc))
+            return "\n    Power limit successfully %sd\n\n" % i_args[2]
+        l_output = self._dcmi_get_limit()
+        if i_args[2] == "get_limit":
+            return l_output
+        if self.cv_dcmiLimit is None:
+            return l_output
+        l_action, l_limit, l_corr, l_period = self.cv_dcmiLimit
+        l_data = [DCMI_GROUP, 0x00, 0x00, 0x00, l_action] + \
+                 list(bytearray(struct.pack('<HIHH', int(i_args[4]), l_corr, 0, l_period)))
+        l_cc, l_rsp = self.raw(NETFN_DCMI, 0x04, l_data)
+        if l_cc != 0:
+            return "\n    Set Power Limit failed: %s\n" % self._cc_str(l_cc)
+        return self._dcmi_get_limit()
+
+    def _dcmi_get_limit(self):
+        self.cv_dcmiLimit = None
+        l_cc, l_rsp = self.raw(NETFN_DCMI, 0x03, [DCMI_GROUP, 0x00, 0x00], i_retry=True)
+        # 0x80 only means no limit is active, the values are still there
+        if l_cc not in (0x00, 0x80) or len(l_rsp) < 14:
+            return "\n    Get Power Limit failed: %s\n" % self._cc_str(l_cc)
+        l_action = l_rsp[3]
+        l_limit, l_corr, l_res, l_period = struct.unpack('<HIHH', str(bytearray(l_rsp[4:14])))
+        self.cv_dcmiLimit = (l_action, l_limit, l_corr, l_period)
+        return "\n" \
+               "    Current Limit State: %s\n" \
+               "    Exception actions:   %s\n" \
+               "    Power Limit:         %i Watts\n" \
+               "    Correction time:     %i milliseconds\n" \
+               "    Sampling period:     %i seconds\n\n" % \
+               ("No Active Power Limit" if l_cc == 0x80 else "Power Limit Active",
+                DCMI_EXCEPTION_ACTIONS.get(l_action, "OEM 0x%02x" % l_action),
+                l_limit, l_corr, l_period)
+
+    def _cmd_sdr_elist(self, i_args):
+        l_output = ''
+        for l_sdr in self._sdr_records():
+            l_output += self._sdr_elist_line(l_sdr) + '\n'
+        return l_output
+
+    def _sdr_records(self):
+        if self.cv_sdrs is not None:
+            return self.cv_sdrs
+        l_sdrs = []
+        l_resv = self._sdr_reserve()
+        l_id = 0
+        while l_id != 0xffff and len(l_sdrs) < BMC_CONST.IPMI_LAN_SDR_MAX:
+            try:
+                l_next, l_rec = self._sdr_get(l_resv, l_id)
+            except OpTestError:
+                # Someone else touched the repository, start the record over
+                l_resv = self._sdr_reserve()
+                l_next, l_rec = self._sdr_get(l_resv, l_id)
+            if l_rec[3] in (0x01, 0x02) and l_rec[5] == 0x20:
+                l_sdrs.append(l_rec)
+            l_id = l_next
+        self.cv_sdrs = l_sdrs
+        return l_sdrs
+
+    def _sdr_reserve(self):
+        l_cc, l_rsp = self.raw(NETFN_STORAGE, 0x22, i_retry=True)
+        if l_cc != 0 or len(l_rsp) < 2:
+            l_msg = "IPMI: unable to reserve the SDR repository: %s" % self._cc_str(l_cc)
+            print l_msg
+            raise OpTestError(l_msg)
+        return l_rsp[:2]
+
+    def _sdr_get(self, i_resv, i_id):
+        l_rec = []
+        l_len = 5
+        l_next = 0xffff
+        while len(l_rec) < l_len:
+            l_count = min(BMC_CONST.IPMI_LAN_SDR_CHUNK, l_len - len(l_rec))
+            l_cc, l_rsp = self.raw(NETFN_STORAGE, 0x23,
+                                   i_resv + [i_id & 0xff, i_id >> 8, len(l_rec), l_count],
+                                   i_retry=True)
+            if l_cc != 0 or len(l_rsp) < 2 + l_count:
+                l_msg = "IPMI: unable to read SDR record 0x%04x: %s" % (i_id, self._cc_str(l_cc))
+                print l_msg
+                raise OpTestError(l_msg)
+            l_next = l_rsp[0] | (l_rsp[1] << 8)
+            l_rec += l_rsp[2:2 + l_count]
+            if len(l_rec) == 5:
+                l_len = 5 + l_rec[4]
+        return l_next, l_rec
+
+    def _sdr_elist_line(self, i_rec):
+        if i_rec[3] == 0x01:
+            l_idOffset = 47
+        else:
+            l_idOffset = 31
+        l_name = str(bytearray(i_rec[l_idOffset + 1:l_idOffset + 1 + (i_rec[l_idOffset] & 0x1f)]))
+        l_status, l_desc = self._sensor_read(i_rec)
+        return "%-16s | %02Xh | %-3s | %2d.%1d | %s" % \
+               (l_name, i_rec[7], l_status, i_rec[8], i_rec[9], l_desc)
+
+    def _sensor_read(self, i_rec):
+        try:
+            l_cc, l_rsp = self.raw(NETFN_SENSOR, 0x2d, [i_rec[7]], i_rec[6] & 0x03,
+                                   i_retry=True)
+        except OpTestError:
+            l_cc, l_rsp = None, []
+        if l_cc != 0 or len(l_rsp) < 2 or l_rsp[1] & 0x20:
+            return "ns", "No Reading"
+        if not l_rsp[1] & 0x40:
+            return "ns", "Disabled"
+        if i_rec[13] == 0x01:
+            return self._sensor_threshold(i_rec, l_rsp)
+        l_states = 0
+        for l_i, l_byte in enumerate(l_rsp[2:4]):
+            l_states |= l_byte << (8 * l_i)
+        if i_rec[13] == 0x6f:
+            l_strings = SENSOR_SPECIFIC_STATES.get(i_rec[12], [])
+        else:
+            l_strings = SENSOR_GENERIC_STATES.get(i_rec[13], [])
+        l_desc = [l_strings[l_i] for l_i in range(len(l_strings)) if l_states & (1 << l_i)]
+        return "ok", ", ".join(l_desc)
+
+    def _sensor_threshold(self, i_rec, i_rsp):
+        l_status = "ok"
+        if len(i_rsp) > 2:
+            for l_mask, l_str in ((0x04, "nr"), (0x20, "nr"), (0x02, "cr"),
+                                  (0x10, "cr"), (0x01, "nc"), (0x08, "nc")):
+                if i_rsp[2] & l_mask:
+                    l_status = l_str
+                    break
+        l_unit = SENSOR_UNITS[i_rec[21]] if i_rec[21] < len(SENSOR_UNITS) else "unspecified"
+        l_val = i_rsp[0]
+        if i_rec[3] == 0x01:
+            if (i_rec[20] >> 6) == 0x03:
+                return l_status, "No Reading"
+            l_val = self._sensor_convert(i_rec, l_val)
+        if l_val == int(l_val):
+            return l_status, "%d %s" % (l_val, l_unit)
+        return l_status, "%.2f %s" % (l_val, l_unit)
+
+    def _sensor_convert(self, i_rec, i_raw):
+        def signed(i_val, i_bits):
+            return i_val - (1 << i_bits) if i_val & (1 << (i_bits - 1)) else i_val
+        l_format = i_rec[20] >> 6
+        if l_format == 0x01 and i_raw & 0x80:
+            i_raw -= 0xff
+        elif l_format == 0x02:
+            i_raw = signed(i_raw, 8)
+        l_m = signed(i_rec[24] | ((i_rec[25] & 0xc0) << 2), 10)
+        l_b = signed(i_rec[26] | ((i_rec[27] & 0xc0) << 2), 10)
+        l_rexp = signed(i_rec[29] >> 4, 4)
+        l_bexp = signed(i_rec[29] & 0x0f, 4)
+        l_val = (l_m * i_raw + l_b * 10.0 ** l_bexp) * 10.0 ** l_rexp
+        l_func = SENSOR_LINEARIZATION.get(i_rec[23] & 0x7f)
+        if l_func is not None:
+            try:
+                l_val = l_func(l_val)
+            except (ValueError, ZeroDivisionError, OverflowError):
+                pass
+        return l_val
+
+    def _session_reset(self):
+        self.cv_sidm = 0
+        self.cv_sidc = 0
+        self.cv_seq = 0
+        self.cv_k1 = None
+        self.cv_aes = None
+        self.cv_dcmiLimit = None
+
+    def _session_drop(self):
+        if self.cv_sock is not None:
+            try:
+                self.cv_sock.close()
+            except socket.error:
+                pass
+        self.cv_sock = None
+        self._session_reset()
+
+    def _session_fail(self, i_reason):
+        self._session_drop()
+        l_msg = "Error: Unable to establish IPMI v2 / RMCP+ session (%s)" % i_reason
+        print l_msg
+        raise OpTestError(l_msg)
+
+    def _session_open(self):
+        try:
+            self.cv_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.cv_sock.connect((self.cv_bmcIP, self.cv_port))
+        except socket.error, e:
+            self._session_fail(str(e))
+        l_tag = ord(os.urandom(1))
+        self.cv_sidm = struct.unpack('<I', os.urandom(4))[0] | 0x1
+
+        # Open Session, ask for cipher suite 3
+        l_req = struct.pack('<BBHI', l_tag, BMC_CONST.IPMI_LAN_PRIVILEGE, 0, self.cv_sidm) + \
+                struct.pack('<BHBB3x', 0x00, 0, 8, 0x01) + \
+                struct.pack('<BHBB3x', 0x01, 0, 8, 0x01) + \
+                struct.pack('<BHBB3x', 0x02, 0, 8, 0x01)
+        l_rsp = self._exchange(PAYLOAD_OPEN_SESSION_REQ, l_req, PAYLOAD_OPEN_SESSION_RSP, l_tag)
+        if len(l_rsp) < 2 or ord(l_rsp[1]) != 0:
+            self._session_fail("open session status 0x%02x" % ord(l_rsp[1:2] or '\xff'))
+        if len(l_rsp) < 36:
+            self._session_fail("short open session response")
+        l_sidm, self.cv_sidc = struct.unpack('<II', l_rsp[4:12])
+        if l_sidm != self.cv_sidm or [ord(l_rsp[l_i]) for l_i in (16, 24, 32)] != [1, 1, 1]:
+            self._session_fail("cipher suite 3 not accepted")
+
+        # RAKP 1/2, name only lookup at the requested privilege
+        l_rm = os.urandom(16)
+        l_role = 0x10 | BMC_CONST.IPMI_LAN_PRIVILEGE
+        l_user = self.cv_bmcUser[:16]
+        l_req = struct.pack('<B3xI', l_tag, self.cv_sidc) + l_rm + \
+                struct.pack('<BHB', l_role, 0, len(l_user)) + l_user
+        l_rsp = self._exchange(PAYLOAD_RAKP1, l_req, PAYLOAD_RAKP2, l_tag)
+        if len(l_rsp) < 2 or ord(l_rsp[1]) != 0:
+            self._session_fail("RAKP 2 status 0x%02x" % ord(l_rsp[1:2] or '\xff'))
+        if len(l_rsp) < 60:
+            self._session_fail("short RAKP 2 message")
+        l_rc = l_rsp[8:24]
+        l_guid = l_rsp[24:40]
+        l_kuid = self.cv_bmcPwd[:20]
+        l_ids = struct.pack('<II', self.cv_sidm, self.cv_sidc)
+        l_names = chr(l_role) + chr(len(l_user)) + l_user
+        l_auth = hmac.new(l_kuid, l_ids + l_rm + l_rc + l_guid + l_names, hashlib.sha1).digest()
+        if l_auth != l_rsp[40:60]:
+            self._session_fail("RAKP 2 HMAC is invalid, check the password")
+
+        # Session keys, no BMC key (Kg) configured so Kuid is used
+        l_sik = hmac.new(l_kuid, l_rm + l_rc + l_names, hashlib.sha1).digest()
+        l_k1 = hmac.new(l_sik, '\x01' * 20, hashlib.sha1).digest()
+        l_k2 = hmac.new(l_sik, '\x02' * 20, hashlib.sha1).digest()
+
+        # RAKP 3/4
+        l_auth = hmac.new(l_kuid, l_rc + struct.pack('<I', self.cv_sidm) + l_names,
+                          hashlib.sha1).digest()
+        l_req = struct.pack('<BB2xI', l_tag, 0, self.cv_sidc) + l_auth
+        l_rsp = self._exchange(PAYLOAD_RAKP3, l_req, PAYLOAD_RAKP4, l_tag)
+        if len(l_rsp) < 2 or ord(l_rsp[1]) != 0:
+            self._session_fail("RAKP 4 status 0x%02x" % ord(l_rsp[1:2] or '\xff'))
+        l_icv = hmac.new(l_sik, l_rm + struct.pack('<I', self.cv_sidc) + l_guid,
+                         hashlib.sha1).digest()[:12]
+        if l_rsp[8:20] != l_icv:
+            self._session_fail("RAKP 4 integrity check value is invalid")
+
+        self.cv_k1 = l_k1
+        self.cv_aes = _AES128(l_k2[:16])
+        self.cv_lastUsed = time.time()
+        l_cc, l_data = self._ipmi_request(NETFN_APP, 0x3b, [BMC_CONST.IPMI_LAN_PRIVILEGE])
+        if l_cc != 0:
+            self._session_fail("set session privilege level: %s" % self._cc_str(l_cc))
+
+    def _exchange(self, i_type, i_payload, i_rspType, i_tag):
+        for l_try in range(BMC_CONST.IPMI_LAN_RETRIES):
+            self._send(i_type, i_payload)
+            l_deadline = time.time() + BMC_CONST.IPMI_LAN_TIMEOUT
+            while True:
+                l_pkt = self._recv(l_deadline)
+                if l_pkt is None:
+                    break
+                if l_pkt[0] == i_rspType and l_pkt[1][:1] == chr(i_tag):
+                    return l_pkt[1]
+        self._session_fail("no response from %s" % self.cv_bmcIP)
+
+    def _ipmi_request(self, i_netfn, i_cmd, i_data=[], i_lun=0,
+                      i_tries=BMC_CONST.IPMI_LAN_RETRIES):
+        self.cv_rqSeq = (self.cv_rqSeq + 1) & 0x3f
+        l_msg = self._ipmi_msg(i_netfn, i_cmd, i_data, i_lun, self.cv_rqSeq)
+        for l_try in range(i_tries):
+            self._send(PAYLOAD_IPMI, l_msg)
+            l_deadline = time.time() + BMC_CONST.IPMI_LAN_TIMEOUT
+            while True:
+                l_pkt = self._recv(l_deadline)
+                if l_pkt is None:
+                    break
+                l_rsp = bytearray(l_pkt[1])
+                if l_pkt[0] != PAYLOAD_IPMI or len(l_rsp) < 8:
+                    continue
+                if l_rsp[1] >> 2 != i_netfn + 1 or l_rsp[4] >> 2 != self.cv_rqSeq or \
+                   l_rsp[5] != i_cmd:
+                    continue
+                return l_rsp[6], list(l_rsp[7:-1])
+        l_msg = "IPMI: no response from %s for netfn 0x%02x cmd 0x%02x" % \
+                (self.cv_bmcIP, i_netfn, i_cmd)
+        print l_msg
+        raise OpTestError(l_msg)
+
+    def _ipmi_msg(self, i_netfn, i_cmd, i_data, i_lun, i_seq):
+        l_hdr = [0x20, (i_netfn << 2) | (i_lun & 0x03)]
+        l_body = [0x81, i_seq << 2, i_cmd] + list(i_data)
+        return str(bytearray(l_hdr + [-sum(l_hdr) & 0xff] + l_body + [-sum(l_body) & 0xff]))
+
+    def _send(self, i_type, i_payload):
+        l_type = i_type
+        if self.cv_aes is not None:
+            # Confidentiality trailer: 1, 2, .. N pad bytes, then N
+            l_pad = (16 - (len(i_payload) + 1) % 16) % 16
+            l_data = i_payload + ''.join(chr(l_i) for l_i in range(1, l_pad + 1)) + chr(l_pad)
+            l_iv = os.urandom(16)
+            i_payload = l_iv + self.cv_aes.cbc_encrypt(l_iv, l_data)
+            l_type |= 0x80
+        l_sid = 0
+        if self.cv_k1 is not None:
+            l_type |= 0x40
+            l_sid = self.cv_sidc
+            self.cv_seq = (self.cv_seq + 1) & 0xffffffff or 1
+        l_msg = struct.pack('<BBIIH', AUTH_TYPE_RMCPP, l_type, l_sid,
+                            self.cv_seq, len(i_payload)) + i_payload
+        if self.cv_k1 is not None:
+            l_pad = (4 - (len(l_msg) + 2) % 4) % 4
+            l_msg += '\xff' * l_pad + chr(l_pad) + '\x07'
+            l_msg += hmac.new(self.cv_k1, l_msg, hashlib.sha1).digest()[:12]
+        try:
+            self.cv_sock.send(RMCP_HEADER + l_msg)
+        except socket.error, e:
+            l_msg = "IPMI: failed to send to %s: %s" % (self.cv_bmcIP, str(e))
+            print l_msg
+            raise OpTestError(l_msg)
+
+    def _recv(self, i_deadline):
+        while True:
+            l_wait = max(0, i_deadline - time.time())
+            try:
+                l_ready = select.select([self.cv_sock], [], [], l_wait)[0]
+                if not l_ready:
+                    return None
+                l_pkt = self.cv_sock.recv(4096)
+            except (socket.error, select.error):
+                # ICMP port unreachable and friends, keep waiting
+                continue
+            l_parsed = self._parse(l_pkt)
+            if l_parsed is not None:
+                return l_parsed
+
+    def _parse(self, i_pkt):
+        if len(i_pkt) < 16 or i_pkt[:4] != RMCP_HEADER or ord(i_pkt[4]) != AUTH_TYPE_RMCPP:
+            return None
+        l_type = ord(i_pkt[5])
+        l_sid, l_seq, l_len = struct.unpack('<IIH', i_pkt[6:16])
+        l_payload = i_pkt[16:16 + l_len]
+        if len(l_payload) != l_len:
+            return None
+        if l_type & 0x40:
+            if self.cv_k1 is None or len(i_pkt) < 16 + l_len + 14:
+                return None
+            l_auth = hmac.new(self.cv_k1, i_pkt[4:-12], hashlib.sha1).digest()[:12]
+            if l_auth != i_pkt[-12:]:
+                return None
+        elif self.cv_k1 is not None:
+            # Once the session is up everything has to be authenticated
+            return None
+        if l_type & 0x80:
+            if self.cv_aes is None or l_len < 32 or l_len % 16:
+                return None
+            l_data = self.cv_aes.cbc_decrypt(l_payload[:16], l_payload[16:])
+            l_payload = l_data[:-1 - ord(l_data[-1])]
+        if self.cv_sidm and l_sid not in (0, self.cv_sidm):
+            return None
+        return l_type & 0x3f, l_payload
+
+
+class OpTestIPMILanSOL():
+
+    ##
+    # @brief Initialize this object, SOL gets its own session so the console
+    #        traffic never mixes with commands on the shared client
+    #
+    # @param i_bmcIP @type string: IP Address of the BMC
+    # @param i_bmcUser @type string: Userid to log into the BMC
+    # @param i_bmcPwd @type string: Password of the userid to log into the BMC
+    #
+    def __init__(self, i_bmcIP, i_bmcUser, i_bmcPwd):
+        self.cv_lan = OpTestIPMILan(i_bmcIP, i_bmcUser, i_bmcPwd)
+        self.cv_user = None
+        self.cv_thread = None
+        self.cv_running = False
+
+    ##
+    # @brief Activates the SOL payload and bridges it to a console object
+    #        that behaves like "ipmitool sol activate" under pexpect, down
+    #        to the banner and the ~. escape.
+    #
+    # @return l_con @type Object: pexpect fdspawn object or raise OpTestError
+    #
+    def activate(self):
+        l_cc, l_rsp = self.cv_lan.raw(NETFN_APP, 0x48, [PAYLOAD_SOL, 0x01, 0xc0, 0, 0, 0])
+        if l_cc == 0x80:
+            l_msg = "Info: SOL payload already active on another session"
+            print l_msg
+            raise OpTestError(l_msg)
+        if l_cc != 0 or len(l_rsp) < 10:
+            l_msg = "Error activating SOL payload: %s" % self.cv_lan._cc_str(l_cc)
+            print l_msg
+            raise OpTestError(l_msg)
+        # Some BMCs get the byte order of the port wrong
+        l_port = l_rsp[8] | (l_rsp[9] << 8)
+        if self.cv_lan.cv_port not in (l_port, (l_rsp[8] << 8) | l_rsp[9]):
+            self._deactivate()
+            l_msg = "IPMI: SOL payload on UDP port %d is not supported" % l_port
+            print l_msg
+            raise OpTestError(l_msg)
+        self.cv_maxData = max(16, min(struct.unpack('<H', str(bytearray(l_rsp[4:6])))[0] - 4,
+                                      BMC_CONST.IPMI_LAN_SOL_CHUNK))
+
+        self.cv_user, l_con = socket.socketpair()
+        # pexpect owns (and closes) its own copy of the descriptor
+        l_console = fdpexpect.fdspawn(os.dup(l_con.fileno()))
+        l_con.close()
+        self.cv_user.sendall(BMC_CONST.IPMI_SOL_CONSOLE_ACTIVATE_OUTPUT[0])
+        self.cv_running = True
+        self.cv_thread = threading.Thread(target=self._bridge)
+        self.cv_thread.daemon = True
+        self.cv_thread.start()
+        return l_console
+
+    def _deactivate(self):
+        try:
+            self.cv_lan.raw(NETFN_APP, 0x49, [PAYLOAD_SOL, 0x01, 0, 0, 0, 0])
+        except OpTestError:
+            pass
+        self.cv_lan.close()
+
+    def _bridge(self):
+        l_lan = self.cv_lan
+        l_pending = ''
+        l_outstanding = None
+        l_lastRecv = 0
+        l_txSeq = 0
+        l_txTries = 0
+        l_txDeadline = 0
+        l_keepalive = time.time() + BMC_CONST.IPMI_LAN_KEEPALIVE
+        l_message = ''
+        try:
+            while self.cv_running:
+                l_ready = select.select([l_lan.cv_sock, self.cv_user], [], [], 0.2)[0]
+                if l_lan.cv_sock in l_ready:
+                    l_pkt = l_lan._recv(time.time())
+                    if l_pkt is not None and l_pkt[0] == PAYLOAD_SOL and len(l_pkt[1]) >= 4:
+                        l_sol = bytearray(l_pkt[1][:4])
+                        l_data = l_pkt[1][4:]
+                        if l_sol[0] and l_data:
+                            # A retransmit of what we already have only needs the ack
+                            if l_sol[0] != l_lastRecv:
+                                self.cv_user.sendall(l_data)
+                                l_lastRecv = l_sol[0]
+                            l_lan._send(PAYLOAD_SOL, str(bytearray([0, l_sol[0], len(l_data), 0])))
+                        if l_outstanding is not None and l_sol[1] == l_txSeq:
+                            if l_sol[3] & 0x40:
+                                # NACK, the BMC wants it again a bit later
+                                l_txDeadline = time.time() + BMC_CONST.IPMI_LAN_TIMEOUT
+                            else:
+                                l_outstanding = None
+                        if l_sol[3] & 0x10:
+                            l_message = "\r\n[SOL session closed by BMC]\r\n"
+                            break
+                if self.cv_user in l_ready:
+                    l_input = self.cv_user.recv(4096)
+                    if not l_input:
+                        break
+                    if '~.' in l_input:
+                        l_pending += l_input.split('~.', 1)[0]
+                        self.cv_running = False
+                    else:
+                        l_pending += l_input
+                l_now = time.time()
+                if l_outstanding is None and l_pending:
+                    l_outstanding = l_pending[:self.cv_maxData]
+                    l_pending = l_pending[self.cv_maxData:]
+                    l_txSeq = l_txSeq % 15 + 1
+                    l_txTries = 0
+                    l_txDeadline = 0
+                if l_outstanding is not None and l_now >= l_txDeadline:
+                    if l_txTries == BMC_CONST.IPMI_LAN_RETRIES:
+                        print "IPMI: SOL data not acknowledged by the BMC, dropped"
+                        l_outstanding = None
+                    else:
+                        l_lan._send(PAYLOAD_SOL, str(bytearray([l_txSeq, 0, 0, 0])) + l_outstanding)
+                        l_txTries += 1
+                        l_txDeadline = l_now + BMC_CONST.IPMI_LAN_TIMEOUT
+                if l_now >= l_keepalive:
+                    # Get Device ID, the answer is not needed
+                    l_lan.cv_rqSeq = (l_lan.cv_rqSeq + 1) & 0x3f
+                    l_lan._send(PAYLOAD_IPMI, l_lan._ipmi_msg(NETFN_APP, 0x01, [], 0, l_lan.cv_rqSeq))
+                    l_keepalive = l_now + BMC_CONST.IPMI_LAN_KEEPALIVE
+                l_lan.cv_lastUsed = l_now
+        except (OpTestError, socket.error, select.error), e:
+            l_message = "\r\nIPMI: SOL session failed: %s\r\n" % str(e)
+        self.cv_running = False
+        self._deactivate()
+        try:
+            if l_message:
+                self.cv_user.sendall(l_message)
+            self.cv_user.close()
+        except socket.error:
+            pass
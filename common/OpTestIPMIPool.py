@@ -0,0 +1,213 @@
+#!/usr/bin/python
+# IBM_PROLOG_BEGIN_TAG
+# This is an automatically generated prolog.
+#
+# $Source: op-test-framework/common/OpTestIPMIPool.py $
+#
+# OpenPOWER Automated Test Project
+#
+# Contributors Listed Below - COPYRIGHT 2015
+# [+] International Business Machines Corp.
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+#
+# IBM_PROLOG_END_TAG
+
+## @package OpTestIPMIPool
+#  Pool of persistent ipmitool sessions
+#
+#  Every ipmitool invocation forks a shell and opens a brand new RMCP+
+#  session with the BMC. This class keeps long-lived "ipmitool shell"
+#  sessions open per BMC and pushes commands into them, so a command only
+#  pays for its own round trip.
+
+import os
+import time
+import threading
+import pexpect
+
+from OpTestConstants import OpTestConstants as BMC_CONST
+from OpTestError import OpTestError
+
+# Pools are shared by every OpTestIPMI object talking to the same BMC, each
+# test case creates its own objects but they should all reuse the sessions.
+g_pools = {}
+g_poolsLock = threading.Lock()
+
+##
+# @brief Returns the session pool for a given ipmitool base command,
+#        creating it on first use.
+#
+# @param i_baseIpmiCmd @type string: ipmitool command with the connection
+#        options, i.e. OpTestIPMI.cv_baseIpmiCmd
+#
+# @return l_pool @type OpTestIPMIPool: pool shared by all users of this BMC
+#
+def get_ipmi_pool(i_baseIpmiCmd):
+    with g_poolsLock:
+        l_pool = g_pools.get(i_baseIpmiCmd)
+        if l_pool is None:
+            l_pool = OpTestIPMIPool(i_baseIpmiCmd)
+            g_pools[i_baseIpmiCmd] = l_pool
+        return l_pool
+
+
+class OpTestIPMIPool():
+
+    ##
+    # @brief Initialize this object
+    #
+    # @param i_baseIpmiCmd @type string: ipmitool command with the connection options
+    # @param i_size @type int: maximum number of sessions kept open to the BMC
+    #
+    def __init__(self, i_baseIpmiCmd, i_size=BMC_CONST.IPMI_POOL_SIZE):
+        self.cv_baseIpmiCmd = i_baseIpmiCmd
+        self.cv_size = i_size
+        self.cv_idle = []
+        self.cv_count = 0
+        self.cv_generation = 0
+        self.cv_cond = threading.Condition(threading.Lock())
+
+    ##
+    # @brief Checks whether an ipmitool argument string can be pushed into a
+    #        shell session. Options, interactive commands and commands that
+    #        restart the BMC must still go through a standalone ipmitool.
+    #
+    # @param i_args @type string: ipmitool arguments, for example: sdr elist
+    #
+    # @return True if the command can be run by the pool, else False
+    #
+    def is_supported(self, i_args):
+        if not i_args or i_args.startswith('-'):
+            return False
+        for l_cmd in BMC_CONST.IPMI_POOL_EXCLUDED_CMDS:
+            if i_args.startswith(l_cmd):
+                return False
+        return True
+
+    ##
+    # @brief Runs an ipmitool command in one of the pooled sessions
+    #
+    # @param i_args @type string: ipmitool arguments, see is_supported()
+    #
+    # @return l_output @type string: output of the command or raise OpTestError
+    #
+    def run(self, i_args):
+        l_output = None
+        for l_try in range(2):
+            l_session = self._get_session()
+            try:
+                l_output = self._session_cmd(l_session, i_args)
+            except pexpect.ExceptionPexpect, e:
+                self._drop_session(l_session)
+                l_msg = "IPMI: pooled ipmitool session failed: %s" % str(e)
+                print l_msg
+                raise OpTestError(l_msg)
+            if any(l_err in l_output for l_err in BMC_CONST.IPMI_POOL_SESSION_ERRORS):
+                # The BMC dropped the session under us, retry once on a new one
+                self._drop_session(l_session)
+                continue
+            self._put_session(l_session)
+            break
+        return l_output
+
+    ##
+    # @brief Closes all idle sessions. Busy sessions are dropped when they
+    #        are handed back. Used when the BMC gets reset under the pool.
+    #
+    def close(self):
+        with self.cv_cond:
+            self.cv_generation += 1
+            l_idle = self.cv_idle
+            self.cv_idle = []
+            self.cv_count -= len(l_idle)
+            self.cv_cond.notify_all()
+        for l_session, l_used in l_idle:
+            self._close_session(l_session)
+
+    def _get_session(self):
+        with self.cv_cond:
+            while True:
+                while self.cv_idle:
+                    l_session, l_used = self.cv_idle.pop()
+                    if time.time() - l_used < BMC_CONST.IPMI_POOL_IDLE_TIMEOUT \
+                       and l_session.isalive():
+                        return l_session
+                    # The BMC has most likely timed out this session already
+                    self.cv_count -= 1
+                    self._close_session(l_session)
+                if self.cv_count < self.cv_size:
+                    self.cv_count += 1
+                    break
+                self.cv_cond.wait()
+        try:
+            return self._open_session()
+        except:
+            with self.cv_cond:
+                self.cv_count -= 1
+                self.cv_cond.notify()
+            raise
+
+    def _put_session(self, i_session):
+        with self.cv_cond:
+            if i_session.generation == self.cv_generation:
+                self.cv_idle.append((i_session, time.time()))
+                self.cv_cond.notify()
+                return
+        # The pool was closed while this session was in use
+        self._drop_session(i_session)
+
+    def _drop_session(self, i_session):
+        with self.cv_cond:
+            self.cv_count -= 1
+            self.cv_cond.notify()
+        self._close_session(i_session)
+
+    def _open_session(self):
+        l_cmd = self.cv_baseIpmiCmd + 'shell'
+        # Keep readline from decorating the output with escape sequences
+        l_env = dict(os.environ)
+        l_env['TERM'] = 'dumb'
+        try:
+            l_session = pexpect.spawn(l_cmd, env=l_env)
+            l_rc = l_session.expect_exact([BMC_CONST.IPMI_POOL_PROMPT,
+                                           pexpect.TIMEOUT, pexpect.EOF],
+                                          timeout=BMC_CONST.IPMI_POOL_LOGIN_TIMEOUT)
+        except pexpect.ExceptionPexpect, e:
+            l_msg = "IPMI: failed to start ipmitool shell: %s" % str(e)
+            print l_msg
+            raise OpTestError(l_msg)
+        if l_rc != 0:
+            self._close_session(l_session)
+            l_msg = "IPMI: ipmitool shell did not give a prompt"
+            print l_msg
+            raise OpTestError(l_msg)
+        l_session.generation = self.cv_generation
+        return l_session
+
+    def _session_cmd(self, i_session, i_args):
+        i_session.sendline(i_args)
+        i_session.expect_exact(BMC_CONST.IPMI_POOL_PROMPT,
+                               timeout=BMC_CONST.IPMI_POOL_CMD_TIMEOUT)
+        # Drop the echoed command line and give back plain newlines like
+        # the output of a standalone ipmitool
+        l_output = i_session.before.replace('\r\n', '\n')
+        return l_output.split('\n', 1)[-1] if '\n' in l_output else ''
+
+    def _close_session(self, i_session):
+        try:
+            i_session.sendline('exit')
+            i_session.close(force=True)
+        except:
+            pass
@@ -0,0 +1,232 @@
+#!/usr/bin/python
+# IBM_PROLOG_BEGIN_TAG
+# This is an automatically generated prolog.
+#
+# $Source: op-test-framework/common/OpTestSOLCapture.py $
+#
+# OpenPOWER Automated Test Project
+#
+# Contributors Listed Below - COPYRIGHT 2015
+# [+] International Business Machines Corp.
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+#
+# IBM_PROLOG_END_TAG
+
+## @package OpTestSOLCapture
+#  Background capture of the host SOL console
+#
+#  A reader thread drains an activated SOL console, writes it to the FFDC
+#  log file and keeps the last part of it in memory. Other code subscribes
+#  to regular expressions and gets told as soon as the console prints them,
+#  instead of polling sensors.
+
+import re
+import sys
+import collections
+import time
+import threading
+import pexpect
+
+from OpTestConstants import OpTestConstants as BMC_CONST
+from OpTestError import OpTestError
+
+
+class OpTestSOLSubscription():
+
+    ##
+    # @brief Initialize this object, see OpTestSOLCapture.subscribe()
+    #
+    def __init__(self, i_pattern, i_callback, i_offset, i_repeat=False):
+        self.cv_regex = re.compile(i_pattern)
+        self.cv_callback = i_callback
+        self.cv_offset = i_offset
+        self.cv_repeat = i_repeat
+        self.cv_event = threading.Event()
+        self.cv_match = None
+        self.cv_time = None
+
+    ##
+    # @brief Waits for the pattern to show up on the console
+    #
+    # @param i_timeout @type int: The number of seconds to wait
+    #
+    # @return True if it matched, False on timeout, None if the capture
+    #         stopped without a match
+    #
+    def wait(self, i_timeout):
+        if self.cv_event.wait(i_timeout):
+            return self.cv_match is not None or None
+        return False
+
+    ##
+    # @brief Returns the match object, None if it did not match (yet)
+    #
+    def match(self):
+        return self.cv_match
+
+
+class OpTestSOLCapture():
+
+    ##
+    # @brief Initialize this object
+    #
+    # @param i_con @type Object: activated SOL console, pexpect.spawn or fdspawn
+    # @param i_logFile @type string: file the console output is written to
+    # @param i_size @type int: number of bytes kept in memory
+    #
+    def __init__(self, i_con, i_logFile, i_size=BMC_CONST.SOL_CAPTURE_BUFFER_SIZE):
+        self.cv_con = i_con
+        self.cv_logFile = i_logFile
+        self.cv_size = i_size
+        # Ring buffer of the reads, cv_end is the console offset of its end.
+        # Subscriptions are matched against cv_tail and the new data only.
+        self.cv_chunks = collections.deque()
+        self.cv_length = 0
+        self.cv_end = 0
+        self.cv_tail = ''
+        self.cv_subs = []
+        self.cv_lock = threading.Lock()
+        self.cv_running = threading.Event()
+        self.cv_thread = None
+        self.cv_file = None
+
+    ##
+    # @brief Starts the reader thread
+    #
+    # @return self or raise OpTestError
+    #
+    def start(self):
+        try:
+            self.cv_file = open(self.cv_logFile, 'w')
+        except IOError, e:
+            l_msg = "SOL capture can not open %s: %s" % (self.cv_logFile, str(e))
+            print l_msg
+            raise OpTestError(l_msg)
+        self.cv_running.set()
+        self.cv_thread = threading.Thread(target=self._reader)
+        self.cv_thread.daemon = True
+        self.cv_thread.start()
+        return self
+
+    ##
+    # @brief Stops the reader thread and closes the console and the log file.
+    #        Pending subscriptions are released without a match.
+    #
+    def stop(self):
+        self.cv_running.clear()
+        if self.cv_thread is not None and self.cv_thread is not threading.current_thread():
+            self.cv_thread.join(BMC_CONST.SOL_CAPTURE_READ_TIMEOUT * 2)
+        try:
+            self.cv_con.close(force=True)
+        except:
+            pass
+
+    ##
+    # @brief Checks whether the reader thread is still capturing
+    #
+    def is_running(self):
+        return self.cv_running.is_set()
+
+    ##
+    # @brief Subscribes to a pattern on the console output from now on
+    #
+    # @param i_pattern @type string: regular expression, e.g. 'Kernel panic'
+    # @param i_callback @type function: optional, called from the reader thread
+    #        with the match object when the pattern shows up
+    # @param i_repeat @type bool: stay subscribed after a match, the callback
+    #        is then called for every match until unsubscribe()
+    #
+    # @return l_sub @type OpTestSOLSubscription
+    #
+    def subscribe(self, i_pattern, i_callback=None, i_repeat=False):
+        with self.cv_lock:
+            l_sub = OpTestSOLSubscription(i_pattern, i_callback, self.cv_end, i_repeat)
+            if not self.cv_running.is_set():
+                l_sub.cv_event.set()
+            else:
+                self.cv_subs.append(l_sub)
+        return l_sub
+
+    ##
+    # @brief Drops a subscription that is no longer needed
+    #
+    def unsubscribe(self, i_sub):
+        with self.cv_lock:
+            if i_sub in self.cv_subs:
+                self.cv_subs.remove(i_sub)
+
+    ##
+    # @brief Returns the console output kept in memory
+    #
+    # @return l_output @type string: up to the last i_size bytes of the console
+    #
+    def get_buffer(self):
+        with self.cv_lock:
+            return ''.join(self.cv_chunks)[-self.cv_size:]
+
+    def _reader(self):
+        while self.cv_running.is_set():
+            try:
+                l_data = self.cv_con.read_nonblocking(BMC_CONST.SOL_CAPTURE_READ_SIZE,
+                                                      BMC_CONST.SOL_CAPTURE_READ_TIMEOUT)
+            except pexpect.TIMEOUT:
+                continue
+            except (pexpect.EOF, OSError, ValueError):
+                break
+            self.cv_file.write(l_data)
+            self.cv_file.flush()
+            sys.stdout.write(l_data)
+            self._feed(l_data)
+
+        self.cv_running.clear()
+        self.cv_file.close()
+        with self.cv_lock:
+            l_subs = self.cv_subs
+            self.cv_subs = []
+        for l_sub in l_subs:
+            l_sub.cv_event.set()
+
+    def _feed(self, i_data):
+        l_matched = []
+        with self.cv_lock:
+            l_window = self.cv_tail + i_data
+            l_windowStart = self.cv_end - len(self.cv_tail)
+            for l_sub in list(self.cv_subs):
+                while True:
+                    l_match = l_sub.cv_regex.search(l_window,
+                                                    max(0, l_sub.cv_offset - l_windowStart))
+                    if l_match is None:
+                        break
+                    l_sub.cv_match = l_match
+                    l_sub.cv_time = time.time()
+                    l_matched.append((l_sub, l_match))
+                    if not l_sub.cv_repeat:
+                        self.cv_subs.remove(l_sub)
+                        break
+                    # Go on after this match, it must not be seen again
+                    # in the tail of the next read
+                    l_sub.cv_offset = l_windowStart + max(l_match.end(), l_match.start() + 1)
+
+            self.cv_chunks.append(i_data)
+            self.cv_length += len(i_data)
+            self.cv_end += len(i_data)
+            while self.cv_length - len(self.cv_chunks[0]) >= self.cv_size:
+                self.cv_length -= len(self.cv_chunks.popleft())
+            # A match may straddle two reads
+            self.cv_tail = l_window[-BMC_CONST.SOL_CAPTURE_MATCH_OVERLAP:]
+        for l_sub, l_match in l_matched:
+            l_sub.cv_event.set()
+            if l_sub.cv_callback is not None:
+                l_sub.cv_callback(l_match)
@@ -0,0 +1,183 @@
+#!/usr/bin/python
+# IBM_PROLOG_BEGIN_TAG
+# This is an automatically generated prolog.
+#
+# $Source: op-test-framework/common/OpTestSSHMaster.py $
+#
+# OpenPOWER Automated Test Project
+#
+# Contributors Listed Below - COPYRIGHT 2015
+# [+] International Business Machines Corp.
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+#
+# IBM_PROLOG_END_TAG
+
+## @package OpTestSSHMaster
+#  Persistent OpenSSH master connections
+#
+#  Every host command used to be a new ssh, i.e. a TCP handshake, a key
+#  exchange and a password login. An OpenSSH ControlMaster connection is
+#  kept open per host and user instead, and each command only opens a new
+#  channel on it through the control socket.
+
+import os
+import re
+import time
+import errno
+import subprocess
+import threading
+import pexpect
+
+from OpTestConstants import OpTestConstants as BMC_CONST
+
+# Masters are shared by every OpTestHost object talking to the same host
+g_masters = {}
+g_mastersLock = threading.Lock()
+
+##
+# @brief Returns the ssh master of a host and user, creating it on first use.
+#        The connection itself is only opened by control_args().
+#
+# @param i_host @type string: IP Address of the host
+# @param i_user @type string: Userid to log into the host
+# @param i_passwd @type string: Password of the userid
+#
+# @return l_master @type OpTestSSHMaster
+#
+def get_ssh_master(i_host, i_user, i_passwd):
+    with g_mastersLock:
+        l_master = g_masters.get((i_host, i_user))
+        if l_master is None:
+            l_master = OpTestSSHMaster(i_host, i_user, i_passwd)
+            g_masters[(i_host, i_user)] = l_master
+        return l_master
+
+
+class OpTestSSHMaster():
+
+    ##
+    # @brief Initialize this object
+    #
+    # @param i_host @type string: IP Address of the host
+    # @param i_user @type string: Userid to log into the host
+    # @param i_passwd @type string: Password of the userid
+    #
+    def __init__(self, i_host, i_user, i_passwd):
+        self.cv_host = i_host
+        self.cv_user = i_user
+        self.cv_passwd = i_passwd
+        self.cv_path = os.path.join(BMC_CONST.HOST_SSH_CONTROL_DIR, "%s@%s" % (
+            i_user, re.sub(r'[^0-9A-Za-z.-]', '_', i_host)))
+        self.cv_child = None
+        # The master was opened by another process, e.g. another op-test run
+        self.cv_shared = False
+        self.cv_failed = 0
+        self.cv_lock = threading.Lock()
+
+    ##
+    # @brief Returns the ssh options that run a command over the master
+    #        connection, opening it if needed. When it can't be opened the
+    #        command just gets its own connection, and opening is not tried
+    #        again for BMC_CONST.HOST_SSH_MASTER_RETRY seconds.
+    #
+    # @return l_args @type list: ssh options, empty if there is no master
+    #
+    def control_args(self):
+        with self.cv_lock:
+            if not self._alive():
+                if time.time() - self.cv_failed < BMC_CONST.HOST_SSH_MASTER_RETRY:
+                    return []
+                if not self._open():
+                    self.cv_failed = time.time()
+                    return []
+            return ['-o', 'ControlMaster=no', '-o', 'ControlPath=%s' % self.cv_path]
+
+    ##
+    # @brief Closes the master connection, e.g. when the host goes down
+    #
+    def close(self):
+        with self.cv_lock:
+            self._close()
+
+    def _alive(self):
+        if self.cv_child is not None:
+            return self.cv_child.isalive()
+        return self.cv_shared and self._check()
+
+    ##
+    # @brief Asks the master behind the control socket whether it is running
+    #
+    # @return True if a master answers on the socket, else False
+    #
+    def _check(self):
+        with open(os.devnull, 'w') as l_null:
+            l_rc = subprocess.call(['/usr/bin/ssh', '-O', 'check',
+                                    '-o', 'ControlPath=%s' % self.cv_path,
+                                    '-l', self.cv_user, self.cv_host],
+                                   stdout=l_null, stderr=l_null)
+        return l_rc == 0
+
+    def _open(self):
+        self._close()
+        try:
+            os.makedirs(BMC_CONST.HOST_SSH_CONTROL_DIR)
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+        if os.path.exists(self.cv_path):
+            # Reuse a live master, only a dead one leaves a stale socket
+            if self._check():
+                print "SSH: using the running master connection to %s@%s" % (
+                    self.cv_user, self.cv_host)
+                self.cv_shared = True
+                return True
+            print "SSH: removing the stale control socket %s" % self.cv_path
+            os.remove(self.cv_path)
+        l_cmd = "/usr/bin/ssh -2 -k -M -N -o StrictHostKeyChecking=no " \
+                "-o ControlPath=%s -o ServerAliveInterval=%d -o ServerAliveCountMax=3 " \
+                "-l %s %s" % (self.cv_path, BMC_CONST.HOST_SSH_ALIVE_INTERVAL,
+                              self.cv_user, self.cv_host)
+        try:
+            self.cv_child = pexpect.spawn(l_cmd)
+        except pexpect.ExceptionPexpect, e:
+            print "SSH: can't start a master connection: %s" % str(e)
+            return False
+        l_timeout = time.time() + BMC_CONST.HOST_SSH_MASTER_TIMEOUT
+        while time.time() < l_timeout:
+            # The control socket shows up once the master is logged in
+            if os.path.exists(self.cv_path):
+                print "SSH: master connection to %s@%s opened" % (self.cv_user, self.cv_host)
+                return True
+            l_rc = self.cv_child.expect([r'\(yes/no\)', r'[Pp]assword:',
+                                         pexpect.TIMEOUT, pexpect.EOF], timeout=1)
+            if l_rc == 0:
+                self.cv_child.sendline('yes')
+            elif l_rc == 1:
+                self.cv_child.sendline(self.cv_passwd)
+            elif l_rc == 3:
+                break
+        print "SSH: no master connection to %s@%s: %s" % (self.cv_user, self.cv_host,
+                                                          self.cv_child.before)
+        self._close()
+        return False
+
+    def _close(self):
+        # A shared master belongs to the process that opened it
+        self.cv_shared = False
+        if self.cv_child is not None:
+            self.cv_child.close(force=True)
+            self.cv_child = None
+            if os.path.exists(self.cv_path):
+                os.remove(self.cv_path)
@@ -0,0 +1,166 @@
+#!/usr/bin/python
+# IBM_PROLOG_BEGIN_TAG
+# This is an automatically generated prolog.
+#
+# $Source: op-test-framework/common/OpTestSensorIndex.py $
+#
+# OpenPOWER Automated Test Project
+#
+# Contributors Listed Below - COPYRIGHT 2015
+# [+] International Business Machines Corp.
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+#
+# IBM_PROLOG_END_TAG
+
+## @package OpTestSensorIndex
+#  Index of the BMC sensors built from an ipmitool SDR cache file
+#
+#  The SDR repository only changes with the BMC firmware, so it is dumped
+#  once per firmware level ("ipmitool sdr dump") and the file is kept for
+#  "ipmitool -S". The index maps sensor names to their record and sensor
+#  number, so a single sensor can be read without going through the whole
+#  repository again.
+
+import os
+import re
+import threading
+
+from OpTestConstants import OpTestConstants as BMC_CONST
+from OpTestError import OpTestError
+from OpTestIPMILan import SENSOR_GENERIC_STATES, SENSOR_SPECIFIC_STATES
+
+# Indexes already parsed by this process, keyed by cache file
+g_indexes = {}
+g_indexesLock = threading.Lock()
+
+##
+# @brief Returns the SDR cache file for a BMC at a given firmware level
+#
+# @param i_bmcIP @type string: IP Address of the BMC
+# @param i_version @type string: BMC firmware level, see OpTestIPMI.ipmi_get_bmc_version_key()
+#
+# @return path of the cache file, it may not exist yet
+#
+def sdr_cache_file(i_bmcIP, i_version):
+    l_name = re.sub(r'[^0-9A-Za-z.-]', '_', '%s-%s' % (i_bmcIP, i_version))
+    return os.path.join(BMC_CONST.IPMI_SDR_CACHE_DIR, l_name + '.sdr')
+
+##
+# @brief Returns the sensor index of an SDR cache file, parsing it on first use
+#
+# @param i_cacheFile @type string: file written by "ipmitool sdr dump"
+#
+# @return l_index @type OpTestSensorIndex or raise OpTestError
+#
+def get_sensor_index(i_cacheFile):
+    with g_indexesLock:
+        l_index = g_indexes.get(i_cacheFile)
+        if l_index is None:
+            l_index = OpTestSensorIndex(i_cacheFile)
+            g_indexes[i_cacheFile] = l_index
+        return l_index
+
+
+class OpTestSensorIndex():
+
+    ##
+    # @brief Initialize this object from an SDR cache file
+    #
+    # @param i_cacheFile @type string: file written by "ipmitool sdr dump"
+    #
+    def __init__(self, i_cacheFile):
+        self.cv_cacheFile = i_cacheFile
+        self.cv_sensors = {}
+        try:
+            with open(i_cacheFile, 'rb') as l_file:
+                l_data = bytearray(l_file.read())
+        except IOError, e:
+            l_msg = "SDR cache file %s can not be read: %s" % (i_cacheFile, str(e))
+            print l_msg
+            raise OpTestError(l_msg)
+
+        # The dump is every record back to back, 5 byte header included
+        l_offset = 0
+        while l_offset + 5 <= len(l_data):
+            l_rec = list(l_data[l_offset:l_offset + 5 + l_data[l_offset + 4]])
+            l_offset += len(l_rec)
+            if l_rec[3] == 0x01:
+                l_idOffset = 47
+            elif l_rec[3] == 0x02:
+                l_idOffset = 31
+            else:
+                continue
+            if len(l_rec) <= l_idOffset:
+                continue
+            l_name = str(bytearray(l_rec[l_idOffset + 1:
+                                         l_idOffset + 1 + (l_rec[l_idOffset] & 0x1f)]))
+            self.cv_sensors[l_name] = {'record': l_rec[0] | (l_rec[1] << 8),
+                                       'owner': l_rec[5],
+                                       'lun': l_rec[6] & 0x03,
+                                       'number': l_rec[7],
+                                       'entity': (l_rec[8], l_rec[9]),
+                                       'type': l_rec[12],
+                                       'event': l_rec[13]}
+        if not self.cv_sensors:
+            l_msg = "SDR cache file %s has no sensors" % i_cacheFile
+            print l_msg
+            raise OpTestError(l_msg)
+
+    ##
+    # @brief Looks up a sensor by name
+    #
+    # @param i_name @type string: sensor name as printed by sdr elist, for example: Host Status
+    #
+    # @return dict with record, owner, lun, number, entity, type and event keys,
+    #         or None if there is no such sensor
+    #
+    def get(self, i_name):
+        return self.cv_sensors.get(i_name)
+
+    ##
+    # @brief Returns the ipmitool command reading a single sensor
+    #
+    # @param i_sensor @type dict: sensor, as returned by get()
+    #
+    # @return ipmitool arguments for a Get Sensor Reading command
+    #
+    def reading_cmd(self, i_sensor):
+        return "raw 0x04 0x2d 0x%02x" % i_sensor['number']
+
+    ##
+    # @brief Decodes the output of reading_cmd() into the states that are
+    #        asserted, worded like sdr elist prints them
+    #
+    # @param i_sensor @type dict: sensor, as returned by get()
+    # @param i_output @type string: output of the ipmitool raw command
+    #
+    # @return comma separated states, empty if the sensor could not be read
+    #
+    def decode(self, i_sensor, i_output):
+        try:
+            l_rsp = [int(l_byte, 16) for l_byte in i_output.split()]
+        except ValueError:
+            return ''
+        if len(l_rsp) < 3 or l_rsp[1] & 0x20 or i_sensor['event'] == 0x01:
+            return ''
+        l_states = 0
+        for l_i, l_byte in enumerate(l_rsp[2:4]):
+            l_states |= l_byte << (8 * l_i)
+        if i_sensor['event'] == 0x6f:
+            l_strings = SENSOR_SPECIFIC_STATES.get(i_sensor['type'], [])
+        else:
+            l_strings = SENSOR_GENERIC_STATES.get(i_sensor['event'], [])
+        return ", ".join([l_strings[l_i] for l_i in range(len(l_strings))
+                          if l_states & (1 << l_i)])
@@ -0,0 +1,181 @@
+#!/usr/bin/python
+# IBM_PROLOG_BEGIN_TAG
+# This is an automatically generated prolog.
+#
+# $Source: op-test-framework/common/OpTestSourceStore.py $
+#
+# OpenPOWER Automated Test Project
+#
+# Contributors Listed Below - COPYRIGHT 2015
+# [+] International Business Machines Corp.
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+#
+# IBM_PROLOG_END_TAG
+
+## @package OpTestSourceStore
+#  Local store of pre-fetched source trees
+#
+#  Tests that need skiboot, linux or ffs sources used to clone them from
+#  the internet every time. The store keeps them on the test controller as
+#  git bundles or tarballs, so that they are copied over the lab network
+#  instead, or used without any network at all:
+#
+#    BMC_CONST.SOURCE_STORE_DIR/<name>/<ref>.bundle
+#    BMC_CONST.SOURCE_STORE_DIR/<name>/<ref>.tar.gz
+#
+#  A tarball holds the tree in a single top directory, like the ones git
+#  archive or kernel.org give. Bundles are made while online with:
+#
+#    python common/OpTestSourceStore.py skiboot https://github.com/open-power/skiboot.git
+
+import os
+import sys
+import hashlib
+import commands
+import threading
+
+from OpTestConstants import OpTestConstants as BMC_CONST
+from OpTestError import OpTestError
+
+# Digests already computed by this process, keyed by artifact path
+g_digests = {}
+g_digestsLock = threading.Lock()
+
+##
+# @brief Returns the artifact of a source tree in the store
+#
+# @param i_name @type string: name of the tree, e.g. skiboot
+# @param i_ref @type string: branch or tag it was fetched at
+#
+# @return path of the bundle or tarball, None if the store does not have it
+#
+def get_source(i_name, i_ref=BMC_CONST.SOURCE_DEFAULT_REF):
+    for l_ext in BMC_CONST.SOURCE_STORE_EXTENSIONS:
+        l_path = os.path.join(BMC_CONST.SOURCE_STORE_DIR, i_name, i_ref + l_ext)
+        if os.path.isfile(l_path):
+            return l_path
+    return None
+
+##
+# @brief Returns the sha1 of an artifact, which tells whether a copy of it
+#        is out of date
+#
+# @param i_path @type string: artifact, as returned by get_source()
+#
+# @return l_digest @type string: hex sha1 of the file
+#
+def source_digest(i_path):
+    l_stat = os.stat(i_path)
+    l_key = (i_path, l_stat.st_size, l_stat.st_mtime)
+    with g_digestsLock:
+        if l_key in g_digests:
+            return g_digests[l_key]
+    l_sha = hashlib.sha1()
+    with open(i_path, 'rb') as l_file:
+        for l_block in iter(lambda: l_file.read(1024 * 1024), ''):
+            l_sha.update(l_block)
+    with g_digestsLock:
+        g_digests[l_key] = l_sha.hexdigest()
+    return g_digests[l_key]
+
+##
+# @brief Returns what a tree in the store was built from: the commit of a
+#        bundle, or the digest of a tarball as it has no commit
+#
+# @param i_path @type string: artifact, as returned by get_source()
+#
+# @return commit id or digest, or raise OpTestError
+#
+def source_commit(i_path):
+    if not i_path.endswith('.bundle'):
+        return source_digest(i_path)
+    l_ref = os.path.basename(i_path)[:-len('.bundle')]
+    l_res = commands.getstatusoutput("git bundle list-heads %s" % i_path)
+    if l_res[0] == 0:
+        for l_line in l_res[1].splitlines():
+            l_fields = l_line.split()
+            if len(l_fields) == 2 and l_fields[1].split('/')[-1] == l_ref:
+                return l_fields[0]
+    l_msg = "Can not read ref %s of bundle %s: %s" % (l_ref, i_path, l_res[1])
+    print l_msg
+    raise OpTestError(l_msg)
+
+##
+# @brief Returns the shell command extracting an artifact into a directory
+#
+# @param i_path @type string: artifact, where it is on the machine running
+#        the command
+# @param i_dir @type string: directory to create, it must not exist
+#
+# @return l_cmd @type string
+#
+def source_checkout_cmd(i_path, i_dir):
+    if i_path.endswith('.bundle'):
+        l_ref = os.path.basename(i_path)[:-len('.bundle')]
+        return "git clone -q -b %s %s %s" % (l_ref, i_path, i_dir)
+    return "mkdir -p %s && tar -xzf %s -C %s --strip-components=1" % (i_dir, i_path, i_dir)
+
+##
+# @brief Extracts a tree from the store into a local directory, replacing it
+#
+# @param i_name @type string: name of the tree, e.g. ffs
+# @param i_dir @type string: directory to extract into
+# @param i_ref @type string: branch or tag it was fetched at
+#
+# @return True if the store had the tree, False otherwise, or raise OpTestError
+#
+def checkout_source(i_name, i_dir, i_ref=BMC_CONST.SOURCE_DEFAULT_REF):
+    l_path = get_source(i_name, i_ref)
+    if l_path is None:
+        return False
+    l_cmd = "rm -rf %s && %s" % (i_dir, source_checkout_cmd(l_path, i_dir))
+    print l_cmd
+    l_res = commands.getstatusoutput(l_cmd)
+    if l_res[0] != 0:
+        l_msg = "Extracting %s from the source store failed: %s" % (l_path, l_res[1])
+        print l_msg
+        raise OpTestError(l_msg)
+    return True
+
+##
+# @brief Fetches a git tree into the store as a bundle, needs the network
+#
+# @param i_name @type string: name of the tree, e.g. skiboot
+# @param i_url @type string: git repository to fetch from
+# @param i_ref @type string: branch to fetch
+#
+# @return path of the bundle or raise OpTestError
+#
+def fetch_source(i_name, i_url, i_ref=BMC_CONST.SOURCE_DEFAULT_REF):
+    l_dir = os.path.join(BMC_CONST.SOURCE_STORE_DIR, i_name)
+    l_path = os.path.join(l_dir, i_ref + '.bundle')
+    l_tmp = os.path.join(l_dir, i_ref + '.git')
+    l_cmd = "mkdir -p %s && rm -rf %s && git clone -q --bare -b %s %s %s && " \
+            "cd %s && git bundle create %s.new %s && mv %s.new %s; l_rc=$?; rm -rf %s; exit $l_rc" % (
+                l_dir, l_tmp, i_ref, i_url, l_tmp, l_tmp, l_path, i_ref, l_path, l_path, l_tmp)
+    print l_cmd
+    l_res = commands.getstatusoutput(l_cmd)
+    if l_res[0] != 0:
+        l_msg = "Fetching %s into the source store failed: %s" % (i_url, l_res[1])
+        print l_msg
+        raise OpTestError(l_msg)
+    return l_path
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (3, 4):
+        print "usage: %s <name> <git url> [<branch>]" % sys.argv[0]
+        sys.exit(1)
+    print fetch_source(*sys.argv[1:])
@@ -30,14 +30,21 @@
 #  This class encapsulates all interfaces and classes required to do end to end
 #  automated flashing and testing of OpenPower systems.
 
+import os
 import time
+import errno
+import socket
 import subprocess
+import threading
+import pexpect
 
 from OpTestBMC import OpTestBMC
 from OpTestIPMI import OpTestIPMI
 from OpTestConstants import OpTestConstants as BMC_CONST
 from OpTestError import OpTestError
 from OpTestHost import OpTestHost
+from OpTestIPLHistory import OpTestIPLHistory, pnor_level_key
+from OpTestSOLCapture import OpTestSOLCapture
 from OpTestUtil import OpTestUtil
 from OpTestWeb import OpTestWeb
 
@@ -94,6 +101,7 @@ class OpTestSystem():
     #
     def sys_power_on(self):
         try:
+            self._sys_host_power_event()
             rc = self.cv_IPMI.ipmi_power_on()
         except OpTestError as e:
             return BMC_CONST.FW_FAILED
@@ -106,6 +114,7 @@ class OpTestSystem():
     #
     def sys_power_cycle(self):
         try:
+            self._sys_host_power_event()
             return self.cv_IPMI.ipmi_power_cycle()
         except OpTestError as e:
             return BMC_CONST.FW_FAILED
@@ -117,6 +126,7 @@ class OpTestSystem():
     #
     def sys_power_soft(self):
         try:
+            self._sys_host_power_event()
             rc = self.cv_IPMI.ipmi_power_soft()
         except OpTestError as e:
             return BMC_CONST.FW_FAILED
@@ -129,11 +139,23 @@ class OpTestSystem():
     #
     def sys_power_off(self):
         try:
+            self._sys_host_power_event()
             rc = self.cv_IPMI.ipmi_power_off()
         except OpTestError as e:
             return BMC_CONST.FW_FAILED
         return rc
 
+    ##
+    # @brief Forgets what is known about the host before it is powered off,
+    #        on or reset: it is not taken as reachable anymore and its
+    #        persistent ssh connection is closed
+    #
+    def _sys_host_power_event(self):
+        if self.cv_HOST.ip is None:
+            return
+        self.util.host_invalidate_reachable(self.cv_HOST.ip)
+        self.cv_HOST.host_close_ssh_master()
+
     ##
     # @brief Warm reset on the bmc system
     #
@@ -216,6 +238,277 @@ class OpTestSystem():
             return BMC_CONST.FW_FAILED
         return l_rc
 
+    ##
+    # @brief Waits for the system to reach a state, watching several sources at
+    #        once instead of sleeping for a fixed time. Every source is polled
+    #        from its own thread and the wait returns as soon as the condition
+    #        holds.
+    #
+    # @param i_condition @type string: BMC_CONST.WAIT_ANY to return on the first
+    #        source that matches, BMC_CONST.WAIT_ALL to wait for all of them
+    # @param i_sources @type list: (kind, target, expected) tuples, where kind is
+    #        BMC_CONST.WAIT_SENSOR: target is a sensor name, expected a state of it
+    #                               e.g. (WAIT_SENSOR, IPMI_SENSOR_HOST_STATUS, 'S0/G0: working')
+    #        BMC_CONST.WAIT_POWER:  target is None, expected CHASSIS_POWER_ON/OFF
+    #        BMC_CONST.WAIT_PING:   target is an IP address, expected is None
+    #        BMC_CONST.WAIT_TCP:    target is an (IP address, port) tuple, expected is None
+    #        BMC_CONST.WAIT_SOL:    target is a console from sys_get_ipmi_console()
+    #                               or a running OpTestSOLCapture,
+    #                               expected a pattern to look for on it
+    # @param i_deadline @type float: time.time() by which the condition must hold
+    #
+    # @return l_met @type list: sources that matched, or raise OpTestError on timeout
+    #
+    def wait_for(self, i_condition, i_sources, i_deadline):
+        l_cond = threading.Condition()
+        l_met = []
+        l_stop = threading.Event()
+        l_threads = []
+        for l_source in i_sources:
+            l_thread = threading.Thread(target=self._wait_for_source,
+                                        args=(l_source, i_deadline, l_stop,
+                                              l_cond, l_met))
+            l_thread.daemon = True
+            l_thread.start()
+            l_threads.append(l_thread)
+
+        try:
+            with l_cond:
+                while True:
+                    if l_met and (i_condition == BMC_CONST.WAIT_ANY or
+                                  len(l_met) == len(i_sources)):
+                        break
+                    l_left = i_deadline - time.time()
+                    if l_left <= 0:
+                        l_msg = "Timeout waiting for %s of: %s" % (i_condition, ", ".join(
+                            [self._wait_source_str(l_source)
+                             for l_source in i_sources if l_source not in l_met]))
+                        print l_msg
+                        raise OpTestError(l_msg)
+                    l_cond.wait(min(l_left, BMC_CONST.WAIT_POLL_INTERVAL))
+                return list(l_met)
+        finally:
+            l_stop.set()
+            # SOL sources read from a console the caller keeps using
+            for l_thread, l_source in zip(l_threads, i_sources):
+                if l_source[0] == BMC_CONST.WAIT_SOL:
+                    l_thread.join()
+
+    def _wait_for_source(self, i_source, i_deadline, i_stop, i_cond, o_met):
+        l_sub = None
+        if i_source[0] == BMC_CONST.WAIT_SOL and isinstance(i_source[1], OpTestSOLCapture):
+            # Subscribe once, so nothing printed between two probes is missed
+            l_sub = i_source[1].subscribe(i_source[2])
+        try:
+            while not i_stop.is_set() and time.time() < i_deadline:
+                l_started = time.time()
+                try:
+                    l_match = self._wait_probe(i_source, l_sub)
+                except OpTestError:
+                    # The BMC or the host may not answer during a transition
+                    l_match = False
+                if l_match is None:
+                    return
+                if l_match:
+                    with i_cond:
+                        o_met.append(i_source)
+                        i_cond.notify()
+                    print "wait_for: %s reached" % self._wait_source_str(i_source)
+                    return
+                i_stop.wait(max(0, BMC_CONST.WAIT_POLL_INTERVAL - (time.time() - l_started)))
+        finally:
+            if l_sub is not None:
+                i_source[1].unsubscribe(l_sub)
+
+    def _wait_source_str(self, i_source):
+        if i_source[2] is None:
+            return "%s %s" % (i_source[0], str(i_source[1]))
+        return "%s %s" % (i_source[0], str(i_source[2]))
+
+    ##
+    # @brief Probes a wait_for() source once
+    #
+    # @param i_source @type tuple: (kind, target, expected), see wait_for()
+    # @param i_sub @type OpTestSOLSubscription: subscription for SOL capture sources
+    #
+    # @return True if the source is in the expected state, False if not yet,
+    #         None if it never will be
+    #
+    def _wait_probe(self, i_source, i_sub=None):
+        l_kind, l_target, l_expected = i_source
+        if l_kind == BMC_CONST.WAIT_SENSOR:
+            return l_expected in self.cv_IPMI.ipmi_get_sensor_state(l_target)
+        elif l_kind == BMC_CONST.WAIT_POWER:
+            return self.cv_IPMI.ipmi_power_status() == l_expected
+        elif l_kind == BMC_CONST.WAIT_PING:
+            l_rc = subprocess.call("ping -c 1 -W %d %s >/dev/null 2>&1" %
+                                   (BMC_CONST.WAIT_POLL_INTERVAL, l_target), shell=True)
+            return l_rc == 0
+        elif l_kind == BMC_CONST.WAIT_TCP:
+            try:
+                l_sock = socket.create_connection(l_target, BMC_CONST.WAIT_POLL_INTERVAL)
+                l_sock.close()
+                return True
+            except socket.error:
+                return False
+        elif l_kind == BMC_CONST.WAIT_SOL and i_sub is not None:
+            return i_sub.wait(BMC_CONST.WAIT_POLL_INTERVAL)
+        elif l_kind == BMC_CONST.WAIT_SOL:
+            l_rc = l_target.expect([l_expected, pexpect.TIMEOUT, pexpect.EOF],
+                                   timeout=BMC_CONST.WAIT_POLL_INTERVAL)
+            if l_rc == 2:
+                return None
+            return l_rc == 0
+        l_msg = "Unknown wait_for source %s" % str(l_kind)
+        print l_msg
+        raise OpTestError(l_msg)
+
+    ##
+    # @brief Waits for the host OS to be up: Host Status working and the ssh
+    #        port open, whichever comes last
+    #
+    # @param i_timeout @type int: The number of seconds to wait for the host
+    #
+    # @return BMC_CONST.FW_SUCCESS or BMC_CONST.FW_FAILED
+    #
+    def sys_wait_for_host_up(self, i_timeout=BMC_CONST.HOST_UP_TIMEOUT):
+        l_sources = [(BMC_CONST.WAIT_SENSOR, BMC_CONST.IPMI_SENSOR_HOST_STATUS,
+                      'S0/G0: working'),
+                     (BMC_CONST.WAIT_TCP, (self.cv_HOST.ip, BMC_CONST.HOST_SSH_PORT),
+                      None)]
+        try:
+            self.wait_for(BMC_CONST.WAIT_ALL, l_sources, time.time() + i_timeout)
+        except OpTestError as e:
+            return BMC_CONST.FW_FAILED
+        return BMC_CONST.FW_SUCCESS
+
+    ##
+    # @brief IPLs the system from standby, profiling the boot from the SOL
+    #        console, see OpTestIPMI.ipmi_ipl_profile(). The phases are added
+    #        to the IPL history, see sys_ipl_history_record().
+    #
+    # @param i_timeout @type int: seconds for the host to reach its login prompt
+    #
+    # @return l_profile @type OpTestIPLProfile or raise OpTestError
+    #
+    def sys_ipl_profile(self, i_timeout=BMC_CONST.IPL_PROFILE_TIMEOUT):
+        self.ensure_state(BMC_CONST.SYS_STATE_STANDBY)
+        self._sys_host_power_event()
+        l_profile = self.cv_IPMI.ipmi_ipl_profile(i_timeout)
+        if int(self.sys_wait_for_host_up()):
+            raise OpTestError("Host OS is not reachable")
+        self.sys_ipl_history_record(l_profile)
+        return l_profile
+
+    ##
+    # @brief Records a profiled IPL in the IPL history, BMC_CONST.IPL_HISTORY_DB,
+    #        keyed by the BMC address, the platform of the host and the PNOR
+    #        level, and prints how its build compares with the last other one
+    #        IPLed on the machine, see OpTestIPLHistory
+    #
+    # @param i_profile @type OpTestIPLProfile: IPL to record
+    #
+    # @return l_regressions @type list: phases that got significantly slower
+    #         than on the previous build, or raise OpTestError
+    #
+    def sys_ipl_history_record(self, i_profile):
+        l_machine = self.cv_BMC.cv_bmcIP
+        l_pnor = pnor_level_key(self.cv_IPMI.ipmi_get_PNOR_level())
+        try:
+            l_platform = self.cv_HOST.host_get_platform()
+        except OpTestError:
+            l_platform = None
+        # Workers testing other machines may create it at the same time
+        try:
+            os.makedirs(os.path.dirname(BMC_CONST.IPL_HISTORY_DB))
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+        l_history = OpTestIPLHistory(BMC_CONST.IPL_HISTORY_DB)
+        try:
+            l_history.record(l_machine, l_platform, l_pnor, i_profile)
+            l_builds = [l_build for l_build in l_history.builds(l_machine) if l_build != l_pnor]
+            if not l_builds:
+                return []
+            print l_history.report(l_machine, l_builds[-1], l_pnor)
+            return [l_row['phase'] for l_row in
+                    l_history.compare(l_machine, l_builds[-1], l_pnor) if l_row['regression']]
+        finally:
+            l_history.close()
+
+    ##
+    # @brief Returns the power state of the system, from the chassis power,
+    #        the Host Status sensor and the host ssh port. It is read every
+    #        time, as test cases also power the system through OpTestIPMI
+    #        directly.
+    #
+    # @return l_state @type string: BMC_CONST.SYS_STATE_*
+    #
+    def sys_get_state(self):
+        l_host = self.cv_IPMI.ipmi_get_sensor_state(BMC_CONST.IPMI_SENSOR_HOST_STATUS)
+        if self.cv_IPMI.ipmi_power_status() == BMC_CONST.CHASSIS_POWER_OFF:
+            if BMC_CONST.CHASSIS_SOFT_OFF in l_host:
+                l_state = BMC_CONST.SYS_STATE_STANDBY
+            else:
+                l_state = BMC_CONST.SYS_STATE_OFF
+        elif BMC_CONST.CHASSIS_WORKING not in l_host:
+            l_state = BMC_CONST.SYS_STATE_IPL
+        elif self.cv_HOST.ip is not None and \
+                self.util.tcp_probe(self.cv_HOST.ip, BMC_CONST.HOST_SSH_PORT):
+            l_state = BMC_CONST.SYS_STATE_OS
+        else:
+            # Firmware is done, but the OS is not up (yet)
+            l_state = BMC_CONST.SYS_STATE_PETITBOOT
+        print "System state is %s" % l_state
+        return l_state
+
+    ##
+    # @brief Brings the system to a state with as few power transitions as
+    #        possible: nothing is done if it already is in that state, and an
+    #        IPL that is in progress is waited for instead of starting over.
+    #
+    # @param i_target @type string: BMC_CONST.SYS_STATE_STANDBY (powered off)
+    #        or BMC_CONST.SYS_STATE_OS (host OS up and reachable)
+    # @param i_timeout @type int: seconds for the host OS to come up
+    #
+    # @return BMC_CONST.FW_SUCCESS or raise OpTestError
+    #
+    def ensure_state(self, i_target, i_timeout=BMC_CONST.HOST_UP_TIMEOUT):
+        l_state = self.sys_get_state()
+        if i_target in (BMC_CONST.SYS_STATE_OFF, BMC_CONST.SYS_STATE_STANDBY):
+            if l_state == BMC_CONST.SYS_STATE_STANDBY or \
+                    (l_state == BMC_CONST.SYS_STATE_OFF and i_target == BMC_CONST.SYS_STATE_OFF):
+                print "System already is %s" % l_state
+                return BMC_CONST.FW_SUCCESS
+            if l_state != BMC_CONST.SYS_STATE_OFF and \
+                    int(self.sys_power_off()) != BMC_CONST.FW_SUCCESS:
+                raise OpTestError("System failed to power off")
+            if int(self.sys_wait_for_standby_state(BMC_CONST.SYSTEM_STANDBY_STATE_DELAY)):
+                raise OpTestError("System failed to reach standby/Soft-off state")
+            return BMC_CONST.FW_SUCCESS
+        elif i_target != BMC_CONST.SYS_STATE_OS:
+            l_msg = "Can't bring the system to state %s" % i_target
+            print l_msg
+            raise OpTestError(l_msg)
+
+        if l_state == BMC_CONST.SYS_STATE_OS:
+            print "System already is %s" % l_state
+            return BMC_CONST.FW_SUCCESS
+        if l_state in (BMC_CONST.SYS_STATE_IPL, BMC_CONST.SYS_STATE_PETITBOOT):
+            print "System is booting, waiting for the host OS"
+            if int(self.sys_wait_for_host_up(i_timeout)) == BMC_CONST.FW_SUCCESS:
+                return BMC_CONST.FW_SUCCESS
+            print "Host OS did not come up, powering the system off and on"
+            self.sys_power_off()
+            self.sys_wait_for_standby_state(BMC_CONST.SYSTEM_STANDBY_STATE_DELAY)
+        if int(self.sys_power_on()) != BMC_CONST.FW_SUCCESS:
+            raise OpTestError("System failed to power on")
+        if int(self.sys_ipl_wait_for_working_state()):
+            raise OpTestError("System failed to boot host OS")
+        if int(self.sys_wait_for_host_up(i_timeout)):
+            raise OpTestError("Host OS is not reachable")
+        return BMC_CONST.FW_SUCCESS
+
     ##
     # @brief Check for error during IPL that would result in test case failure
     #
@@ -236,7 +529,7 @@ class OpTestSystem():
     #
     def sys_bmc_reboot(self):
         try:
-            rc = self.cv_BMC.reboot()
+            rc = self.cv_BMC.reboot(self.cv_IPMI)
         except OpTestError as e:
             return BMC_CONST.FW_FAILED
 
@@ -261,9 +554,13 @@ class OpTestSystem():
         except OpTestError as e:
             print("Trying to recover partition")
             try:
+                self._sys_host_power_event()
                 self.cv_IPMI.ipmi_power_off()
                 self.cv_IPMI.ipmi_power_on()
-                self.util.PingFunc(self.cv_HOST.ip, BMC_CONST.PING_RETRY_POWERCYCLE)
+                self.wait_for(BMC_CONST.WAIT_ANY,
+                              [(BMC_CONST.WAIT_PING, self.cv_HOST.ip, None)],
+                              time.time() + BMC_CONST.HOST_BRINGUP_TIME *
+                              BMC_CONST.PING_RETRY_POWERCYCLE)
             except OpTestError as e:
                 return BMC_CONST.FW_FAILED
 
@@ -779,12 +1076,14 @@ class OpTestSystem():
     ##
     # @brief Set BMC to boot pnor from primary side
     #
-    # @param i_bios_sensor @type string: Id for BIOS Golden Sensor (example habanero=0x5c)
-    # @param i_boot_sensor @type string: Id for BOOT Count Sensor (example habanero=80)
+    # @param i_bios_sensor @type string: Id for BIOS Golden Sensor (example habanero=0x5c),
+    #        looked up from the SDR if None
+    # @param i_boot_sensor @type string: Id for BOOT Count Sensor (example habanero=80),
+    #        looked up from the SDR if None
     #
     # return BMC_CONST.FW_SUCCESS or BMC_CONST.FW_FAILED
     #
-    def sys_set_pnor_boot_primary(self, i_bios_sensor, i_boot_sensor):
+    def sys_set_pnor_boot_primary(self, i_bios_sensor=None, i_boot_sensor=None):
 
         try:
             self.cv_IPMI.ipmi_set_pnor_primary_side(i_bios_sensor,i_boot_sensor)
@@ -795,12 +1094,14 @@ class OpTestSystem():
     ##
     # @brief Set BMC to boot pnor from golden side
     #
-    # @param i_bios_sensor @type string: Id for BIOS Golden Sensor (example habanero=0x5c)
-    # @param i_boot_sensor @type string: Id for BOOT Count Sensor (example habanero=80)
+    # @param i_bios_sensor @type string: Id for BIOS Golden Sensor (example habanero=0x5c),
+    #        looked up from the SDR if None
+    # @param i_boot_sensor @type string: Id for BOOT Count Sensor (example habanero=80),
+    #        looked up from the SDR if None
     #
     # return BMC_CONST.FW_SUCCESS or BMC_CONST.FW_FAILED
     #
-    def sys_set_pnor_boot_golden(self, i_bios_sensor, i_boot_sensor):
+    def sys_set_pnor_boot_golden(self, i_bios_sensor=None, i_boot_sensor=None):
 
         try:
             self.cv_IPMI.ipmi_set_pnor_golden_side(i_bios_sensor,i_boot_sensor)
@@ -0,0 +1,235 @@
+#!/usr/bin/python
+# IBM_PROLOG_BEGIN_TAG
+# This is an automatically generated prolog.
+#
+# $Source: op-test-framework/common/OpTestTransfer.py $
+#
+# OpenPOWER Automated Test Project
+#
+# Contributors Listed Below - COPYRIGHT 2015
+# [+] International Business Machines Corp.
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+#
+# IBM_PROLOG_END_TAG
+
+## @package OpTestTransfer
+#  File transfers to and from a host over ssh
+#
+#  Files are streamed through plain ssh pipes in large blocks, over the
+#  persistent ssh connection of the host when there is one. A transfer
+#  goes to a ".part" file first and is checked with SHA-256 before it is
+#  renamed, so an interrupted transfer is resumed where it stopped instead
+#  of being sent again.
+
+import os
+import time
+import pipes
+import hashlib
+import subprocess
+
+from OpTestConstants import OpTestConstants as BMC_CONST
+from OpTestError import OpTestError
+from OpTestSSHMaster import get_ssh_master
+
+
+class OpTestTransfer():
+
+    ##
+    # @brief Initialize this object
+    #
+    # @param i_host @type string: IP Address of the host
+    # @param i_user @type string: Userid to log into the host
+    # @param i_passwd @type string: Password of the userid, only used to open
+    #        the persistent ssh connection, see OpTestSSHMaster
+    # @param i_compress @type bool: compress the data on the wire, worth it
+    #        on slow links only
+    #
+    def __init__(self, i_host, i_user, i_passwd, i_compress=False):
+        self.cv_host = i_host
+        self.cv_user = i_user
+        self.cv_passwd = i_passwd
+        self.cv_compress = i_compress
+
+    ##
+    # @brief Checks whether ssh logs into the host without a password prompt,
+    #        over the persistent connection or with a key
+    #
+    # @return True if files can be copied by this object, False otherwise
+    #
+    def available(self):
+        l_proc = self._spawn("true", None, subprocess.PIPE)
+        l_proc.communicate()
+        return l_proc.returncode == 0
+
+    ##
+    # @brief Copies a local file to the host
+    #
+    # @param i_local @type string: local file
+    # @param i_remote @type string: file or directory on host
+    #
+    # @return path of the file on host or raise OpTestError
+    #
+    def put(self, i_local, i_remote):
+        if i_remote.endswith('/') or \
+           self._remote("test -d %s; echo $?" % pipes.quote(i_remote)).strip() == '0':
+            i_remote = os.path.join(i_remote, os.path.basename(i_local))
+        l_part = i_remote + '.part'
+        l_qpart = pipes.quote(l_part)
+        l_size = os.path.getsize(i_local)
+        l_start = time.time()
+
+        l_offset, l_sha = self._resume(self._remote("if [ -f %s ]; then stat -c %%s %s; "
+                                                    "sha256sum < %s; fi" % (l_qpart, l_qpart, l_qpart)),
+                                       i_local, l_size)
+        with open(i_local, 'rb') as l_file:
+            l_file.seek(l_offset)
+            l_proc = self._spawn("cat %s %s" % ('>>' if l_offset else '>', l_qpart),
+                                 subprocess.PIPE)
+            try:
+                for l_block in iter(lambda: l_file.read(BMC_CONST.TRANSFER_BLOCK_SIZE), ''):
+                    l_sha.update(l_block)
+                    l_proc.stdin.write(l_block)
+                l_proc.stdin.close()
+            except IOError, e:
+                l_proc.kill()
+                l_proc.wait()
+                l_msg = "Copying %s to %s:%s failed: %s" % (i_local, self.cv_host, l_part, str(e))
+                print l_msg
+                raise OpTestError(l_msg)
+            self._wait(l_proc, "Copying %s to %s:%s" % (i_local, self.cv_host, l_part))
+
+        l_digest = l_sha.hexdigest()
+        l_rc = self._remote("test \"$(sha256sum < %s | cut -d' ' -f1)\" = %s && mv %s %s; echo $?" % (
+            l_qpart, l_digest, l_qpart, pipes.quote(i_remote)))
+        if l_rc.splitlines()[-1] != '0':
+            self._remote("rm -f %s" % l_qpart)
+            l_msg = "Copy of %s on %s:%s does not match its SHA-256" % (i_local, self.cv_host, i_remote)
+            print l_msg
+            raise OpTestError(l_msg)
+        self._report(i_local, self.cv_host + ':' + i_remote, l_size - l_offset, l_start)
+        return i_remote
+
+    ##
+    # @brief Copies a file from the host
+    #
+    # @param i_remote @type string: file on host
+    # @param i_local @type string: local file or directory
+    #
+    # @return path of the local file or raise OpTestError
+    #
+    def get(self, i_remote, i_local):
+        if i_local.endswith('/') or os.path.isdir(i_local):
+            i_local = os.path.join(i_local, os.path.basename(i_remote))
+        l_part = i_local + '.part'
+        l_qremote = pipes.quote(i_remote)
+        l_start = time.time()
+
+        # A partial copy left by an earlier run is hashed here, and compared
+        # with the start of the remote file before it is resumed
+        l_have = 0
+        l_sha = hashlib.sha256()
+        if os.path.isfile(l_part):
+            with open(l_part, 'rb') as l_file:
+                for l_block in iter(lambda: l_file.read(BMC_CONST.TRANSFER_BLOCK_SIZE), ''):
+                    l_sha.update(l_block)
+                    l_have += len(l_block)
+
+        l_res = self._remote("stat -c %%s %s && sha256sum < %s && head -c %d %s | sha256sum" % (
+            l_qremote, l_qremote, l_have, l_qremote)).split()
+        try:
+            l_size = int(l_res[0])
+            l_digest = l_res[1]
+            l_prefix = l_res[3]
+        except (IndexError, ValueError):
+            l_msg = "%s:%s can not be read" % (self.cv_host, i_remote)
+            print l_msg
+            raise OpTestError(l_msg)
+
+        l_offset = 0
+        if l_have and l_have <= l_size and l_sha.hexdigest() == l_prefix:
+            print "Resuming the copy of %s:%s at %d bytes" % (self.cv_host, i_remote, l_have)
+            l_offset = l_have
+        else:
+            l_sha = hashlib.sha256()
+        with open(l_part, 'ab' if l_offset else 'wb') as l_file:
+            l_proc = self._spawn("tail -c +%d %s" % (l_offset + 1, l_qremote), None,
+                                 subprocess.PIPE)
+            for l_block in iter(lambda: l_proc.stdout.read(BMC_CONST.TRANSFER_BLOCK_SIZE), ''):
+                l_sha.update(l_block)
+                l_file.write(l_block)
+            self._wait(l_proc, "Copying %s:%s to %s" % (self.cv_host, i_remote, l_part))
+
+        if l_sha.hexdigest() != l_digest:
+            os.remove(l_part)
+            l_msg = "Copy of %s:%s in %s does not match its SHA-256" % (self.cv_host, i_remote, i_local)
+            print l_msg
+            raise OpTestError(l_msg)
+        os.rename(l_part, i_local)
+        self._report(self.cv_host + ':' + i_remote, i_local, l_size - l_offset, l_start)
+        return i_local
+
+    def _resume(self, i_res, i_local, i_size):
+        # A partial copy is only used if it is the start of the file, the
+        # returned hash then already covers that start
+        l_res = i_res.split()
+        try:
+            l_have = int(l_res[0])
+            l_digest = l_res[1]
+        except (IndexError, ValueError):
+            return 0, hashlib.sha256()
+        if l_have == 0 or l_have > i_size:
+            return 0, hashlib.sha256()
+        l_sha = hashlib.sha256()
+        l_left = l_have
+        with open(i_local, 'rb') as l_file:
+            while l_left:
+                l_block = l_file.read(min(l_left, BMC_CONST.TRANSFER_BLOCK_SIZE))
+                l_sha.update(l_block)
+                l_left -= len(l_block)
+        if l_sha.hexdigest() != l_digest:
+            return 0, hashlib.sha256()
+        print "Resuming the copy of %s at %d bytes" % (i_local, l_have)
+        return l_have, l_sha
+
+    def _spawn(self, i_cmd, i_stdin=None, i_stdout=None):
+        l_args = ['/usr/bin/ssh', '-o', 'BatchMode=yes', '-o', 'StrictHostKeyChecking=no']
+        l_args += get_ssh_master(self.cv_host, self.cv_user, self.cv_passwd).control_args()
+        if self.cv_compress:
+            l_args.append('-C')
+        l_args += ['-l', self.cv_user, self.cv_host, i_cmd]
+        return subprocess.Popen(l_args, stdin=i_stdin, stdout=i_stdout, stderr=subprocess.PIPE,
+                                bufsize=BMC_CONST.TRANSFER_BLOCK_SIZE)
+
+    def _remote(self, i_cmd):
+        l_proc = self._spawn(i_cmd, None, subprocess.PIPE)
+        l_out, l_err = l_proc.communicate()
+        # 255 is ssh itself failing, other codes belong to the command
+        if l_proc.returncode == 255:
+            l_msg = "Running %s on %s failed: %s" % (i_cmd, self.cv_host, l_err.strip())
+            print l_msg
+            raise OpTestError(l_msg)
+        return l_out
+
+    def _wait(self, i_proc, i_what):
+        l_err = i_proc.stderr.read()
+        if i_proc.wait() != 0:
+            l_msg = "%s failed: %s" % (i_what, l_err.strip())
+            print l_msg
+            raise OpTestError(l_msg)
+
+    def _report(self, i_from, i_to, i_bytes, i_start):
+        l_time = max(time.time() - i_start, 0.001)
+        print "Copied %s to %s, %d bytes in %.1fs (%.1f MB/s)" % (
+            i_from, i_to, i_bytes, l_time, i_bytes / l_time / 1048576)
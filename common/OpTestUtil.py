@@ -35,10 +35,21 @@ import socket
 import select
 import time
 import pty
+import errno
+import threading
 import pexpect
 
 from OpTestConstants import OpTestConstants as BMC_CONST
 from OpTestError import OpTestError
+from OpTestTransfer import OpTestTransfer
+
+# Hosts known to be reachable, keyed by IP, with the time they were last
+# seen up and the time they came up. Shared by every OpTestUtil object, see
+# host_check_reachable().
+g_reachable = {}
+g_reachableSince = {}
+g_reachableLock = threading.Lock()
+g_reachableProber = None
 
 class OpTestUtil():
 
@@ -82,24 +93,156 @@ class OpTestUtil():
         print stderr_value
         raise OpTestError(stderr_value)
 
+    ##
+    # @brief Checks that a host can be talked to before running a command on
+    #        it. A host that was seen up in the last BMC_CONST.HOST_REACHABLE_TTL
+    #        seconds is taken as up, else its ssh port is probed and only if
+    #        that fails it is pinged like PingFunc() does.
+    #
+    # @param i_ip @type string: ip address of the host
+    # @param i_try @type int: number of times the host is pinged before
+    #        returning Failed
+    #
+    # @return BMC_CONST.PING_SUCCESS or raise OpTestError
+    #
+    def host_check_reachable(self, i_ip, i_try=1):
+        with g_reachableLock:
+            l_seen = g_reachable.get(i_ip)
+        if l_seen is not None and time.time() - l_seen < BMC_CONST.HOST_REACHABLE_TTL:
+            return BMC_CONST.PING_SUCCESS
+        if self.tcp_probe(i_ip, BMC_CONST.HOST_SSH_PORT):
+            self.host_seen_up(i_ip)
+            return BMC_CONST.PING_SUCCESS
+        return self.PingFunc(i_ip, i_try)
+
+    ##
+    # @brief Records that a host answered, e.g. a command on it completed.
+    #        From then on it is probed in the background every
+    #        BMC_CONST.HOST_REACHABLE_PROBE_INTERVAL seconds, which keeps it
+    #        up for host_check_reachable() until a probe fails.
+    #
+    # @param i_ip @type string: ip address of the host
+    #
+    def host_seen_up(self, i_ip):
+        global g_reachableProber
+        with g_reachableLock:
+            if i_ip not in g_reachable:
+                g_reachableSince[i_ip] = time.time()
+            g_reachable[i_ip] = time.time()
+            if g_reachableProber is None:
+                g_reachableProber = threading.Thread(target=self._reachable_prober)
+                g_reachableProber.daemon = True
+                g_reachableProber.start()
+
+    ##
+    # @brief Forgets that a host is up, when it is powered off or reset. The
+    #        background probe does not bring it back, only host_check_reachable()
+    #        or host_seen_up() do.
+    #
+    # @param i_ip @type string: ip address of the host, None for all of them
+    #
+    def host_invalidate_reachable(self, i_ip=None):
+        with g_reachableLock:
+            if i_ip is None:
+                g_reachable.clear()
+                g_reachableSince.clear()
+            else:
+                g_reachable.pop(i_ip, None)
+                g_reachableSince.pop(i_ip, None)
+
+    ##
+    # @brief Tells since when a host has been up without interruption, as far
+    #        as host_seen_up() and the background probe can tell. Anything
+    #        learnt about the host since then is still true, unless it was
+    #        rebooted faster than BMC_CONST.HOST_REACHABLE_PROBE_INTERVAL.
+    #
+    # @param i_ip @type string: ip address of the host
+    #
+    # @return time the host came up, None if it is not known to be up
+    #
+    def host_up_since(self, i_ip):
+        with g_reachableLock:
+            return g_reachableSince.get(i_ip)
+
+    ##
+    # @brief Tries to open a TCP connection
+    #
+    # @param i_ip @type string: ip address
+    # @param i_port @type int: TCP port
+    #
+    # @return True if the port accepted the connection, False otherwise
+    #
+    def tcp_probe(self, i_ip, i_port):
+        try:
+            l_sock = socket.create_connection((i_ip, i_port),
+                                              BMC_CONST.HOST_REACHABLE_PROBE_TIMEOUT)
+        except (socket.error, socket.timeout):
+            return False
+        l_sock.close()
+        return True
+
+    def _reachable_prober(self):
+        while True:
+            time.sleep(BMC_CONST.HOST_REACHABLE_PROBE_INTERVAL)
+            with g_reachableLock:
+                l_hosts = g_reachable.keys()
+            for l_ip in l_hosts:
+                l_up = self.tcp_probe(l_ip, BMC_CONST.HOST_SSH_PORT)
+                with g_reachableLock:
+                    # It may have been invalidated while being probed
+                    if l_ip not in g_reachable:
+                        continue
+                    if l_up:
+                        g_reachable[l_ip] = time.time()
+                    else:
+                        del g_reachable[l_ip]
+                        g_reachableSince.pop(l_ip, None)
+
 
     ##
-    #   @brief    This method does a scp from local system (where files are found)
+    #   @brief    This method copies a file from local system (where files are found)
     #             to destination(Path where files will be stored) or
-    #             scp to local system(where files will be stored) from
+    #             to local system(where files will be stored) from
     #             destination(where files are found).
+    #             The file is streamed over ssh and checked with SHA-256, and an
+    #             interrupted copy is resumed, see OpTestTransfer. scp is only
+    #             used when ssh can't log in without a password prompt.
     #   @param    hostfile
     #   @param    destid
     #   @param    destName
-    #   @param    destPath
+    #   @param    destPath, a file or a directory
     #   @param    passwd
     #   @param    ssh_ver
-    #   @param    i_function @type int: SCP_TO_REMOTE = 1(scp to remote system(default))
-    #                                   SCP_TO_LOCAL = 2 (scp to local system)
-    #   @return   output from terminal
+    #   @param    i_function @type int: SCP_TO_REMOTE = 1(copy to remote system(default))
+    #                                   SCP_TO_LOCAL = 2 (copy to local system)
+    #   @param    i_compress @type bool: compress the data on the wire
+    #   @return   path of the copied file, or output from terminal with scp
     #   @throw    subprocess or OpTestError
     #
     def copyFilesToDest(
+            self,
+            hostfile,
+            destid,
+            destName,
+            destPath,
+            passwd,
+            ssh_ver="2",
+            i_function=1,
+            i_compress=BMC_CONST.TRANSFER_COMPRESS):
+        l_transfer = OpTestTransfer(destName.strip(), destid.strip(), passwd, i_compress)
+        if not l_transfer.available():
+            print "SSH: %s@%s needs a password, copying with scp" % (destid, destName)
+            return self._scpFilesToDest(hostfile, destid, destName, destPath, passwd,
+                                        ssh_ver, i_function)
+        if i_function == BMC_CONST.SCP_TO_REMOTE:
+            return l_transfer.put(hostfile, destPath)
+        elif i_function == BMC_CONST.SCP_TO_LOCAL:
+            return l_transfer.get(destPath, hostfile)
+        l_msg = "Please provide valid scp function"
+        print l_msg
+        raise OpTestError(l_msg)
+
+    def _scpFilesToDest(
             self,
             hostfile,
             destid,
@@ -142,7 +285,7 @@ class OpTestUtil():
         else:
             while True:
                 try:
-                    x = os.read(fd, 1024)
+                    x = os.read(fd, BMC_CONST.TRANSFER_BLOCK_SIZE)
                     print("x=" + x)
                     if(x.__contains__('(yes/no)')):
                         l_res = "yes\r\n"
@@ -161,9 +304,6 @@ class OpTestUtil():
                     if(x.__contains__('yes')):
                         response = '1' + "\r\n"
                         os.write(fd, response)
-                    if(x.__contains__('100%')):
-                        # We copied 100% of file so break out
-                        break
                     if(x.__contains__("Invalid ssh2 packet type")):
                         print(x)
                         raise OpTestError(x)
@@ -186,10 +326,16 @@ class OpTestUtil():
                         print(x)
                         raise OpTestError("Wrong Login or Password :" + x)
                     list = list + x
-                    time.sleep(1)
                 except OSError as e:
+                    if e.errno == errno.EIO:
+                        # scp exited and closed the terminal
+                        break
                     print("OSError string: " + e.strerror)
                     raise OpTestError(e.strerror)
+            # "100%" shows up before the file is closed at the destination,
+            # the copy is only done once scp exited
+            os.close(fd)
+            l_status = os.waitpid(pid, 0)[1]
 
         if list.__contains__("Name or service not known"):
             reason = 'SSH Failed for :' + destid + \
@@ -197,5 +343,14 @@ class OpTestUtil():
             print("scp command failed!")
             raise OpTestError(reason)
 
+        if l_status != 0:
+            print(list)
+            if os.WIFEXITED(l_status):
+                l_msg = "scp command failed with exit code %d" % os.WEXITSTATUS(l_status)
+            else:
+                l_msg = "scp command killed by signal %d" % os.WTERMSIG(l_status)
+            print l_msg
+            raise OpTestError(l_msg)
+
         print(list)
         return list
@@ -32,6 +32,7 @@ import unittest
 
 from OpTestConstants import OpTestConstants as BMC_CONST
 from OpTestError import OpTestError
+from OpTestFFS import pnor_flashed_forget
 
 ## @package OpTestWeb
 #  Contains all BMC related Web tools
@@ -66,6 +67,9 @@ class OpTestWeb():
     #
     def web_update_hpm(self, i_image, i_component=BMC_CONST.UPDATE_BMCANDPNOR):
 
+        # The PNOR no longer holds the image OpTestBMC.pnor_img_flash_delta() knows
+        pnor_flashed_forget(self.ip)
+
         try:
 
             import argparse
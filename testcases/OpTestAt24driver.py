@@ -92,30 +92,25 @@ class OpTestAt24driver():
         # Get Kernel Version
         l_kernel = self.cv_HOST.host_get_kernel_version()
 
-        # Loading i2c_opal module based on config option
-        l_config = "CONFIG_I2C_OPAL"
-        l_module = "i2c_opal"
-        self.cv_HOST.host_load_module_based_on_config(l_kernel, l_config, l_module)
-
-        # Loading i2c_dev module based on config option
-        l_config = "CONFIG_I2C_CHARDEV"
-        l_module = "i2c_dev"
-        self.cv_HOST.host_load_module_based_on_config(l_kernel, l_config, l_module)
-
-        # Loading at24 module based on config option
-        l_config = "CONFIG_EEPROM_AT24"
-        l_module = "at24"
-        self.cv_HOST.host_load_module_based_on_config(l_kernel, l_config, l_module)
+        # Loading i2c_opal, i2c_dev and at24 modules based on config options
+        self.cv_HOST.host_load_modules_based_on_config(l_kernel, [
+            ("CONFIG_I2C_OPAL", "i2c_opal"),
+            ("CONFIG_I2C_CHARDEV", "i2c_dev"),
+            ("CONFIG_EEPROM_AT24", "at24")])
 
         # Get infomtion of EEPROM chips
         self.cv_HOST.host_get_info_of_eeprom_chips()
 
         # Get list of pairs of i2c bus and EEPROM device addresses in the host
         l_chips = self.cv_HOST.host_get_list_of_eeprom_chips()
-        for l_args in l_chips:
-            # Accessing the registers visible through the i2cbus using i2cdump utility
-            # l_args format: "0 0x51","1 0x53",.....etc
-            self.i2c_dump(l_args)
+        # Accessing the registers visible through the i2cbus using i2cdump utility
+        # l_args format: "0 0x51","1 0x53",.....etc
+        l_results = self.cv_HOST.host_run_batch(["i2cdump -f -y %s" % l_args for l_args in l_chips])
+        for l_args, l_res in zip(l_chips, l_results):
+            if l_res.cv_exitCode != 0:
+                l_msg = "i2cdump failed on addr %s" % l_args
+                print l_msg
+                raise OpTestError(l_msg)
 
         # Getting the list of sysfs eeprom interfaces
         l_res = self.cv_HOST.host_run_command("find /sys/ -name eeprom; echo $?")
@@ -126,33 +121,12 @@ class OpTestAt24driver():
             l_msg = "EEPROM sysfs entries are not created"
             print l_msg
             raise OpTestError(l_msg)
-        for l_dev in l_res:
-            if l_dev.__contains__("eeprom"):
-                # Getting the eeprom device data using hexdump utility in hex + Ascii format
-                self.cv_HOST.host_hexdump(l_dev)
-            else:
-                pass
+        # Getting the eeprom device data using hexdump utility in hex + Ascii format
+        l_devs = [l_dev for l_dev in l_res if l_dev.__contains__("eeprom")]
+        l_results = self.cv_HOST.host_run_batch(["hexdump -C %s" % l_dev for l_dev in l_devs])
+        for l_dev, l_res in zip(l_devs, l_results):
+            if l_res.cv_exitCode != 0:
+                l_msg = "hexdump failed for device %s" % l_dev
+                print l_msg
+                raise OpTestError(l_msg)
         return BMC_CONST.FW_SUCCESS
-
-    ##
-    # @brief This i2cdump function takes arguments in pair of a string like "i2cbus address".
-    #        i2cbus indicates the number or name of the I2C bus to be scanned. This number should
-    #        correspond  to  one  of  the busses listed by i2cdetect -l. address indicates
-    #        the address to be scanned on that bus, and is an integer between 0x03 and 0x77
-    #        i2cdump is a program to examine registers visible through the I2C bus
-    #
-    # @param i_args @type string: this is the argument to i2cdump utility
-    #                             args are in the form of "i2c-bus-number eeprom-chip-address"
-    #                             Ex: "0 0x51","3 0x52" ....etc
-    #
-    # @return BMC_CONST.FW_SUCCESS or raise OpTestError
-    #
-    def i2c_dump(self, i_args):
-        l_res = self.cv_HOST.host_run_command("i2cdump -f -y %s; echo $?" % i_args)
-        l_res = l_res.splitlines()
-        if int(l_res[-1]) == 0:
-            return BMC_CONST.FW_SUCCESS
-        else:
-            l_msg = "i2cdump failed on addr %s" % i_args
-            print l_msg
-            raise OpTestError(l_msg)
@@ -91,14 +91,9 @@ class OpTestEnergyScale():
     #
     def test_energy_scale_at_standby_state(self):
         print "Energy Scale Test 1: Get, Set, activate and deactivate platform power limit at power off"
-        print "Performing a IPMI Power OFF Operation"
-        # Perform a IPMI Power OFF Operation(Immediate Shutdown)
-        self.cv_IPMI.ipmi_power_off()
-        if int(self.cv_SYSTEM.sys_wait_for_standby_state(BMC_CONST.SYSTEM_STANDBY_STATE_DELAY)) == 0:
-            print "System is in standby/Soft-off state"
-        else:
-            l_msg = "System failed to reach standby/Soft-off state"
-            raise OpTestError(l_msg)
+        print "Bringing the system to standby/Soft-off state"
+        # Powered off only if it is not in standby already
+        self.cv_SYSTEM.ensure_state(BMC_CONST.SYS_STATE_STANDBY)
         self.cv_IPMI.ipmi_sdr_clear()
         print self.cv_IPMI.ipmi_get_power_limit()
         self.cv_IPMI.ipmi_activate_power_limit()
@@ -170,14 +165,9 @@ class OpTestEnergyScale():
     #
     def test_energy_scale_at_runtime_state(self):
         print "Energy Scale Test 2: Get, Set, activate and deactivate platform power limit at runtime"
-        print "Performing a IPMI Power OFF Operation"
-        # Perform a IPMI Power OFF Operation(Immediate Shutdown)
-        self.cv_IPMI.ipmi_power_off()
-        if int(self.cv_SYSTEM.sys_wait_for_standby_state(BMC_CONST.SYSTEM_STANDBY_STATE_DELAY)) == 0:
-            print "System is in standby/Soft-off state"
-        else:
-            l_msg = "System failed to reach standby/Soft-off state"
-            raise OpTestError(l_msg)
+        print "Bringing the system to standby/Soft-off state"
+        # Powered off only if it is not in standby already
+        self.cv_SYSTEM.ensure_state(BMC_CONST.SYS_STATE_STANDBY)
         print "Get All dcmi readings at power off"
         self.run_ipmi_cmd(BMC_CONST.IPMI_DCMI_DISCOVER)
         self.run_ipmi_cmd(BMC_CONST.IPMI_DCMI_POWER_READING)
@@ -272,14 +262,9 @@ class OpTestEnergyScale():
     #
     def test_dcmi_at_standby_and_runtime_states(self):
         print "Energy scale Test 3: Get Sensors, Temperature and Power reading's at power off and runtime"
-        print "Performing a IPMI Power OFF Operation"
-        # Perform a IPMI Power OFF Operation(Immediate Shutdown)
-        self.cv_IPMI.ipmi_power_off()
-        if int(self.cv_SYSTEM.sys_wait_for_standby_state(BMC_CONST.SYSTEM_STANDBY_STATE_DELAY)) == 0:
-            print "System is in standby/Soft-off state"
-        else:
-            l_msg = "System failed to reach standby/Soft-off state"
-            raise OpTestError(l_msg)
+        print "Bringing the system to standby/Soft-off state"
+        # Powered off only if it is not in standby already
+        self.cv_SYSTEM.ensure_state(BMC_CONST.SYS_STATE_STANDBY)
         print "Get All dcmi readings at power off"
         self.run_ipmi_cmd(BMC_CONST.IPMI_DCMI_DISCOVER)
         self.run_ipmi_cmd(BMC_CONST.IPMI_DCMI_POWER_READING)
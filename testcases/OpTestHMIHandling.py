@@ -96,12 +96,10 @@ class OpTestHMIHandling():
         self.cv_HOST.host_check_command("git")
         self.cv_HOST.host_check_command("gcc")
 
-        # It will clone skiboot source repository
+        # Get the necessary tools xscom-utils and gard utility, cloning
+        # skiboot source repository and compiling them if not cached
         l_dir = "/tmp/skiboot"
-        self.cv_HOST.host_clone_skiboot_source(l_dir)
-        # Compile the necessary tools xscom-utils and gard utility
-        self.cv_HOST.host_compile_xscom_utilities(l_dir)
-        self.cv_HOST.host_compile_gard_utility(l_dir)
+        self.cv_HOST.host_prepare_skiboot_tools(l_dir)
 
         # Getting list of processor chip Id's(executing getscom -l to get chip id's)
         l_res = self.cv_HOST.host_run_command("cd %s/external/xscom-utils/; ./getscom -l" % l_dir)
@@ -168,29 +166,22 @@ class OpTestHMIHandling():
     ##
     # @brief This function is mainly used to clear hardware gard entries.
     #        It will perform below steps
-    #           1. Reboot the system(Power off/on)
+    #           1. Boot the host OS, unless it is up already
     #           2. Clear any Hardware gard entries
     #           3. Again reboot the system, to make use of garded Hardware.
     #
     # @return BMC_CONST.FW_SUCCESS or raise OpTestError
     #
     def clearGardEntries(self):
-        # Power off and on the system.
-        self.cv_IPMI.ipmi_power_off()
-        self.cv_IPMI.ipmi_power_on()
-        if int(self.cv_SYSTEM.sys_ipl_wait_for_working_state()):
-            l_msg = "System failed to boot host OS"
-            raise OpTestError(l_msg)
-        time.sleep(BMC_CONST.HOST_BRINGUP_TIME)
+        # Boot the host OS, unless it is up already
+        self.cv_SYSTEM.ensure_state(BMC_CONST.SYS_STATE_OS)
 
         # Clearing gard entries after host comes up
         self.cv_HOST.host_get_OS_Level()
-        # It will clone skiboot source repository
+        # Get the necessary tools xscom-utils and gard utility, cloning
+        # skiboot source repository and compiling them if not cached
         l_dir = "/tmp/skiboot"
-        self.cv_HOST.host_clone_skiboot_source(l_dir)
-        # Compile the necessary tools xscom-utils and gard utility
-        self.cv_HOST.host_compile_xscom_utilities(l_dir)
-        self.cv_HOST.host_compile_gard_utility(l_dir)
+        self.cv_HOST.host_prepare_skiboot_tools(l_dir)
 
         l_con = self.cv_SYSTEM.sys_get_ipmi_console()
         self.cv_IPMI.ipmi_host_login(l_con)
@@ -214,7 +205,9 @@ class OpTestHMIHandling():
         if int(self.cv_SYSTEM.sys_ipl_wait_for_working_state()):
             l_msg = "System failed to boot host OS"
             raise OpTestError(l_msg)
-        time.sleep(BMC_CONST.HOST_BRINGUP_TIME)
+        if int(self.cv_SYSTEM.sys_wait_for_host_up()):
+            l_msg = "Host OS is not reachable"
+            raise OpTestError(l_msg)
         self.cv_HOST.host_get_OS_Level()
         self.cv_SYSTEM.sys_ipmi_close_console(l_con)
 
@@ -102,20 +102,11 @@ class OpTestI2Cdriver():
         # Get Kernel Version
         l_kernel = self.cv_HOST.host_get_kernel_version()
 
-        # loading i2c_opal module based on config option
-        l_config = "CONFIG_I2C_OPAL"
-        l_module = "i2c_opal"
-        self.cv_HOST.host_load_module_based_on_config(l_kernel, l_config, l_module)
-
-        # loading i2c_dev module based on config option
-        l_config = "CONFIG_I2C_CHARDEV"
-        l_module = "i2c_dev"
-        self.cv_HOST.host_load_module_based_on_config(l_kernel, l_config, l_module)
-
-        # loading at24 module based on config option
-        l_config = "CONFIG_EEPROM_AT24"
-        l_module = "at24"
-        self.cv_HOST.host_load_module_based_on_config(l_kernel, l_config, l_module)
+        # loading i2c_opal, i2c_dev and at24 modules based on config options
+        self.cv_HOST.host_load_modules_based_on_config(l_kernel, [
+            ("CONFIG_I2C_OPAL", "i2c_opal"),
+            ("CONFIG_I2C_CHARDEV", "i2c_dev"),
+            ("CONFIG_EEPROM_AT24", "at24")])
 
         # Get information of EEPROM chips
         self.cv_HOST.host_get_info_of_eeprom_chips()
@@ -126,15 +117,24 @@ class OpTestI2Cdriver():
         l_list, l_list1 = self.cv_HOST.host_get_list_of_i2c_buses()
 
         # Scanning i2c bus for devices attached to it.
-        for l_bus in l_list:
-            self.query_i2c_bus(l_bus)
+        print "Querying the i2c buses for devices attached to them"
+        l_results = self.cv_HOST.host_run_batch(["i2cdetect -y %i" % int(l_bus) for l_bus in l_list])
+        for l_bus, l_res in zip(l_list, l_results):
+            if l_res.cv_exitCode != 0:
+                l_msg = "Querying the i2cbus for devices failed:%s" % l_bus
+                print l_msg
+                raise OpTestError(l_msg)
 
         # Get list of pairs of i2c bus and EEPROM device addresses in the host
         l_chips = self.cv_HOST.host_get_list_of_eeprom_chips()
-        for l_args in l_chips:
-            # Accessing the registers visible through the i2cbus using i2cdump utility
-            # l_args format: "0 0x51","1 0x53",.....etc
-            self.i2c_dump(l_args)
+        # Accessing the registers visible through the i2cbus using i2cdump utility
+        # l_args format: "0 0x51","1 0x53",.....etc
+        l_results = self.cv_HOST.host_run_batch(["i2cdump -f -y %s" % l_args for l_args in l_chips])
+        for l_args, l_res in zip(l_chips, l_results):
+            if l_res.cv_exitCode != 0:
+                l_msg = "i2cdump failed for the device: %s" % l_args
+                print l_msg
+                raise OpTestError(l_msg)
 
         # list i2c adapter conetents
         l_res = self.cv_HOST.host_run_command("ls -l /sys/class/i2c-adapter; echo $?")
@@ -147,12 +147,10 @@ class OpTestI2Cdriver():
             raise OpTestError(l_msg)
 
         # Checking the sysfs entry of each i2c bus
-        for l_bus in l_list1:
-            l_res = self.cv_HOST.host_run_command("ls -l /sys/class/i2c-adapter/%s; echo $?" % l_bus)
-            l_res = l_res.splitlines()
-            if int(l_res[-1]) == 0:
-                pass
-            else:
+        l_results = self.cv_HOST.host_run_batch(["ls -l /sys/class/i2c-adapter/%s" % l_bus
+                                                 for l_bus in l_list1])
+        for l_res in l_results:
+            if l_res.cv_exitCode != 0:
                 l_msg = "listing i2c bus contents through the sysfs entry failed"
                 print l_msg
                 raise OpTestError(l_msg)
@@ -161,75 +159,16 @@ class OpTestI2Cdriver():
         # Only four samples are gathered to check whether reading eeprom  data is working or not.
         # Setting eeprom data is dangerous and make your system UNBOOTABLE
         l_addrs = ["0x00", "0x10", "0x20", "0x30", "0x40", "0x50", "0x60", "0x70", "0x80", "0x90", "0xa0", "0xb0", "0xc0", "0xd0", "0xe0", "0xf0"]
-        for l_addr in l_addrs:
-            l_val = self.i2c_get(l_chips[1], l_addr)
+        l_results = self.cv_HOST.host_run_batch(["i2cget -f -y %s %s" % (l_chips[1], l_addr)
+                                                 for l_addr in l_addrs])
+        for l_addr, l_res in zip(l_addrs, l_results):
+            if l_res.cv_exitCode != 0:
+                l_msg = "i2cget: Getting data from address %s failed" % l_addr
+                print l_msg
+                raise OpTestError(l_msg)
             # self.i2c_set(l_list2[1], l_addr, "0x50")
         return BMC_CONST.FW_SUCCESS
 
-    ##
-    # @brief This function query's the i2c bus for devices attached to it.
-    #        i2cdetect is a utility to scan an I2C bus for devices
-    #
-    # @param i_bus @type string: i2c bus numer
-    #
-    # @return BMC_CONST.FW_SUCCESS or raise OpTestError
-    #
-    def query_i2c_bus(self, i_bus):
-        print "Querying the i2c bus for devices attached to it"
-        l_res = self.cv_HOST.host_run_command("i2cdetect -y %i; echo $?" % int(i_bus))
-        l_res = l_res.splitlines()
-        if int(l_res[-1]) == 0:
-            return BMC_CONST.FW_SUCCESS
-        else:
-            l_msg = "Querying the i2cbus for devices failed:%s" % i_bus
-            print l_msg
-            raise OpTestError(l_msg)
-
-    ##
-    # @brief This i2cdump function takes arguments in pair of a string like "i2cbus address".
-    #        i2cbus indicates the number or name of the I2C bus to be scanned. This number should
-    #        correspond  to  one  of  the busses listed by i2cdetect -l. address indicates
-    #        the address to be scanned on that bus, and is an integer between 0x03 and 0x77
-    #        i2cdump is a program to examine registers visible through the I2C bus
-    #
-    # @param i_args @type string: this is the argument to i2cdump utility
-    #                             args are in the form of "i2c-bus-number eeprom-chip-address"
-    #                             Ex: "0 0x51","3 0x52" ....etc
-    #
-    # @return BMC_CONST.FW_SUCCESS or raise OpTestError
-    #
-    def i2c_dump(self, i_args):
-        l_res = self.cv_HOST.host_run_command("i2cdump -f -y %s; echo $?" % i_args)
-        l_res = l_res.splitlines()
-        if int(l_res[-1]) == 0:
-            return BMC_CONST.FW_SUCCESS
-        else:
-            l_msg = "i2cdump failed for the device: %s" % i_args
-            print l_msg
-            raise OpTestError(l_msg)
-
-    ##
-    # @brief This function i2cget read from I2C/SMBus chip registers
-    #        command usage: i2cget [-f] [-y] i2cbus chip-address [data-address [mode]]
-    #
-    # @param i_args @type string: this is the argument to i2cget utility
-    #                             args are in the form of "i2c-bus-number eeprom-chip-address"
-    #                             Ex: "0 0x51","3 0x52" ....etc
-    # @param i_addr @type string: this is the data-address on chip, from where data will be read
-    #                             Ex: "0x00","0x10","0x20"...
-    #
-    # @return l_res @type string: data present on data-address or raise OpTestError
-    #
-    def i2c_get(self, i_args, i_addr):
-        l_res = self.cv_HOST.host_run_command("i2cget -f -y %s %s;echo $?" % (i_args, i_addr))
-        l_res = l_res.splitlines()
-        if int(l_res[-1]) == 0:
-            return l_res
-        else:
-            l_msg = "i2cget: Getting data from address %s failed" % i_addr
-            print l_msg
-            raise OpTestError(l_msg)
-
     ##
     # @brief This function i2cset will be used for setting I2C registers
     #        command usage: i2cset [-f] [-y] [-m mask] [-r] i2cbus chip-address data-address [value] ...  [mode]
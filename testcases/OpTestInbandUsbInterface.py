@@ -93,12 +93,10 @@ class OpTestInbandUsbInterface():
 
         # loading below ipmi modules based on config option
         # ipmi_devintf, ipmi_powernv and ipmi_masghandler
-        self.cv_HOST.host_load_module_based_on_config(l_kernel, BMC_CONST.CONFIG_IPMI_DEVICE_INTERFACE,
-                                                      BMC_CONST.IPMI_DEV_INTF)
-        self.cv_HOST.host_load_module_based_on_config(l_kernel, BMC_CONST.CONFIG_IPMI_POWERNV,
-                                                      BMC_CONST.IPMI_POWERNV)
-        self.cv_HOST.host_load_module_based_on_config(l_kernel, BMC_CONST.CONFIG_IPMI_HANDLER,
-                                                      BMC_CONST.IPMI_MSG_HANDLER)
+        self.cv_HOST.host_load_modules_based_on_config(l_kernel, [
+            (BMC_CONST.CONFIG_IPMI_DEVICE_INTERFACE, BMC_CONST.IPMI_DEV_INTF),
+            (BMC_CONST.CONFIG_IPMI_POWERNV, BMC_CONST.IPMI_POWERNV),
+            (BMC_CONST.CONFIG_IPMI_HANDLER, BMC_CONST.IPMI_MSG_HANDLER)])
 
         fail_count = 0
         test_cases = [self.test_chassis, self.test_chassis_identifytests,
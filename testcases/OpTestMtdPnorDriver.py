@@ -29,8 +29,9 @@
 #
 #  This class will test the functionality of following
 #   This test has mainly to view open power's PNOR flash contents in an x86 machine
-#   using fcp utility. The corresponding pnor file is taking from /dev/mtd0.
+#   by reading its FFS partition table. The corresponding pnor file is taking from /dev/mtd0.
 #
+import os
 import time
 import subprocess
 import re
@@ -42,6 +43,7 @@ from common.OpTestConstants import OpTestConstants as BMC_CONST
 from common.OpTestError import OpTestError
 from common.OpTestHost import OpTestHost
 from common.OpTestUtil import OpTestUtil
+from common.OpTestFFS import OpTestFFS
 
 
 class OpTestMtdPnorDriver():
@@ -76,12 +78,9 @@ class OpTestMtdPnorDriver():
     #         2. Load the mtd module based on config value
     #         3. Check /dev/mtd0 character device file existence on host
     #         4. Copying the contents of the flash in a file /tmp/pnor
-    #         5. Getting the /tmp/pnor file into local x86 machine using scp utility
-    #         6. Remove existing /tmp/ffs directory and
-    #            Clone latest ffs git repository in local x86 working machine
-    #         7. Compile ffs repository to get fcp utility
-    #         8. Check existence of fcp utility in ffs repository, after compiling
-    #         9. Get the PNOR flash contents on an x86 machine using fcp utility
+    #         5. Getting the /tmp/pnor file into local x86 machine
+    #         6. Get the PNOR flash contents on an x86 machine from its FFS
+    #            partition table, see OpTestFFS
     #
     # @return BMC_CONST.FW_SUCCESS-success or raise OpTestError-fail
     #
@@ -121,58 +120,25 @@ class OpTestMtdPnorDriver():
             print l_msg
             raise OpTestError(l_msg)
 
-        # Getting the /tmp/pnor file into local x86 machine
-        l_path = "/tmp/"
+        # Getting the /tmp/pnor file into local x86 machine, named after the
+        # host as other machines may be tested at the same time
+        l_path = "/tmp/pnor.%s" % self.host_ip
         self.util.copyFilesToDest(l_path, self.host_user, self.host_ip, l_file, self.host_Passwd, "2", BMC_CONST.SCP_TO_LOCAL)
         l_list =  commands.getstatusoutput("ls -l %s; echo $?" % l_path)
         print l_list
 
-        l_workdir = "/tmp/ffs"
-        # Remove existing /tmp/ffs directory
-        l_res = commands.getstatusoutput("rm -rf %s" % l_workdir)
-        print l_res
-
-        # Clone latest ffs git repository in local x86 working machine
-        l_cmd = "git clone   https://github.com/open-power/ffs/ %s" % l_workdir
-        l_res = commands.getstatusoutput(l_cmd)
-        print l_res
-        if int(l_res[0]) == 0:
-            print "Cloning of ffs repository is successfull"
-        else:
-            l_msg = "Cloning ffs repository is failed"
-            print l_msg
-            raise OpTestError(l_msg)
-
-        # Compile ffs repository to get fcp utility
-        l_cmd = "cd %s/; make" % l_workdir
-        l_res = commands.getstatusoutput(l_cmd)
-        print l_res
-        if int(l_res[0]) == 0:
-            print "Compiling fcp utility is successfull"
-        else:
-            l_msg = "Compiling fcp utility is failed"
-            print l_msg
-            raise OpTestError(l_msg)
-
-        # Check existence of fcp utility in ffs repository, after compiling.
-        l_cmd = "test -f %s/fcp/x86/fcp" % l_workdir
-        l_res = commands.getstatusoutput(l_cmd)
-        print l_res
-        if int(l_res[0]) == 0:
-            print "Compiling fcp utility is successfull"
-        else:
-            l_msg = "Compiling fcp utility is failed"
-            print l_msg
-            raise OpTestError(l_msg)
-
-        # Check the PNOR flash contents on an x86 machine using fcp utility
-        l_cmd = "%s/fcp/x86/fcp -o 0x0 -L %s" % (l_workdir, l_file)
-        l_res = commands.getstatusoutput(l_cmd)
-        print l_res[1]
-        if int(l_res[0]) == 0:
-            print "Getting PNOR data successfull using fcp utility"
+        # Read the partition table of the PNOR data
+        try:
+            with OpTestFFS(l_path) as l_ffs:
+                l_parts = l_ffs.partitions()
+        finally:
+            os.remove(l_path)
+        for l_part in l_parts:
+            print l_part
+        if l_parts:
+            print "Getting PNOR data successfull using the FFS partition table"
             return BMC_CONST.FW_SUCCESS
         else:
-            l_msg = "Getting the PNOR data using fcp utility failed"
+            l_msg = "Getting the PNOR data failed, the FFS partition table is empty"
             print l_msg
             raise OpTestError(l_msg)
@@ -99,8 +99,7 @@ class OpTestOCC():
         self.cv_HOST.host_run_command(BMC_CONST.OCC_DISABLE)
         print "OPAL-PRD: OCC RESET"
         self.cv_HOST.host_run_command(BMC_CONST.OCC_RESET)
-        time.sleep(60)
-        if self.check_occ_status() == BMC_CONST.FW_FAILED:
+        if self.wait_for_occ_active() == BMC_CONST.FW_FAILED:
             l_msg = "OCC's are not in active state"
             #raise OpTestError(l_msg)
         print "OPAL-PRD: OCC Enable"
@@ -109,8 +108,7 @@ class OpTestOCC():
         self.cv_HOST.host_run_command(BMC_CONST.OCC_DISABLE)
         print "OPAL-PRD: OCC RESET"
         self.cv_HOST.host_run_command(BMC_CONST.OCC_RESET)
-        time.sleep(60)
-        if self.check_occ_status() == BMC_CONST.FW_FAILED:
+        if self.wait_for_occ_active() == BMC_CONST.FW_FAILED:
             l_msg = "OCC's are not in active state"
             #raise OpTestError(l_msg)
         print "OPAL-PRD: OCC Enable"
@@ -119,8 +117,7 @@ class OpTestOCC():
         self.cv_HOST.host_run_command(BMC_CONST.OCC_DISABLE)
         print "OPAL-PRD: OCC RESET"
         self.cv_HOST.host_run_command(BMC_CONST.OCC_RESET)
-        time.sleep(60)
-        if self.check_occ_status() == BMC_CONST.FW_FAILED:
+        if self.wait_for_occ_active() == BMC_CONST.FW_FAILED:
             l_msg = "OCC's are not in active state, rebooting the system"
         print "Performing a IPMI Power OFF Operation"
         # Perform a IPMI Power OFF Operation(Immediate Shutdown)
@@ -162,8 +159,7 @@ class OpTestOCC():
             self.cv_HOST.host_run_command(BMC_CONST.OCC_ENABLE)
             print "OPAL-PRD: OCC Disable"
             self.cv_HOST.host_run_command(BMC_CONST.OCC_DISABLE)
-            time.sleep(60)
-            if self.check_occ_status() == BMC_CONST.FW_FAILED:
+            if self.wait_for_occ_active() == BMC_CONST.FW_FAILED:
                 l_msg = "OCC's are not in active state"
                 #raise OpTestError(l_msg)
         print "Performing a IPMI Power OFF Operation"
@@ -180,6 +176,29 @@ class OpTestOCC():
             l_msg = "OCC's are not in active state"
             raise OpTestError(l_msg)
 
+    ##
+    # @brief This function polls the OCC status until the OCC's are active,
+    #        instead of sleeping for a fixed time after an OCC reset/enable/disable.
+    #
+    # @param i_timeout @type int: seconds to wait for the OCC's to become active
+    #
+    # @return BMC_CONST.FW_SUCCESS - OCC's are active or
+    #         BMC_CONST.FW_FAILED  - OCC's are not active at the deadline
+    #
+    def wait_for_occ_active(self, i_timeout=BMC_CONST.OCC_ENABLE_WAIT):
+        l_deadline = time.time() + i_timeout
+        while True:
+            try:
+                if self.check_occ_status() == BMC_CONST.FW_SUCCESS:
+                    return BMC_CONST.FW_SUCCESS
+            except OpTestError:
+                # The BMC may not answer while the OCC's reload
+                pass
+            if time.time() >= l_deadline:
+                print "OCC's did not become active in %d seconds" % i_timeout
+                return BMC_CONST.FW_FAILED
+            time.sleep(BMC_CONST.WAIT_POLL_INTERVAL)
+
     ##
     # @brief This function is used to get OCC status enable/disable.
     #
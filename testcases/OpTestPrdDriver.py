@@ -221,11 +221,9 @@ class OpTestPrdDriver():
         self.cv_HOST.host_check_command("git")
         self.cv_HOST.host_check_command("gcc")
 
-        # It will clone skiboot source repository 
-        self.cv_HOST.host_clone_skiboot_source(BMC_CONST.CLONE_SKIBOOT_DIR)
-
-        # Compile the necessary tools xscom-utils and gard utility
-        self.cv_HOST.host_compile_xscom_utilities(BMC_CONST.CLONE_SKIBOOT_DIR)
+        # Get the necessary tools xscom-utils and gard utility, cloning
+        # skiboot source repository and compiling them if not cached
+        self.cv_HOST.host_prepare_skiboot_tools(BMC_CONST.CLONE_SKIBOOT_DIR)
 
         # Getting list of processor chip Id's(executing getscom -l to get chip id's)
         l_res = self.cv_HOST.host_run_command("cd %s/external/xscom-utils/; ./getscom -l" % BMC_CONST.CLONE_SKIBOOT_DIR)
@@ -111,8 +111,13 @@ class OpTestRTCdriver():
         print l_list
 
         # Display the time of hwclock from device files
-        for l_file in l_list:
-            self.read_hwclock_from_file(l_file)
+        print "Reading the hwclock from special files /dev/ ...: %s" % l_list
+        l_results = self.cv_HOST.host_run_batch(["hwclock -r -f %s" % l_file for l_file in l_list])
+        for l_res in l_results:
+            if l_res.cv_exitCode != 0:
+                l_msg = "Reading the hwclock from file failed"
+                print l_msg
+                raise OpTestError(l_msg)
 
         self.cv_HOST.host_read_hwclock()
         time.sleep(5)
@@ -150,24 +155,6 @@ class OpTestRTCdriver():
         self.hwclock_compare()
         self.cv_HOST.host_read_hwclock()
 
-    ##
-    # @brief This function reads hwclock from special /dev/... file instead of default
-    #
-    # @param i_file @type string: special /dev/ file
-    #
-    # @return BMC_CONST.FW_SUCCESS or raise OpTestError
-    #
-    def read_hwclock_from_file(self, i_file):
-        print "Reading the hwclock from special file /dev/ ...: %s" % i_file
-        l_res = self.cv_HOST.host_run_command("hwclock -r -f %s;echo $?" % i_file)
-        l_res = l_res.splitlines()
-        if int(l_res[-1]) == 0:
-            return BMC_CONST.FW_SUCCESS
-        else:
-            l_msg = "Reading the hwclock from file failed"
-            print l_msg
-            raise OpTestError(l_msg)
-
     ##
     # @brief This function sets hwclock in UTC format
     #